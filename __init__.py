@@ -38,7 +38,7 @@ from .text_file_reader import TextFileReader, GPTConfigReader, WanqingConfigRead
 from .api.load_image_from_url import LoadImageFromURL
 from .logic.group_random_selector import GroupRandomSelector
 from .api.openai_text_gen import OpenAITextGenNode
-from .api.openai_vision import OpenAIVisionNode
+from .api.openai_vision import OpenAIVisionNode, OpenAIVisionBatchNode
 from .img.image_base64 import ImageBase64Node
 from .api.openai_vision_2 import OpenAIVision2Node
 from .save.SaveText import SaveTextNode
@@ -47,7 +47,7 @@ from .img.water_mark import watermark_Mark, watermark_Extract
 from .api.translate_service import TranslateServiceNode
 from .save.SaveImagePro import SaveImageProNode
 from .img.CropByRatioAndBBox import CropByRatioAndBBox
-from .img.watermark_detection import WatermarkDetector, WatermarkCheck
+from .img.watermark_detection import WatermarkDetector, WatermarkCheck, WatermarkBackendExport, WatermarkModelUnload
 from .api.flux_kontext_text2img import FluxKontextProNode
 from .api.flux_kontext_img2img import FluxKontextImg2ImgNode
 from .api.flux_third_party_api import FluxThirdPartyAPINode
@@ -62,7 +62,7 @@ from .utils.html_attribute_modifier import HtmlAttributeModifierNode
 from .html_extractor import HtmlExtractorNode
 from .api.ppinfra_gpt_node import PPInfraGPTNode
 from .api.gpt_image_edit import GPTImageEditNode
-from .api.wanqing_bbox_detector import WanqingBboxDetectorNode
+from .api.wanqing_bbox_detector import WanqingBboxDetectorNode, WanqingBboxBulkDetectorNode
 from .api.wanqing_flexible_api import WanqingFlexibleAPINode
 from .api.wanqing_gpt_image_generation import WanQingGPTImageGenerationNode
 from .api.wanqing_gpt_image_edit import WanQingGPTImageEditNode
@@ -139,6 +139,7 @@ NODE_CLASS_MAPPINGS = {
     "GroupRandomSelector":GroupRandomSelector,
     "OpenAITextGenNode": OpenAITextGenNode,
     "OpenAIVisionNode": OpenAIVisionNode,
+    "OpenAIVisionBatchNode": OpenAIVisionBatchNode,
     "ImageBase64Node": ImageBase64Node,
     "OpenAIVision2Node": OpenAIVision2Node,
     "SaveTextNode": SaveTextNode,
@@ -150,6 +151,8 @@ NODE_CLASS_MAPPINGS = {
     "CropByRatioAndBBox": CropByRatioAndBBox,
     "WatermarkDetector": WatermarkDetector,
     "WatermarkCheck": WatermarkCheck,
+    "WatermarkBackendExport": WatermarkBackendExport,
+    "WatermarkModelUnload": WatermarkModelUnload,
     "FluxKontextPro": FluxKontextProNode,
     "FluxKontextImg2Img": FluxKontextImg2ImgNode,
     "FluxThirdPartyAPI": FluxThirdPartyAPINode,
@@ -165,6 +168,7 @@ NODE_CLASS_MAPPINGS = {
     "PPInfraGPTNode": PPInfraGPTNode,
     "GPTImageEditNode": GPTImageEditNode,
     "WanqingBboxDetectorNode": WanqingBboxDetectorNode,
+    "WanqingBboxBulkDetectorNode": WanqingBboxBulkDetectorNode,
     "WanqingFlexibleAPINode": WanqingFlexibleAPINode,
     "WanQingGPTImageGeneration": WanQingGPTImageGenerationNode,
     "WanQingGPTImageEdit": WanQingGPTImageEditNode,
@@ -243,6 +247,7 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "GroupRandomSelector": "GroupRandomSelector",
     "OpenAITextGenNode": "OpenAITextGenNode",
     "OpenAIVisionNode": "OpenAIVisionNode",
+    "OpenAIVisionBatchNode": "OpenAIVisionBatchNode",
     "ImageBase64Node": "ImageBase64Node",
     "OpenAIVision2Node": "OpenAIVision2Node",
     "SaveTextNode": "SaveTextNode",
@@ -254,6 +259,8 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "CropByRatioAndBBox": "Crop By Ratio And BBox",
     "WatermarkDetector": "Watermark Detection",
     "WatermarkCheck": "Watermark Check",
+    "WatermarkBackendExport": "Watermark Backend Export",
+    "WatermarkModelUnload": "Watermark Model Unload",
     "FluxKontextPro": "FLUX.1 Kontext Pro",
     "FluxKontextImg2Img": "FLUX.1 Kontext Img2Img",
     "FluxThirdPartyAPI": "FLUX Third Party API",
@@ -269,6 +276,7 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "PPInfraGPTNode": "PPInfra GPT Chat",
     "GPTImageEditNode": "GPT Image Edit",
     "WanqingBboxDetectorNode": "wanqing_bbox_detector",
+    "WanqingBboxBulkDetectorNode": "wanqing_bbox_bulk_detector",
     "WanqingFlexibleAPINode": "wanqing_flexible_api",
     "WanQingGPTImageGeneration": "万擎 GPT 图像生成",
     "WanQingGPTImageEdit": "万擎 GPT 图像编辑",
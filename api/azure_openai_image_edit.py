@@ -8,6 +8,7 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client, image_compression
 
 class AzureOpenAIImageEditNode:
     @classmethod
@@ -129,85 +130,15 @@ class AzureOpenAIImageEditNode:
         return mask_pil
 
     def compress_image(self, image, max_size_mb=4.0, format="JPEG", quality=85, target_size=None):
-        """压缩图像到指定大小以下，可选保持目标尺寸"""
-        max_size_bytes = int(max_size_mb * 1024 * 1024)
-        
-        # 如果是遮罩图像（可能需要alpha通道），保持PNG格式
-        if format == "PNG" and image.mode in ['RGBA', 'LA', 'L']:
-            # 对于PNG遮罩，使用更激进的压缩策略
-            current_quality = 9  # PNG压缩级别 (0-9, 9为最高压缩)
-            
-            # 先尝试不缩小尺寸，只调整压缩级别
-            original_size = image.size
-            scale_factor = 1.0
-            
-            while True:
-                buffer = io.BytesIO()
-                temp_image = image.copy()
-                
-                # 如果需要保持目标尺寸（如遮罩图像），即使压缩后也要调整回目标尺寸
-                if target_size is not None and temp_image.size != target_size:
-                    temp_image = temp_image.resize(target_size, Image.Resampling.LANCZOS)
-                elif scale_factor < 1.0:
-                    # 只有在没有目标尺寸限制时才缩小图像
-                    new_size = (int(original_size[0] * scale_factor), int(original_size[1] * scale_factor))
-                    temp_image = temp_image.resize(new_size, Image.Resampling.LANCZOS)
-                
-                temp_image.save(buffer, format="PNG", optimize=True, compress_level=current_quality)
-                
-                if buffer.tell() <= max_size_bytes or (target_size is None and scale_factor <= 0.3):
-                    buffer.seek(0)
-                    final_size = temp_image.size
-                    return buffer.getvalue(), final_size
-                
-                # 如果有目标尺寸限制，优先降低压缩质量而不是缩小尺寸
-                if target_size is not None:
-                    if current_quality > 0:
-                        current_quality = max(0, current_quality - 1)
-                    else:
-                        # 质量已经到最低，接受当前结果
-                        buffer.seek(0)
-                        final_size = temp_image.size
-                        return buffer.getvalue(), final_size
-                else:
-                    scale_factor *= 0.8
-        else:
-            # 对于JPEG格式的普通图像
-            current_quality = quality
-            scale_factor = 1.0
-            original_size = image.size
-            
-            # 确保是RGB模式
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            while current_quality >= 20:
-                buffer = io.BytesIO()
-                temp_image = image.copy()
-                
-                # 如果需要保持目标尺寸，调整到目标尺寸
-                if target_size is not None and temp_image.size != target_size:
-                    temp_image = temp_image.resize(target_size, Image.Resampling.LANCZOS)
-                elif current_quality == 20 and scale_factor > 0.3:
-                    # 只有在没有目标尺寸限制时才缩小图像
-                    scale_factor *= 0.8
-                    new_size = (int(original_size[0] * scale_factor), int(original_size[1] * scale_factor))
-                    temp_image = temp_image.resize(new_size, Image.Resampling.LANCZOS)
-                    current_quality = quality  # 重置质量
-                
-                temp_image.save(buffer, format="JPEG", quality=current_quality, optimize=True)
-                
-                if buffer.tell() <= max_size_bytes:
-                    buffer.seek(0)
-                    final_size = temp_image.size
-                    return buffer.getvalue(), final_size
-                
-                current_quality -= 10
-        
-        # 如果还是太大，返回最后的结果
-        buffer.seek(0)
-        final_size = temp_image.size
-        return buffer.getvalue(), final_size
+        """
+        压缩图像到指定大小以下，可选保持目标尺寸
+
+        format="PNG" 时始终输出PNG（不退回JPEG编码），超出限制时先量化为256色，仍超出才缩小尺寸
+        """
+        # 预测式查找质量/缩放比例，整图编码通常只需一到两次
+        return image_compression.compress_to_size(
+            image, int(max_size_mb * 1024 * 1024), format=format, quality=quality, target_size=target_size
+        )
 
     def edit_image(self, api_key, endpoint, deployment_name, api_version, image, prompt, 
                    image_count, image_size, quality, output_format, max_file_size_mb, timeout, mask=None):
@@ -293,7 +224,7 @@ class AzureOpenAIImageEditNode:
                     mask_image,
                     max_size_mb=max_file_size_mb * 0.4,  # 给遮罩图像分配40%的空间
                     format="PNG",  # 遮罩必须是PNG格式
-                    target_size=input_image.size  # 确保压缩后的遮罩尺寸与原始图像一致
+                    target_size=compressed_size  # 与压缩后（可能已缩小）的原始图像尺寸一致
                 )
                 print(f"[Azure OpenAI 编辑] 遮罩图像压缩后大小: {len(mask_data) / 1024:.1f}KB, 尺寸: {mask_compressed_size}")
             else:
@@ -362,7 +293,7 @@ class AzureOpenAIImageEditNode:
             print(f"  - 总请求大小: {total_request_size / 1024:.1f}KB")
             
             # 发送请求
-            response = requests.post(
+            response = gateway_client.post(
                 url,
                 headers=headers,
                 files=files,
@@ -481,7 +412,7 @@ class AzureOpenAIImageEditNode:
                     print(f"[Azure OpenAI 编辑] 收到图像URL: {item['url']}")
                     try:
                         # 下载URL图像
-                        img_response = requests.get(item['url'], timeout=30)
+                        img_response = gateway_client.get(item['url'], timeout=30)
                         if img_response.ok:
                             result_image = Image.open(io.BytesIO(img_response.content))
                             
@@ -8,6 +8,7 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client
 
 class AzureOpenAIText2ImgNode:
     @classmethod
@@ -154,7 +155,7 @@ class AzureOpenAIText2ImgNode:
             print(f"  - output_compression: {output_compression}")
             
             # 发送请求
-            response = requests.post(
+            response = gateway_client.post(
                 url,
                 headers=headers,
                 json=payload,
@@ -266,7 +267,7 @@ class AzureOpenAIText2ImgNode:
                     print(f"[Azure OpenAI 文生图] 收到图像URL: {item['url']}")
                     try:
                         # 下载URL图像
-                        img_response = requests.get(item['url'], timeout=30)
+                        img_response = gateway_client.get(item['url'], timeout=30)
                         if img_response.ok:
                             result_image = Image.open(io.BytesIO(img_response.content))
                             
@@ -6,6 +6,7 @@ import base64
 from PIL import Image
 from io import BytesIO
 import json
+from ..utils import gateway_client
 
 class FluxKontextImg2ImgNode:
     @classmethod
@@ -121,7 +122,7 @@ class FluxKontextImg2ImgNode:
 
             # Step 1: Create the request
             print(f"Sending image editing request to FLUX Kontext {model.upper()} with prompt: {prompt[:50]}...")
-            response = requests.post(
+            response = gateway_client.post(
                 endpoint,
                 headers=headers,
                 data=json.dumps(payload),
@@ -154,7 +155,7 @@ class FluxKontextImg2ImgNode:
                 attempt += 1
                 
                 try:
-                    poll_response = requests.get(
+                    poll_response = gateway_client.get(
                         polling_url,
                         headers={'accept': 'application/json', 'x-key': api_key},
                         timeout=10
@@ -180,7 +181,7 @@ class FluxKontextImg2ImgNode:
                         
                         # Download the image
                         print("Downloading edited image...")
-                        image_response = requests.get(image_url, timeout=30)
+                        image_response = gateway_client.get(image_url, timeout=30)
                         
                         if image_response.status_code != 200:
                             error_msg = f"Failed to download image: {image_response.status_code}"
@@ -6,6 +6,7 @@ import base64
 from PIL import Image
 from io import BytesIO
 import json
+from ..utils import gateway_client
 
 class FluxKontextProNode:
     @classmethod
@@ -91,7 +92,7 @@ class FluxKontextProNode:
         try:
             # Step 1: Create the request
             print(f"Sending request to FLUX Kontext {model.upper()} with prompt: {prompt[:50]}...")
-            response = requests.post(
+            response = gateway_client.post(
                 endpoint,
                 headers=headers,
                 data=json.dumps(payload),
@@ -124,7 +125,7 @@ class FluxKontextProNode:
                 attempt += 1
                 
                 try:
-                    poll_response = requests.get(
+                    poll_response = gateway_client.get(
                         polling_url,
                         headers={'accept': 'application/json', 'x-key': api_key},
                         timeout=10
@@ -150,7 +151,7 @@ class FluxKontextProNode:
                         
                         # Download the image
                         print("Downloading generated image...")
-                        image_response = requests.get(image_url, timeout=30)
+                        image_response = gateway_client.get(image_url, timeout=30)
                         
                         if image_response.status_code != 200:
                             error_msg = f"Failed to download image: {image_response.status_code}"
@@ -6,6 +6,7 @@ import base64
 from PIL import Image
 from io import BytesIO
 import json
+from ..utils import gateway_client
 
 class FluxThirdPartyAPINode:
     @classmethod
@@ -204,7 +205,7 @@ class FluxThirdPartyAPINode:
             print(f"Model: {model.upper()}")
             print(f"Prompt: {prompt[:50]}...")
             
-            response = requests.post(
+            response = gateway_client.post(
                 endpoint,
                 headers=headers,
                 data=json.dumps(payload),
@@ -240,7 +241,7 @@ class FluxThirdPartyAPINode:
                 attempt += 1
                 
                 try:
-                    poll_response = requests.get(
+                    poll_response = gateway_client.get(
                         full_polling_url,
                         headers={'accept': 'application/json', 'Authorization': f'Bearer {api_key}'},
                         timeout=30
@@ -267,7 +268,7 @@ class FluxThirdPartyAPINode:
                         
                         # Download the image
                         print(f"Downloading {api_type} result image...")
-                        image_response = requests.get(image_url, timeout=60)
+                        image_response = gateway_client.get(image_url, timeout=60)
                         
                         if image_response.status_code != 200:
                             error_msg = f"Failed to download image: {image_response.status_code}"
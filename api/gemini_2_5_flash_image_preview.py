@@ -8,6 +8,7 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client
 
 class Gemini25FlashImagePreviewNode:
     @classmethod
@@ -64,13 +65,7 @@ class Gemini25FlashImagePreviewNode:
     CATEGORY = "✨✨✨design-ai/api"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging-sgp.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod-sgp.corp.kuaishou.com", 
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = gateway_client.SGP_ENVIRONMENTS
 
     def generate_or_edit_image(self, environment, api_key, prompt, mode, timeout, use_proxy, custom_base_url="", custom_endpoint="/ai-serve/v1/gemini-2.5-flash-image-preview:generateContent", image=None):
         """
@@ -139,7 +134,7 @@ class Gemini25FlashImagePreviewNode:
                 request_kwargs["proxies"] = {"http": None, "https": None}
             
             # 发送同步请求
-            response = requests.post(api_url, **request_kwargs)
+            response = gateway_client.post(api_url, **request_kwargs)
             
             print(f"[Gemini Flash Image] 响应状态码: {response.status_code}")
             
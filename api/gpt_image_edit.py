@@ -5,6 +5,7 @@ import base64
 from PIL import Image
 from io import BytesIO
 import json
+from ..utils import gateway_client, image_compression, image_encoder
 
 class GPTImageEditNode:
     @classmethod
@@ -62,6 +63,13 @@ class GPTImageEditNode:
                     "step": 10.0,
                     "tooltip": "API请求超时时间(秒)"
                 }),
+                "max_file_size_mb": ("FLOAT", {
+                    "default": 25.0,
+                    "min": 1.0,
+                    "max": 50.0,
+                    "step": 0.5,
+                    "tooltip": "输入图像上传大小上限(MB)，超出时等比缩小；dall-e-2需设为4"
+                }),
             },
         }
 
@@ -127,7 +135,7 @@ class GPTImageEditNode:
     def download_image_to_tensor(self, image_url):
         """Download image from URL and convert to tensor"""
         try:
-            response = requests.get(image_url, timeout=30)
+            response = gateway_client.get(image_url, timeout=30)
             response.raise_for_status()
             
             # Convert to PIL Image
@@ -158,7 +166,7 @@ class GPTImageEditNode:
         return f"{base_url}/v1/images/edits"
 
     def edit_image(self, base_url, api_key, model, image, prompt, mask=None, n=1, 
-                   quality="auto", response_format="b64_json", size="auto", timeout=120.0):
+                   quality="auto", response_format="b64_json", size="auto", timeout=120.0, max_file_size_mb=25.0):
         
         # Validation
         if not api_key.strip():
@@ -171,13 +179,16 @@ class GPTImageEditNode:
             # Build endpoint URL
             endpoint = self.build_endpoint_url(base_url)
             
-            # Convert input image to base64
-            print("Converting input image to base64...")
-            image_base64 = self.tensor_to_base64(image, 'PNG')
+            # Encode input image as PNG within the upload size limit
+            print("Encoding input image...")
+            image_data, image_size = image_compression.compress_to_size(
+                image_encoder.to_pil(image, 'PNG'), int(max_file_size_mb * 1024 * 1024), format="PNG"
+            )
+            print(f"Input image: {len(image_data) / 1024:.1f}KB, size: {image_size}")
             
             # Prepare form data for multipart/form-data request
             files = {
-                'image': ('image.png', base64.b64decode(image_base64), 'image/png')
+                'image': ('image.png', image_data, 'image/png')
             }
             
             data = {
@@ -208,8 +219,9 @@ class GPTImageEditNode:
             print(f"Sending image edit request to {endpoint} with model: {model}")
             print(f"Prompt: {prompt[:100]}...")
             
-            response = requests.post(
+            response = gateway_client.post(
                 endpoint,
+                model=model,
                 headers=headers,
                 files=files,
                 data=data,
@@ -4,6 +4,7 @@ import requests
 import time
 import json
 from typing import List, Dict, Any, Optional
+from ..utils import gateway_client
 
 class GPTThirdPartyAPINode:
     @classmethod
@@ -260,7 +261,7 @@ class GPTThirdPartyAPINode:
             print(f"Stream: {stream}")
             
             # Make the request
-            response = requests.post(
+            response = gateway_client.post(
                 endpoint,
                 headers=headers,
                 data=json.dumps(payload),
@@ -5,6 +5,8 @@ from PIL import Image
 from io import BytesIO
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
+from ..utils import gateway_client, image_pipeline
 
 class HtmlScreenshotNode:
     @classmethod
@@ -90,6 +92,20 @@ class HtmlScreenshotNode:
                     "tooltip": "是否使用代理服务器"
                 }),
             },
+            "optional": {
+                "batch_tasks": ("STRING", {
+                    "multiline": True,
+                    "default": "",
+                    "tooltip": "批量模式：JSON列表，每项可覆盖 canvas_width/canvas_height/width/height/x/y，未指定的取上方参数；为空时单张截图"
+                }),
+                "max_concurrency": ("INT", {
+                    "default": 4,
+                    "min": 1,
+                    "max": 16,
+                    "step": 1,
+                    "tooltip": "批量模式下同时提交的渲染任务数"
+                }),
+            },
         }
 
     RETURN_TYPES = ("IMAGE", "BOOLEAN", "STRING", "STRING", "STRING", "STRING", "STRING")
@@ -97,19 +113,15 @@ class HtmlScreenshotNode:
     FUNCTION = "generate_screenshot"
     CATEGORY = "✨✨✨design-ai/api"
 
-    def generate_screenshot(self, html_code, api_token, creator, task_type, canvas_width, canvas_height, 
-                          width, height, x, y, sync, timeout, api_url, use_proxy):
+    def _render(self, html_code, api_token, creator, task_type, params, sync, timeout, api_url, use_proxy):
+        """
+        提交一次渲染任务，返回结果字典
+
+        success 为False时 message 为错误信息；成功时 image_url_big 可能为空（API未返回图片资源）
+        """
+        result = {"success": False, "message": "", "task_id": "", "image_url_big": "",
+                  "extracted_json": "", "response_data": ""}
         try:
-            # 构建参数
-            params = {
-                "canvasWidth": canvas_width,
-                "canvasHeight": canvas_height,
-                "width": width,
-                "height": height,
-                "x": x,
-                "y": y
-            }
-            
             # 构建请求数据
             payload = {
                 "apiToken": api_token,
@@ -119,13 +131,13 @@ class HtmlScreenshotNode:
                 "params": json.dumps(params),
                 "sync": sync
             }
-            
+
             # 设置请求头
             headers = {
                 "Content-Type": "application/json",
                 "poify-token": api_token
             }
-            
+
             # 配置代理
             request_kwargs = {
                 "headers": headers,
@@ -134,79 +146,190 @@ class HtmlScreenshotNode:
             }
             if use_proxy:
                 request_kwargs["proxies"] = {"http": None, "https": None}
-            
+
             # 发送请求
-            response = requests.post(api_url, **request_kwargs)
-            
+            response = gateway_client.post(api_url, **request_kwargs)
+
             response_text = response.text
-            
-            if response.status_code == 200:
-                try:
-                    response_json = response.json()
-                    
-                    if response_json.get("code") == 1:
-                        data = response_json.get("data", {})
-                        task_id = data.get("taskId", "")
-                        
-                        resource = data.get("resource", {})
-                        design_ai_resource_items = resource.get("design_ai_resource_items", [])
-                        design_ai_text_resource_items = resource.get("design_ai_text_resource_items", [])
-                        
-                        # 提取JSON数据（如果是screenshotWithJson类型）
-                        extracted_json = ""
-                        if task_type == "screenshotWithJson" and design_ai_text_resource_items:
-                            for text_item in design_ai_text_resource_items:
-                                text_content = text_item.get("text", "")
-                                if text_content:
-                                    extracted_json = text_content
-                                    break  # 取第一个有内容的text
-                        
-                        if design_ai_resource_items and len(design_ai_resource_items) > 0:
-                            item = design_ai_resource_items[0]
-                            image_url_big = item.get("image_url_big", "")
-                            
-                            # 只下载大尺寸图片
-                            image_big, success_big, msg_big = self._download_image(image_url_big, timeout, use_proxy) if image_url_big else (None, False, "没有big尺寸URL")
-                            
-                            # 如果下载失败，使用空白图片
-                            if not success_big:
-                                image_big = self._create_blank_image()
-                            
-                            if success_big:
-                                message_parts = [f"HTML截图生成成功 - Big: ✓"]
-                                if task_type == "screenshotWithJson" and extracted_json:
-                                    message_parts.append("JSON提取成功")
-                                elif task_type == "screenshotWithJson":
-                                    message_parts.append("JSON提取失败")
-                                message = " | ".join(message_parts)
-                            else:
-                                message = f"图片下载失败 - Big: {msg_big}"
-                            
-                            return (image_big, success_big, message, task_id, image_url_big, extracted_json, response_text)
-                        else:
-                            blank_image = self._create_blank_image()
-                            return (blank_image, False, "API返回数据中没有图片资源", task_id, "", extracted_json, response_text)
-                    else:
-                        error_msg = response_json.get("errorMsg", "未知错误")
-                        blank_image = self._create_blank_image()
-                        return (blank_image, False, f"API返回错误: {error_msg}", "", "", "", response_text)
-                        
-                except json.JSONDecodeError:
-                    blank_image = self._create_blank_image()
-                    return (blank_image, False, f"API响应格式错误: {response_text}", "", "", "", response_text)
+            result["response_data"] = response_text
+
+            if response.status_code != 200:
+                result["message"] = f"HTTP错误 {response.status_code}: {response_text}"
+                return result
+
+            try:
+                response_json = response.json()
+            except json.JSONDecodeError:
+                result["message"] = f"API响应格式错误: {response_text}"
+                return result
+
+            if response_json.get("code") != 1:
+                error_msg = response_json.get("errorMsg", "未知错误")
+                result["message"] = f"API返回错误: {error_msg}"
+                return result
+
+            data = response_json.get("data", {})
+            result["task_id"] = data.get("taskId", "")
+
+            resource = data.get("resource", {})
+            design_ai_resource_items = resource.get("design_ai_resource_items", [])
+            design_ai_text_resource_items = resource.get("design_ai_text_resource_items", [])
+
+            # 提取JSON数据（如果是screenshotWithJson类型）
+            if task_type == "screenshotWithJson" and design_ai_text_resource_items:
+                for text_item in design_ai_text_resource_items:
+                    text_content = text_item.get("text", "")
+                    if text_content:
+                        result["extracted_json"] = text_content
+                        break  # 取第一个有内容的text
+
+            if design_ai_resource_items and len(design_ai_resource_items) > 0:
+                result["image_url_big"] = design_ai_resource_items[0].get("image_url_big", "")
+                result["success"] = True
             else:
-                blank_image = self._create_blank_image()
-                return (blank_image, False, f"HTTP错误 {response.status_code}: {response_text}", "", "", "", response_text)
-                
+                result["message"] = "API返回数据中没有图片资源"
+            return result
+
         except requests.Timeout:
-            blank_image = self._create_blank_image()
-            return (blank_image, False, f"请求超时({timeout}秒)", "", "", "", "")
+            result["message"] = f"请求超时({timeout}秒)"
         except requests.RequestException as e:
-            blank_image = self._create_blank_image()
-            return (blank_image, False, f"网络请求错误: {str(e)}", "", "", "", "")
+            result["message"] = f"网络请求错误: {str(e)}"
         except Exception as e:
-            blank_image = self._create_blank_image()
-            return (blank_image, False, f"处理过程中出现错误: {str(e)}", "", "", "", "")
+            result["message"] = f"处理过程中出现错误: {str(e)}"
+        return result
+
+    def _success_message(self, task_type, extracted_json):
+        message_parts = [f"HTML截图生成成功 - Big: ✓"]
+        if task_type == "screenshotWithJson" and extracted_json:
+            message_parts.append("JSON提取成功")
+        elif task_type == "screenshotWithJson":
+            message_parts.append("JSON提取失败")
+        return " | ".join(message_parts)
+
+    def generate_screenshot(self, html_code, api_token, creator, task_type, canvas_width, canvas_height,
+                          width, height, x, y, sync, timeout, api_url, use_proxy,
+                          batch_tasks="", max_concurrency=4):
+        if batch_tasks and batch_tasks.strip():
+            return self._generate_batch(html_code, api_token, creator, task_type, canvas_width, canvas_height,
+                                        width, height, x, y, sync, timeout, api_url, use_proxy,
+                                        batch_tasks, max_concurrency)
+
+        # 构建参数
+        params = {
+            "canvasWidth": canvas_width,
+            "canvasHeight": canvas_height,
+            "width": width,
+            "height": height,
+            "x": x,
+            "y": y
+        }
+        result = self._render(html_code, api_token, creator, task_type, params, sync, timeout, api_url, use_proxy)
+        task_id, image_url_big = result["task_id"], result["image_url_big"]
+        extracted_json, response_text = result["extracted_json"], result["response_data"]
+        if not result["success"]:
+            return (self._create_blank_image(), False, result["message"], task_id, "", extracted_json, response_text)
+
+        # 只下载大尺寸图片
+        image_big, success_big, msg_big = self._download_image(image_url_big, timeout, use_proxy) if image_url_big else (None, False, "没有big尺寸URL")
+
+        # 如果下载失败，使用空白图片
+        if not success_big:
+            image_big = self._create_blank_image()
+
+        if success_big:
+            message = self._success_message(task_type, extracted_json)
+        else:
+            message = f"图片下载失败 - Big: {msg_big}"
+
+        return (image_big, success_big, message, task_id, image_url_big, extracted_json, response_text)
+
+    def _generate_batch(self, html_code, api_token, creator, task_type, canvas_width, canvas_height,
+                        width, height, x, y, sync, timeout, api_url, use_proxy, batch_tasks, max_concurrency):
+        """
+        批量模式：并发提交各 (画布, 裁剪) 任务，在共享连接池上并发下载结果，返回堆叠的IMAGE批次
+
+        task_id / image_url_big / extracted_json 为按任务顺序的JSON列表，response_data 为逐项结果的JSON列表。
+        尺寸不一致的结果不缩放，右下补白到最大尺寸，失败项使用白色图片占位。
+        """
+        try:
+            tasks = json.loads(batch_tasks)
+            if isinstance(tasks, dict):
+                tasks = [tasks]
+            if not isinstance(tasks, list) or not tasks:
+                raise ValueError("batch_tasks 必须是非空JSON列表")
+        except (json.JSONDecodeError, ValueError) as e:
+            return (self._create_blank_image(), False, f"批量参数解析失败: {str(e)}", "[]", "[]", "[]", "[]")
+
+        defaults = {"canvas_width": canvas_width, "canvas_height": canvas_height,
+                    "width": width, "height": height, "x": x, "y": y}
+        params_list = []
+        for task in tasks:
+            merged = {**defaults, **{k: v for k, v in task.items() if k in defaults}}
+            params_list.append({
+                "canvasWidth": merged["canvas_width"],
+                "canvasHeight": merged["canvas_height"],
+                "width": merged["width"],
+                "height": merged["height"],
+                "x": merged["x"],
+                "y": merged["y"]
+            })
+
+        def render(params):
+            return self._render(html_code, api_token, creator, task_type, params, sync, timeout, api_url, use_proxy)
+
+        workers = max(1, min(int(max_concurrency), len(params_list)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="design-ai-html") as pool:
+            results = list(pool.map(render, params_list))
+
+        urls = [result["image_url_big"] if result["success"] else "" for result in results]
+        proxies = {"http": None, "https": None} if use_proxy else None
+        pending = [idx for idx, url in enumerate(urls) if url]
+        # 与单次模式一致，透明像素合成到白色背景上
+        fetched = image_pipeline.fetch_arrays([urls[idx] for idx in pending], proxies, timeout, max_concurrency,
+                                              background=(255, 255, 255))
+        arrays = [None] * len(results)
+        for idx, array in zip(pending, fetched):
+            arrays[idx] = array
+
+        items = []
+        for idx, (params, result, array) in enumerate(zip(params_list, results, arrays)):
+            if array is not None:
+                message = self._success_message(task_type, result["extracted_json"])
+            elif result["success"]:
+                message = "图片下载失败 - Big: 下载错误" if result["image_url_big"] else "图片下载失败 - Big: 没有big尺寸URL"
+            else:
+                message = result["message"]
+            items.append({
+                "params": params,
+                "success": array is not None,
+                "message": message,
+                "task_id": result["task_id"],
+                "image_url_big": result["image_url_big"],
+                "extracted_json": result["extracted_json"]
+            })
+
+        if any(array is not None for array in arrays):
+            # 不同画布尺寸不缩放，右下补白到最大尺寸；失败项整张为白色
+            blank = np.full((1, 1, 3), 255, dtype=np.uint8)
+            images = image_pipeline.stack_arrays([array if array is not None else blank for array in arrays], pad_value=255)
+        else:
+            images = self._create_blank_image().repeat(len(arrays), 1, 1, 1)
+
+        succeeded = sum(1 for item in items if item["success"])
+        message = f"HTML批量截图完成: 成功 {succeeded}/{len(items)}"
+        failures = [f"#{i + 1}: {item['message']}" for i, item in enumerate(items) if not item["success"]]
+        if failures:
+            message += "\n" + "\n".join(failures)
+
+        return (
+            images,
+            succeeded == len(items),
+            message,
+            json.dumps([item["task_id"] for item in items], ensure_ascii=False),
+            json.dumps([item["image_url_big"] for item in items], ensure_ascii=False),
+            json.dumps([item["extracted_json"] for item in items], ensure_ascii=False),
+            json.dumps(items, ensure_ascii=False, indent=2)
+        )
 
     def _download_image(self, image_url, timeout, use_proxy=False):
         """下载图片并转换为tensor"""
@@ -216,7 +339,7 @@ class HtmlScreenshotNode:
             if use_proxy:
                 request_kwargs["proxies"] = {"http": None, "https": None}
             
-            response = requests.get(image_url, **request_kwargs)
+            response = gateway_client.get(image_url, **request_kwargs)
             if response.status_code == 200:
                 # 从响应内容加载图片
                 image = Image.open(BytesIO(response.content))
@@ -1,9 +1,9 @@
 import torch
 import numpy as np
-import requests
 from PIL import Image
 from io import BytesIO
 import json
+from ..utils import gateway_client
 
 class ApiResponseViewerNode:
     @classmethod
@@ -138,7 +138,7 @@ class ApiResponseViewerNode:
     def _download_image(self, image_url, timeout):
         """下载图片并转换为tensor"""
         try:
-            response = requests.get(image_url, timeout=timeout)
+            response = gateway_client.get(image_url, timeout=timeout)
             if response.status_code == 200:
                 # 从响应内容加载图片
                 image = Image.open(BytesIO(response.content))
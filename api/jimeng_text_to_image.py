@@ -8,6 +8,7 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client
 
 class JiMengTextToImageNode:
     @classmethod
@@ -81,13 +82,7 @@ class JiMengTextToImageNode:
     CATEGORY = "✨✨✨design-ai/api"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod.corp.kuaishou.com", 
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = gateway_client.ENVIRONMENTS
 
     def generate_image(self, environment, api_key, prompt, response_format, size, 
                       seed, guidance_scale, watermark, timeout, use_proxy, custom_base_url="", custom_endpoint="/llm-serve/v1/images/generations"):
@@ -144,7 +139,7 @@ class JiMengTextToImageNode:
                 request_kwargs["proxies"] = {"http": None, "https": None}
             
             # 发送请求
-            response = requests.post(url, **request_kwargs)
+            response = gateway_client.post(url, model=payload["model"], **request_kwargs)
             
             print(f"[即梦文生图] 响应状态码: {response.status_code}")
             
@@ -216,7 +211,7 @@ class JiMengTextToImageNode:
                             if use_proxy:
                                 download_kwargs["proxies"] = {"http": None, "https": None}
                             
-                            img_response = requests.get(image_url, **download_kwargs)
+                            img_response = gateway_client.get(image_url, **download_kwargs)
                             img_response.raise_for_status()
                             image = Image.open(io.BytesIO(img_response.content))
                             
@@ -5,6 +5,7 @@ from PIL import Image
 from io import BytesIO
 import json
 import time
+from ..utils import gateway_client
 
 class JsEditorNode:
     @classmethod
@@ -83,7 +84,7 @@ class JsEditorNode:
                 request_kwargs["proxies"] = {"http": None, "https": None}
             
             # 发送请求
-            response = requests.post(api_url, **request_kwargs)
+            response = gateway_client.post(api_url, **request_kwargs)
             
             response_text = response.text
             
@@ -174,7 +175,7 @@ class JsEditorNode:
             if use_proxy:
                 request_kwargs["proxies"] = {"http": None, "https": None}
             
-            response = requests.get(image_url, **request_kwargs)
+            response = gateway_client.get(image_url, **request_kwargs)
             if response.status_code == 200:
                 # 从响应内容加载图片
                 image = Image.open(BytesIO(response.content))
@@ -8,9 +8,9 @@ import io
 import os
 from PIL import Image
 from urllib.parse import urlparse
-import jwt
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client, jwt_cache
 
 class KetuTextToImageNode:
     @classmethod
@@ -104,18 +104,8 @@ class KetuTextToImageNode:
         self.api_url = "https://api-beijing.klingai.com/v1/images/generations"
 
     def encode_jwt_token(self, access_key, secret_key):
-        """生成JWT token"""
-        headers = {
-            "alg": "HS256",
-            "typ": "JWT"
-        }
-        payload = {
-            "iss": access_key,
-            "exp": int(time.time()) + 1800,  # 30分钟有效期
-            "nbf": int(time.time()) - 5      # 开始生效时间
-        }
-        token = jwt.encode(payload, secret_key, headers=headers)
-        return token
+        """获取JWT token（按密钥缓存复用，临近过期时后台刷新）"""
+        return jwt_cache.get_token(access_key, secret_key)
 
     def tensor_to_base64(self, image_tensor):
         """将图像tensor转换为base64编码"""
@@ -184,7 +174,7 @@ class KetuTextToImageNode:
         """提交生成任务"""
         headers = {
             "Content-Type": "application/json",
-            "Authorization": f"Bearer {jwt_token}",
+            "Authorization": f"Bearer {jwt_cache.current(jwt_token)}",
             "User-Agent": "ComfyUI-Ketu/1.0"
         }
         
@@ -198,7 +188,7 @@ class KetuTextToImageNode:
             request_kwargs["proxies"] = {"http": None, "https": None}
         
         try:
-            response = requests.post(self.api_url, **request_kwargs)
+            response = gateway_client.post(self.api_url, **request_kwargs)
             response_data = response.json()
             
             if not response.ok:
@@ -219,7 +209,7 @@ class KetuTextToImageNode:
         query_url = f"https://api-beijing.klingai.com/v1/images/generations/{task_id}"
         headers = {
             "Content-Type": "application/json",
-            "Authorization": f"Bearer {jwt_token}",
+            "Authorization": f"Bearer {jwt_cache.current(jwt_token)}",
             "User-Agent": "ComfyUI-Ketu/1.0"
         }
         
@@ -232,7 +222,7 @@ class KetuTextToImageNode:
             request_kwargs["proxies"] = {"http": None, "https": None}
         
         try:
-            response = requests.get(query_url, **request_kwargs)
+            response = gateway_client.get(query_url, **request_kwargs)
             response_data = response.json()
             
             if not response.ok:
@@ -284,7 +274,7 @@ class KetuTextToImageNode:
             if use_proxy:
                 request_kwargs["proxies"] = {"http": None, "https": None}
             
-            response = requests.get(image_url, **request_kwargs)
+            response = gateway_client.get(image_url, **request_kwargs)
             response.raise_for_status()
             
             image = Image.open(io.BytesIO(response.content))
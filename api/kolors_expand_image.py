@@ -8,6 +8,7 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client
 
 class KolorsExpandImageNode:
     @classmethod
@@ -145,13 +146,7 @@ class KolorsExpandImageNode:
     CATEGORY = "✨✨✨design-ai/api"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod.corp.kuaishou.com", 
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = gateway_client.ENVIRONMENTS
 
     def tensor_to_base64(self, tensor):
         """将tensor转换为base64编码的图像"""
@@ -209,7 +204,7 @@ class KolorsExpandImageNode:
         if use_proxy:
             request_kwargs["proxies"] = {"http": None, "https": None}
         
-        response = requests.post(url, **request_kwargs)
+        response = gateway_client.post(url, **request_kwargs)
         
         print(f"[可图扩图] 响应状态码: {response.status_code}")
         print(f"[可图扩图] 响应头: {dict(response.headers)}")
@@ -270,7 +265,7 @@ class KolorsExpandImageNode:
                 if use_proxy:
                     poll_kwargs["proxies"] = {"http": None, "https": None}
                 
-                response = requests.get(url, **poll_kwargs)
+                response = gateway_client.get(url, **poll_kwargs)
                 response_data = response.json()
                 
                 print(f"[可图扩图] 轮询响应状态码: {response.status_code}")
@@ -424,7 +419,7 @@ class KolorsExpandImageNode:
                     if use_proxy:
                         download_kwargs["proxies"] = {"http": None, "https": None}
                     
-                    img_response = requests.get(image_url, **download_kwargs)
+                    img_response = gateway_client.get(image_url, **download_kwargs)
                     img_response.raise_for_status()
                     result_image = Image.open(io.BytesIO(img_response.content))
                     
@@ -8,6 +8,7 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client
 
 class KolorsTextToImageNode:
     @classmethod
@@ -110,13 +111,7 @@ class KolorsTextToImageNode:
     CATEGORY = "✨✨✨design-ai/api"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod.corp.kuaishou.com", 
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = gateway_client.ENVIRONMENTS
 
     def submit_task(self, environment, api_key, payload, use_proxy, custom_base_url="", custom_submit_endpoint="/ai-serve/v1/ktu/images/generations"):
         """提交生成任务"""
@@ -149,7 +144,7 @@ class KolorsTextToImageNode:
         if use_proxy:
             request_kwargs["proxies"] = {"http": None, "https": None}
         
-        response = requests.post(url, **request_kwargs)
+        response = gateway_client.post(url, **request_kwargs)
         
         print(f"[可图文生图] 响应状态码: {response.status_code}")
         
@@ -201,7 +196,7 @@ class KolorsTextToImageNode:
                 if use_proxy:
                     poll_kwargs["proxies"] = {"http": None, "https": None}
                 
-                response = requests.get(url, **poll_kwargs)
+                response = gateway_client.get(url, **poll_kwargs)
                 response_data = response.json()
                 
                 if not response.ok:
@@ -339,7 +334,7 @@ class KolorsTextToImageNode:
                     if use_proxy:
                         download_kwargs["proxies"] = {"http": None, "https": None}
                     
-                    img_response = requests.get(image_url, **download_kwargs)
+                    img_response = gateway_client.get(image_url, **download_kwargs)
                     img_response.raise_for_status()
                     result_image = Image.open(io.BytesIO(img_response.content))
                     
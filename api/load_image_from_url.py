@@ -4,6 +4,7 @@ import requests
 from PIL import Image
 from io import BytesIO
 import time
+from ..utils import gateway_client, retry_policy
 
 class LoadImageFromURL:
     @classmethod
@@ -72,13 +73,14 @@ class LoadImageFromURL:
         if use_proxy:
             request_kwargs["proxies"] = {"http": None, "https": None}
 
-        # 尝试从URL加载图片
+        # 尝试从URL加载图片，失败时按统一策略指数退避（含随机抖动）
+        policy = retry_policy.RetryPolicy(max_attempts=max_retries + 1, budget=None)
         retry_count = 0
         while retry_count <= max_retries:
             try:
                 print(f"尝试加载图片 (第 {retry_count + 1} 次): {url}")
                 
-                response = requests.get(url, **request_kwargs)
+                response = gateway_client.get(url, retry=False, **request_kwargs)
                 if response.status_code == 200:
                     # 从响应内容加载图片
                     image = Image.open(BytesIO(response.content))
@@ -123,8 +125,9 @@ class LoadImageFromURL:
             
             retry_count += 1
             if retry_count <= max_retries:
-                print(f"等待1秒后重试...")
-                time.sleep(1)  # 重试前等待1秒
+                delay = policy.backoff(retry_count)
+                print(f"等待{delay:.1f}秒后重试...")
+                time.sleep(delay)
 
         if not success:
             final_message = f"加载图片失败，共尝试 {max_retries + 1} 次。使用备用图片。最后错误: {message}"
@@ -1,5 +1,5 @@
 # nodes/openai_text_gen_node.py
-from openai import OpenAI
+from ..utils import openai_clients
 
 class OpenAITextGenNode:
     @classmethod
@@ -40,7 +40,7 @@ class OpenAITextGenNode:
 
     def generate_text(self, api_key, api_base, model, system_prompt, input_text, temperature):
         try:
-            client = OpenAI(api_key=api_key, base_url=api_base)
+            client = openai_clients.get_client(api_key, api_base)
             response = client.chat.completions.create(
                 model=model,
                 messages=[
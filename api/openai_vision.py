@@ -1,9 +1,10 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
 from openai import OpenAI
+from ..utils import image_encoder, openai_clients
 
 class OpenAIVisionNode:
-    def __init__(self):
-        self._clients = {}
-
     @classmethod
     def INPUT_TYPES(s):
         return {
@@ -43,11 +44,32 @@ class OpenAIVisionNode:
     CATEGORY = "✨✨✨design-ai/llm"
 
     def _get_client(self, api_key: str, api_base: str, timeout: int) -> OpenAI:
-        """简单的客户端缓存"""
-        cache_key = f"{api_key}:{api_base}:{timeout}"
-        if cache_key not in self._clients:
-            self._clients[cache_key] = OpenAI(api_key=api_key, base_url=api_base, timeout=timeout)
-        return self._clients[cache_key]
+        """获取进程级共享的客户端（跨节点实例复用连接池）"""
+        return openai_clients.get_client(api_key, api_base, timeout)
+
+    def _request(self, client, model, base64_image, prompt, temperature, timeout):
+        """发送单张图像的分析请求，返回输出文本"""
+        response = client.chat.completions.create(
+            model=model,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/jpeg;base64,{base64_image}"
+                            },
+                        },
+                    ],
+                }
+            ],
+            temperature=temperature,
+            max_tokens=500,
+            timeout=timeout
+        )
+        return response.choices[0].message.content
 
     def analyze_image(self, api_key, api_base, model, base64_image, prompt, temperature, timeout):
         try:
@@ -58,31 +80,55 @@ class OpenAIVisionNode:
             # 获取缓存的客户端实例
             client = self._get_client(api_key, api_base, timeout)
 
-            # 发送请求
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                },
-                            },
-                        ],
-                    }
-                ],
-                temperature=temperature,
-                max_tokens=500,
-                timeout=timeout
-            )
-            
-            return (response.choices[0].message.content, True)
+            output_text = self._request(client, model, base64_image, prompt, temperature, timeout)
+            return (output_text, True)
 
         except Exception as e:
             error_msg = f"Failed to analyze image: {str(e)}"
             print(error_msg)
-            return (error_msg, False)
\ No newline at end of file
+            return (error_msg, False)
+
+
+class OpenAIVisionBatchNode(OpenAIVisionNode):
+    """对IMAGE批次逐帧分析：并行编码、有界并发请求，按输入顺序返回JSON列表"""
+
+    @classmethod
+    def INPUT_TYPES(s):
+        inputs = super().INPUT_TYPES()
+        required = dict(inputs["required"])
+        del required["base64_image"]
+        required["images"] = ("IMAGE",)
+        required["max_concurrency"] = ("INT", {
+            "default": 8,
+            "min": 1,
+            "max": 32,
+            "step": 1,
+            "tooltip": "同时进行的请求数上限"
+        })
+        return {"required": required}
+
+    RETURN_TYPES = ("STRING", "BOOLEAN")
+    RETURN_NAMES = ("results_json", "success")
+    FUNCTION = "analyze_images"
+
+    def analyze_images(self, api_key, api_base, model, images, prompt, temperature, timeout, max_concurrency=8):
+        client = self._get_client(api_key, api_base, timeout)
+
+        def analyze_one(index):
+            # 编码放在工作线程内，各帧的编码与其他帧的请求重叠进行
+            try:
+                base64_image = image_encoder.to_base64(images[index], "JPEG", quality=90)
+                output_text = self._request(client, model, base64_image, prompt, temperature, timeout)
+                return {"index": index, "success": True, "output": output_text}
+            except Exception as e:
+                print(f"Failed to analyze image #{index}: {str(e)}")
+                return {"index": index, "success": False, "output": f"Failed to analyze image: {str(e)}"}
+
+        count = images.shape[0]
+        workers = max(1, min(int(max_concurrency), count))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="design-ai-vision") as pool:
+            results = list(pool.map(analyze_one, range(count)))
+
+        succeeded = sum(result["success"] for result in results)
+        print(f"批量图像分析完成: 成功 {succeeded}/{count}")
+        return (json.dumps(results, ensure_ascii=False, indent=2), succeeded == count)
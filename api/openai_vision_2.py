@@ -1,9 +1,7 @@
 from openai import OpenAI
+from ..utils import openai_clients
 
 class OpenAIVision2Node:
-    def __init__(self):
-        self._clients = {}
-
     @classmethod
     def INPUT_TYPES(s):
         return {
@@ -48,11 +46,8 @@ class OpenAIVision2Node:
     CATEGORY = "✨✨✨design-ai/llm"
 
     def _get_client(self, api_key: str, api_base: str, timeout: int) -> OpenAI:
-        """简单的客户端缓存"""
-        cache_key = f"{api_key}:{api_base}:{timeout}"
-        if cache_key not in self._clients:
-            self._clients[cache_key] = OpenAI(api_key=api_key, base_url=api_base, timeout=timeout)
-        return self._clients[cache_key]
+        """获取进程级共享的客户端（跨节点实例复用连接池）"""
+        return openai_clients.get_client(api_key, api_base, timeout)
 
     def analyze_images(self, api_key, api_base, model, base64_image1, prompt, temperature, timeout, base64_image2=None):
         try:
@@ -1,5 +1,6 @@
 import requests
 import json
+from ..utils import gateway_client
 
 class PPInfraGPTNode:
     @classmethod
@@ -99,7 +100,7 @@ class PPInfraGPTNode:
             }
 
             # 发送API请求
-            response = requests.post(
+            response = gateway_client.post(
                 "https://api.ppinfra.com/v3/openai/chat/completions",
                 headers=headers,
                 json=payload,
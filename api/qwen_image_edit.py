@@ -8,6 +8,7 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client
 
 class QwenImageEditNode:
     @classmethod
@@ -71,13 +72,7 @@ class QwenImageEditNode:
     CATEGORY = "✨✨✨design-ai/api"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging-sgp.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod.corp.kuaishou.com", 
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = gateway_client.QWEN_ENVIRONMENTS
 
     def edit_image(self, environment, api_key, image, prompt, negative_prompt, 
                    watermark, timeout, use_proxy, image_download_proxy, custom_base_url="", custom_endpoint="/ai-serve/v1/qwen-image/multimodal-generation/generation"):
@@ -155,7 +150,7 @@ class QwenImageEditNode:
                 request_kwargs["proxies"] = {"http": None, "https": None}
             
             # 发送同步请求
-            response = requests.post(api_url, **request_kwargs)
+            response = gateway_client.post(api_url, **request_kwargs)
             
             print(f"[Qwen-Image Edit] 响应状态码: {response.status_code}")
             
@@ -249,7 +244,7 @@ class QwenImageEditNode:
                                 print(f"[Qwen-Image Edit] 图片下载禁用代理")
                                 download_kwargs["proxies"] = {"http": None, "https": None}
                             
-                            img_response = requests.get(image_url, **download_kwargs)
+                            img_response = gateway_client.get(image_url, **download_kwargs)
                             print(f"[Qwen-Image Edit] 下载响应状态码: {img_response.status_code}")
                             
                             if img_response.status_code == 200:
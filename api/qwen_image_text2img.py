@@ -8,6 +8,7 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client
 
 class QwenImageText2ImgNode:
     @classmethod
@@ -89,13 +90,7 @@ class QwenImageText2ImgNode:
     CATEGORY = "✨✨✨design-ai/api"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging-sgp.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod.corp.kuaishou.com", 
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = gateway_client.QWEN_ENVIRONMENTS
 
     def generate_image(self, environment, api_key, prompt, image_count, 
                       image_size, prompt_extend, watermark, timeout, poll_interval, use_proxy, image_download_proxy, custom_base_url="", custom_submit_endpoint="/ai-serve/v1/qwen-image/text2image/image-synthesis", custom_query_endpoint="/ai-serve/v1/qwen-image-tasks/{task_id}"):
@@ -156,7 +151,7 @@ class QwenImageText2ImgNode:
                 submit_kwargs["proxies"] = {"http": None, "https": None}
             
             # 1. 提交任务
-            response = requests.post(submit_url, **submit_kwargs)
+            response = gateway_client.post(submit_url, **submit_kwargs)
             
             print(f"[Qwen-Image] 任务提交响应状态码: {response.status_code}")
             
@@ -224,7 +219,7 @@ class QwenImageText2ImgNode:
                 if use_proxy:
                     poll_kwargs["proxies"] = {"http": None, "https": None}
                 
-                response = requests.get(query_url, **poll_kwargs)
+                response = gateway_client.get(query_url, **poll_kwargs)
                 
                 if response.status_code != 200:
                     print(f"[Qwen-Image] 查询失败 {response.status_code}: {response.text}")
@@ -293,7 +288,7 @@ class QwenImageText2ImgNode:
                         print(f"[Qwen-Image] 图片下载禁用代理")
                         download_kwargs["proxies"] = {"http": None, "https": None}
                     
-                    img_response = requests.get(image_url, **download_kwargs)
+                    img_response = gateway_client.get(image_url, **download_kwargs)
                     print(f"[Qwen-Image] 下载响应状态码: {img_response.status_code}")
                     
                     if img_response.status_code == 200:
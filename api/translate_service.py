@@ -1,5 +1,5 @@
-import requests
 import json
+from ..utils import gateway_client, translate_cache
 
 class TranslateServiceNode:
     def __init__(self):
@@ -26,6 +26,14 @@ class TranslateServiceNode:
                     "default": "https://design-ai.staging.kuaishou.com",
                     "multiline": False
                 }),
+                "batch_segments": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "按行拆分为多个片段，未命中缓存的片段合并为一次请求"
+                }),
+                "use_cache": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "使用本地持久化翻译缓存，相同片段不再重复请求"
+                }),
             }
         }
 
@@ -34,43 +42,97 @@ class TranslateServiceNode:
     FUNCTION = "translate_text"
     CATEGORY = "✨✨✨design-ai/translate"
 
-    def translate_text(self, text, from_lang, to_lang, translate_type, base_url=None):
+    def _endpoint(self, base_url):
+        return f"{base_url}/api/comfy/translate"
+
+    def _request(self, base_url, word, from_lang, to_lang, translate_type):
+        """发送一次翻译请求，返回响应数据"""
+        payload = {
+            "word": word,
+            "from": from_lang,
+            "to": to_lang,
+            "type": translate_type
+        }
+        response = gateway_client.post(
+            self._endpoint(base_url),
+            json=payload,
+            headers={"Content-Type": "application/json"},
+            proxies={"http": None, "https": None}
+        )
+        return response.json()
+
+    def _translate_segments(self, segments, base_url, from_lang, to_lang, translate_type):
+        """
+        以一次请求翻译去重后的片段（多个片段以换行合并），返回 (响应数据, {片段: 译文})
+
+        请求失败时译文为None；译文行数与片段数不一致时返回空字典，由调用方改为整段翻译。
+        """
+        data = self._request(base_url, "\n".join(segments), from_lang, to_lang, translate_type)
+        if data.get("code") != 1:
+            return data, None
+        if len(segments) == 1:
+            return data, {segments[0]: data["word"]}
+        lines = data["word"].split("\n")
+        if len(lines) != len(segments):
+            print(f"[Translate] 合并请求返回 {len(lines)} 行，与 {len(segments)} 个片段不一致，改为整段翻译")
+            return data, {}
+        return data, dict(zip(segments, lines))
+
+    def _failure(self, data):
+        """把失败的响应数据转换为节点输出"""
+        error_msg = f"Translation failed: {data.get('errorMsg', 'Unknown error')}"
+        print(error_msg)
+        return (error_msg, False, json.dumps(data, ensure_ascii=False, indent=2))
+
+    def translate_text(self, text, from_lang, to_lang, translate_type, base_url=None,
+                       batch_segments=False, use_cache=True):
         try:
             if not text:
                 return ("No text provided", False, "{}")
 
             # 使用自定义 base_url 或默认值
             actual_base_url = base_url if base_url else self._base_url
+            endpoint = self._endpoint(actual_base_url)
 
-            # 准备请求数据
-            payload = {
-                "word": text,
-                "from": from_lang,
-                "to": to_lang,
-                "type": translate_type
-            }
+            # 拆分片段：空行原样保留，不参与翻译
+            lines = text.split("\n") if batch_segments else [text]
+            segments = list(dict.fromkeys(line for line in lines if line.strip()))
+            keys = {segment: translate_cache.make_key(endpoint, segment, from_lang, to_lang, translate_type) for segment in segments}
+
+            translations = {}
+            if use_cache:
+                hits = translate_cache.get_many(keys.values())
+                translations = {segment: hits[key] for segment, key in keys.items() if key in hits}
+            misses = [segment for segment in segments if segment not in translations]
+
+            if misses:
+                data, translated = self._translate_segments(misses, actual_base_url, from_lang, to_lang, translate_type)
+                if translated is None:
+                    return self._failure(data)
+                if not translated:
+                    # 片段无法对齐时与原先一样整段请求一次，结果不写入片段缓存
+                    data = self._request(actual_base_url, text, from_lang, to_lang, translate_type)
+                    if data.get("code") != 1:
+                        return self._failure(data)
+                    return (data["word"], True, json.dumps(data, ensure_ascii=False, indent=2))
+                raw_json = json.dumps(data, ensure_ascii=False, indent=2)
+                translations.update(translated)
+                if use_cache:
+                    translate_cache.put_many({keys[segment]: value for segment, value in translated.items()})
 
-            # 发送翻译请求
-            response = requests.post(
-                f"{actual_base_url}/api/comfy/translate",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                proxies={"http": None, "https": None}
-            )
-            
-            # 检查响应
-            data = response.json()
-            # 将响应数据转换为格式化的 JSON 字符串
-            raw_json = json.dumps(data, ensure_ascii=False, indent=2)
-            
-            if data["code"] == 1:
-                return (data["word"], True, raw_json)
-            else:
-                error_msg = f"Translation failed: {data.get('errorMsg', 'Unknown error')}"
-                print(error_msg)
-                return (error_msg, False, raw_json)
+            result = "\n".join(translations.get(line, line) for line in lines)
+            if not misses:
+                print(f"[Translate] 全部 {len(segments)} 个片段命中缓存")
+                raw_json = json.dumps({"code": 1, "word": result, "cached": True}, ensure_ascii=False, indent=2)
+            elif len(lines) > 1:
+                raw_json = json.dumps(
+                    {"code": 1, "word": result, "cached_segments": len(segments) - len(misses),
+                     "requested_segments": len(misses), "last_response": data},
+                    ensure_ascii=False, indent=2
+                )
+            return (result, True, raw_json)
 
         except Exception as e:
             error_msg = f"Translation request failed: {str(e)}"
             print(error_msg)
-            return (error_msg, False, "{}") 
\ No newline at end of file
+            return (error_msg, False, "{}")
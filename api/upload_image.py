@@ -4,6 +4,7 @@ import requests
 from PIL import Image
 import io
 import json
+from ..utils import gateway_client
 
 class UploadImageNode:
     @classmethod
@@ -188,7 +189,7 @@ class UploadImageNode:
             request_kwargs["proxies"] = {"http": None, "https": None}
         
         try:
-            response = requests.post(api_url, **request_kwargs)
+            response = gateway_client.post(api_url, **request_kwargs)
             
             # 解析响应
             response_text = response.text
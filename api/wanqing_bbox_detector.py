@@ -1,7 +1,17 @@
 import requests
+import hashlib
 import json
 import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List
+from ..utils import gateway_client, rate_limiter
+
+# 批量检测结果缓存：(img_url哈希, target, model) -> 检测结果，进程内按LRU保留
+_BULK_CACHE_SIZE = 1024
+_bulk_cache = OrderedDict()
+_bulk_cache_lock = threading.Lock()
 
 class WanqingBboxDetectorNode:
     @classmethod
@@ -210,7 +220,7 @@ class WanqingBboxDetectorNode:
             print(f"检测目标: {target}")
             
             # 发送请求 - 修复UTF-8编码问题
-            response = requests.post(api_url, **request_kwargs)
+            response = gateway_client.post(api_url, model=model, **request_kwargs)
 
             if response.status_code != 200:
                 error_msg = f"请求失败，状态码 {response.status_code}: {response.text}"
@@ -239,4 +249,124 @@ class WanqingBboxDetectorNode:
         except Exception as e:
             error_msg = f"意外错误: {str(e)}"
             print(error_msg)
-            return ("", False, error_msg, api_url, [[[]]], "") 
\ No newline at end of file
+            return ("", False, error_msg, api_url, [[[]]], "")
+
+
+class WanqingBboxBulkDetectorNode(WanqingBboxDetectorNode):
+    """多图片 x 多目标的批量bbox检测：并发请求、网关限流、结果按 (接口, 图片, 目标, 模型) 缓存"""
+
+    @classmethod
+    def INPUT_TYPES(s):
+        inputs = super().INPUT_TYPES()
+        required = dict(inputs["required"])
+        required["img_url"] = ("STRING", {
+            "default": required["img_url"][1]["default"],
+            "multiline": True,
+            "tooltip": "图片的URL地址，每行一个"
+        })
+        required["target"] = ("STRING", {
+            "default": "text",
+            "multiline": True,
+            "tooltip": "检测目标类型，每行或逗号分隔一个"
+        })
+        optional = dict(inputs["optional"])
+        optional["max_concurrency"] = ("INT", {
+            "default": 8,
+            "min": 1,
+            "max": 32,
+            "step": 1,
+            "tooltip": "同时进行的检测请求数上限"
+        })
+        optional["requests_per_second"] = ("FLOAT", {
+            "default": 0.0,
+            "min": 0.0,
+            "max": 100.0,
+            "step": 0.5,
+            "tooltip": "本节点每秒请求数上限（仅作用于本次批量检测），0表示不额外限制，全局限流配置始终生效"
+        })
+        optional["use_cache"] = ("BOOLEAN", {
+            "default": True,
+            "tooltip": "复用相同接口、图片、目标、模型的检测结果"
+        })
+        return {"required": required, "optional": optional}
+
+    RETURN_TYPES = ("STRING", "BOOLEAN", "STRING", "STRING", "BBOXES", "STRING")
+    RETURN_NAMES = ("results_json", "success", "message", "api_endpoint", "bboxes", "bboxes_string")
+    OUTPUT_TOOLTIPS = (
+        "逐项结果列表，每项包含 img_url、target、success 和该项的 bboxes",
+        "全部检测成功时为True",
+        "汇总信息",
+        "API地址",
+        "按图片分组的bbox：[[[x1, y1, x2, y2], ...], ...]，第i项为第i张图片所有目标检测到的框（按目标顺序），未检测到时为空列表",
+        "bboxes 的字符串形式",
+    )
+    FUNCTION = "detect_bboxes"
+
+    def _split(self, text, pattern):
+        return [item.strip() for item in re.split(pattern, text or "") if item.strip()]
+
+    def detect_bboxes(self, api_url: str, token: str, model: str, img_url: str, target: str,
+                      timeout: float, use_proxy: bool, end_user_id: Optional[str] = "wangyihan",
+                      max_concurrency: int = 8, requests_per_second: float = 0.0, use_cache: bool = True):
+        img_urls = self._split(img_url, r"\n")
+        targets = self._split(target, r"[\n,，]")
+        if not img_urls:
+            return ("[]", False, "图片URL是必需的", "", [[[]]], "")
+        if not targets:
+            return ("[]", False, "Target是必需的", "", [[[]]], "")
+
+        # 节点自身的请求速率上限只作用于本次批量检测，不改动进程级的限流配置；
+        # 并发由线程池大小控制，全局限额仍在 gateway_client 中生效
+        governor = None
+        if requests_per_second:
+            governor = rate_limiter.Governor(rate=requests_per_second, burst=max(1.0, requests_per_second))
+        pairs = [(url, item) for url in img_urls for item in targets]
+
+        def detect_one(pair):
+            url, item = pair
+            key = (api_url.strip(), hashlib.sha256(url.encode("utf-8")).hexdigest(), item, model)
+            if use_cache:
+                with _bulk_cache_lock:
+                    if key in _bulk_cache:
+                        _bulk_cache.move_to_end(key)
+                        return _bulk_cache[key], True
+            if governor is not None:
+                governor.acquire()
+            try:
+                result = self.detect_bbox(api_url, token, model, url, item, timeout, use_proxy, end_user_id)
+            finally:
+                if governor is not None:
+                    governor.release()
+            if use_cache and result[1]:
+                with _bulk_cache_lock:
+                    _bulk_cache[key] = result
+                    while len(_bulk_cache) > _BULK_CACHE_SIZE:
+                        _bulk_cache.popitem(last=False)
+            return result, False
+
+        workers = max(1, min(int(max_concurrency), len(pairs)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="design-ai-bbox") as pool:
+            outcomes = list(pool.map(detect_one, pairs))
+
+        # bbox 按图片分组：每张图片一项，包含各目标检测到的框，失败或未检测到的目标不占位
+        results = []
+        bboxes = [[] for _ in img_urls]
+        for index, ((url, item), (result, cached)) in enumerate(zip(pairs, outcomes)):
+            content, success, message, _, item_bboxes, _ = result
+            bboxes[index // len(targets)].extend(box for group in item_bboxes for box in group if box)
+            results.append({
+                "img_url": url,
+                "target": item,
+                "success": success,
+                "cached": cached,
+                "message": message,
+                "response": content,
+                "bboxes": item_bboxes
+            })
+
+        succeeded = sum(1 for result in results if result["success"])
+        cached = sum(1 for result in results if result["cached"])
+        message = f"批量bbox检测完成! 模型: {model}, 成功 {succeeded}/{len(pairs)}, 缓存命中 {cached}"
+        print(message)
+        return (json.dumps(results, ensure_ascii=False, indent=2), succeeded == len(pairs), message,
+                api_url, bboxes, str(bboxes))
@@ -2,6 +2,7 @@ import requests
 import json
 import re
 from typing import Dict, Any, Optional
+from ..utils import gateway_client, sse_stream
 
 class WanqingFlexibleAPINode:
     @classmethod
@@ -61,6 +62,10 @@ class WanqingFlexibleAPINode:
                     "default": False,
                     "tooltip": "是否启用流式输出"
                 }),
+                "early_stop": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "流式输出时，检测到完整的代码块/JSON/HTML后立即结束，不再等待剩余输出；输出只保留该块，其余文字会被丢弃"
+                }),
             },
         }
 
@@ -157,7 +162,7 @@ class WanqingFlexibleAPINode:
 
     def call_wanqing_api(self, api_url: str, token: str, model: str, inputs: str, 
                         timeout: float, use_proxy: bool, end_user_id: Optional[str] = "wangyihan", 
-                        stream: Optional[bool] = False):
+                        stream: Optional[bool] = False, early_stop: Optional[bool] = False):
         
         # 参数验证
         if not api_url.strip():
@@ -199,7 +204,8 @@ class WanqingFlexibleAPINode:
             print(f"流式输出: {stream}")
             
             # 发送请求 - 使用UTF-8编码
-            response = requests.post(api_url, **request_kwargs)
+            stats = sse_stream.StreamStats()
+            response = gateway_client.post(api_url, **request_kwargs)
 
             if response.status_code != 200:
                 error_msg = f"请求失败，状态码 {response.status_code}: {response.text}"
@@ -208,42 +214,50 @@ class WanqingFlexibleAPINode:
 
             # 处理响应
             if stream:
-                # 处理流式响应
+                # 处理流式响应：逐个事件增量解析
                 try:
-                    full_content = ""
+                    detector = sse_stream.BlockDetector()
                     raw_chunks = []
-                    
-                    for line in response.iter_lines():
-                        if line:
-                            line_str = line.decode('utf-8')
-                            raw_chunks.append(line_str)
-                            
-                            if line_str.startswith('data: '):
-                                data_str = line_str[6:]  # Remove 'data: ' prefix
-                                
-                                if data_str.strip() == '[DONE]':
-                                    break
-                                    
-                                try:
-                                    data = json.loads(data_str)
-                                    choices = data.get('choices', [])
-                                    if choices and 'delta' in choices[0]:
-                                        delta = choices[0]['delta']
-                                        if 'content' in delta:
-                                            content = delta['content']
-                                            full_content += content
-                                            print(content, end='', flush=True)
-                                except json.JSONDecodeError:
-                                    continue
-                                    
+                    block = None
+
+                    try:
+                        for data_str in sse_stream.iter_events(response):
+                            raw_chunks.append(f"data: {data_str}")
+                            if data_str.strip() == '[DONE]':
+                                break
+
+                            try:
+                                data = json.loads(data_str)
+                            except json.JSONDecodeError:
+                                continue
+                            stats.on_usage(data.get('usage'))
+                            choices = data.get('choices') or []
+                            content = choices[0].get('delta', {}).get('content') if choices else None
+                            if not content:
+                                continue
+
+                            stats.on_content()
+                            print(content, end='', flush=True)
+                            block = detector.feed(content)
+                            if early_stop and block is not None:
+                                break
+                    finally:
+                        stats.finish()
+                        # 提前结束时关闭连接，服务端停止生成
+                        response.close()
+
                     print()  # New line after streaming
-                    
+
+                    early_stopped = early_stop and block is not None
+                    full_content = block if early_stopped else detector.text
                     cleaned_content = self.clean_markdown_response(full_content)
                     raw_response = '\n'.join(raw_chunks)
-                    success_msg = f"万擎API流式调用完成! 模型: {model}"
+                    success_msg = f"万擎API流式调用完成! 模型: {model}, {stats.summary()}"
+                    if early_stopped:
+                        success_msg += ", 已检测到完整内容块并提前结束"
                     print(success_msg)
                     return (cleaned_content, True, success_msg, api_url, raw_response)
-                    
+
                 except Exception as e:
                     error_msg = f"流式响应处理错误: {str(e)}"
                     print(error_msg)
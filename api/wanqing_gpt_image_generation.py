@@ -8,6 +8,7 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client
 
 class WanQingGPTImageGenerationNode:
     @classmethod
@@ -74,14 +75,7 @@ class WanQingGPTImageGenerationNode:
     CATEGORY = "✨✨✨design-ai/api"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging-sgp.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod-sgp.corp.kuaishou.com", 
-            "prod-old": "https://llm-gateway-prod.corp.kuaishou.com",
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = {**gateway_client.SGP_ENVIRONMENTS, "prod-old": gateway_client.ENVIRONMENTS["prod"]}
 
     def generate_image(self, environment, api_key, prompt, image_count, 
                       image_size, quality, output_format, timeout, use_proxy, custom_base_url="", custom_endpoint="/llm-serve/v1/images/generations"):
@@ -137,7 +131,7 @@ class WanQingGPTImageGenerationNode:
                 request_kwargs["proxies"] = {"http": None, "https": None}
             
             # 发送请求
-            response = requests.post(url, **request_kwargs)
+            response = gateway_client.post(url, model=payload["model"], **request_kwargs)
             
             print(f"[万擎 GPT] 响应状态码: {response.status_code}")
             
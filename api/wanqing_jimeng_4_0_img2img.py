@@ -8,6 +8,7 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client
 
 class WanQingJiMeng40ImageToImageNode:
     @classmethod
@@ -132,13 +133,7 @@ class WanQingJiMeng40ImageToImageNode:
     CATEGORY = "✨✨✨design-ai/api"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod.corp.kuaishou.com", 
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = gateway_client.ENVIRONMENTS
 
     def tensor_to_base64(self, tensor):
         """将tensor转换为base64编码的图像"""
@@ -305,7 +300,7 @@ class WanQingJiMeng40ImageToImageNode:
                 request_kwargs["proxies"] = {"http": None, "https": None}
             
             # 发送请求
-            response = requests.post(url, **request_kwargs)
+            response = gateway_client.post(url, model=payload["model"], **request_kwargs)
             
             print(f"[万擎即梦4.0图生图] 响应状态码: {response.status_code}")
             
@@ -382,7 +377,7 @@ class WanQingJiMeng40ImageToImageNode:
                         if use_proxy:
                             download_kwargs["proxies"] = {"http": None, "https": None}
                         
-                        img_response = requests.get(image_url_result, **download_kwargs)
+                        img_response = gateway_client.get(image_url_result, **download_kwargs)
                         img_response.raise_for_status()
                         result_image = Image.open(io.BytesIO(img_response.content))
                         
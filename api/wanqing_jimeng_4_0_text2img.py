@@ -8,6 +8,7 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client
 
 class WanQingJiMeng40TextToImageNode:
     @classmethod
@@ -118,13 +119,7 @@ class WanQingJiMeng40TextToImageNode:
     CATEGORY = "✨✨✨design-ai/api"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod.corp.kuaishou.com", 
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = gateway_client.ENVIRONMENTS
 
     def generate_image(self, environment, api_key, prompt, size, response_format, 
                       sequential_image_generation, stream, watermark, timeout, use_proxy, 
@@ -220,7 +215,7 @@ class WanQingJiMeng40TextToImageNode:
                 request_kwargs["proxies"] = {"http": None, "https": None}
             
             # 发送请求
-            response = requests.post(url, **request_kwargs)
+            response = gateway_client.post(url, model=payload["model"], **request_kwargs)
             
             print(f"[万擎即梦4.0文生图] 响应状态码: {response.status_code}")
             
@@ -295,7 +290,7 @@ class WanQingJiMeng40TextToImageNode:
                         if use_proxy:
                             download_kwargs["proxies"] = {"http": None, "https": None}
                         
-                        img_response = requests.get(image_url, **download_kwargs)
+                        img_response = gateway_client.get(image_url, **download_kwargs)
                         img_response.raise_for_status()
                         image = Image.open(io.BytesIO(img_response.content))
                         
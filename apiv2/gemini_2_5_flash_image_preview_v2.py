@@ -7,8 +7,9 @@ import base64
 import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
+from ..utils import batch_runner, gateway_client, image_encoder, retry_policy
 
-class GeminiImageNodeV2:
+class GeminiImageNodeV2(batch_runner.BatchGenerateMixin):
     @classmethod
     def INPUT_TYPES(s):
         return {
@@ -57,23 +58,29 @@ class GeminiImageNodeV2:
             "optional": {
                 "image": ("IMAGE", {
                     "tooltip": "要编辑的输入图像（仅在图片编辑模式下需要）"
+                }),
+                "batch_prompts": ("STRING", {
+                    "default": "",
+                    "multiline": True,
+                    "tooltip": "批量模式：每行一个提示词，非空时并发生成并合并为一个图像批次"
+                }),
+                "max_concurrency": ("INT", {
+                    "default": 4,
+                    "min": 1,
+                    "max": 16,
+                    "step": 1,
+                    "tooltip": "批量模式最大并发请求数"
                 })
             }
         }
 
-    RETURN_TYPES = ("IMAGE", "BOOLEAN", "STRING", "STRING", "STRING")
-    RETURN_NAMES = ("images", "success", "message", "response_json", "usage_info")
+    RETURN_TYPES = ("IMAGE", "BOOLEAN", "STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("images", "success", "message", "response_json", "usage_info", "item_success")
     FUNCTION = "generate_image"
     CATEGORY = "✨✨✨design-ai/api-v2"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging-sgp.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod-sgp.corp.kuaishou.com", 
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = gateway_client.SGP_ENVIRONMENTS
         self.execution_logs = []
     
     def _log(self, message, level="INFO"):
@@ -108,28 +115,8 @@ class GeminiImageNodeV2:
     def _image_to_base64(self, image_tensor):
         """将图像tensor转换为base64"""
         try:
-            # 获取第一张图像（如果是批量）
-            if len(image_tensor.shape) == 4:
-                image = image_tensor[0]
-            else:
-                image = image_tensor
-            
-            # 转换为numpy并转换到0-255范围
-            image_np = (image.cpu().numpy() * 255).astype(np.uint8)
-            
-            # 创建PIL图像
-            pil_image = Image.fromarray(image_np)
-            
-            # 确保是RGB模式
-            if pil_image.mode != 'RGB':
-                pil_image = pil_image.convert('RGB')
-            
-            # 转换为base64
-            buffer = io.BytesIO()
-            pil_image.save(buffer, format="JPEG", quality=95)
-            image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            self._log(f"图像转换完成: {pil_image.size}, 模式: {pil_image.mode}")
+            image_base64 = image_encoder.to_base64(image_tensor, "JPEG", quality=95)
+            self._log(f"图像转换完成: ({image_tensor.shape[-2]}, {image_tensor.shape[-3]}), 模式: RGB")
             return image_base64
             
         except Exception as e:
@@ -178,7 +165,7 @@ class GeminiImageNodeV2:
                 if indent < 3:
                     self._debug_response_structure(item, indent + 1)
 
-    def generate_image(self, environment, model, api_key, prompt, mode, timeout, use_proxy, custom_base_url="", custom_endpoint="", image=None):
+    def _generate_single(self, environment, model, api_key, prompt, mode, timeout, use_proxy, custom_base_url="", custom_endpoint="", image=None):
         """
         Gemini 图像生成或编辑 V2
         """
@@ -287,8 +274,12 @@ class GeminiImageNodeV2:
                 self._log("API请求代理: 使用系统代理")
             
             # 发送请求
+            # 环境熔断时切换到备用环境
             self._log("发送API请求...")
-            response = requests.post(api_url, **request_kwargs)
+            response = gateway_client.post(
+                api_url, failover=True,
+                idempotency_key=retry_policy.new_idempotency_key(), **request_kwargs
+            )
             
             self._log(f"收到响应, 状态码: {response.status_code}")
             
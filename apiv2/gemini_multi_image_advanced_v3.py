@@ -7,6 +7,7 @@ import base64
 import io
 from typing import List
 from PIL import Image
+from ..utils import gateway_client, image_encoder, retry_policy
 
 
 class GeminiMultiImageAdvancedV2:
@@ -81,13 +82,7 @@ class GeminiMultiImageAdvancedV2:
     CATEGORY = "✨✨✨design-ai/api-v2"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging-sgp.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod-sgp.corp.kuaishou.com",
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = gateway_client.SGP_ENVIRONMENTS
         self.execution_logs: List[str] = []
 
     # 基础工具方法
@@ -117,15 +112,8 @@ class GeminiMultiImageAdvancedV2:
 
     def _image_to_base64(self, image_tensor):
         try:
-            img = image_tensor[0] if len(image_tensor.shape) == 4 else image_tensor
-            image_np = (img.cpu().numpy() * 255).astype(np.uint8)
-            pil_image = Image.fromarray(image_np)
-            if pil_image.mode != "RGB":
-                pil_image = pil_image.convert("RGB")
-            buffer = io.BytesIO()
-            pil_image.save(buffer, format="JPEG", quality=95)
-            image_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
-            self._log(f"图像转换完成: {pil_image.size}, 模式: {pil_image.mode}")
+            image_base64 = image_encoder.to_base64(image_tensor, "JPEG", quality=95)
+            self._log(f"图像转换完成: ({image_tensor.shape[-2]}, {image_tensor.shape[-3]}), 模式: RGB")
             return image_base64
         except Exception as e:
             raise ValueError(f"图像转换失败: {str(e)}")
@@ -298,8 +286,12 @@ class GeminiMultiImageAdvancedV2:
                 self._log("API请求代理: 使用系统代理")
 
             # 发送请求
+            # 环境熔断时切换到备用环境
             self._log("发送API请求...")
-            response = requests.post(api_url, **request_kwargs)
+            response = gateway_client.post(
+                api_url, failover=True,
+                idempotency_key=retry_policy.new_idempotency_key(), **request_kwargs
+            )
             self._log(f"收到响应, 状态码: {response.status_code}")
 
             # 解析响应
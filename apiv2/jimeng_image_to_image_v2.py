@@ -8,6 +8,7 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client, image_encoder, image_pipeline, result_cache, retry_policy, single_flight, upload_cache
 
 class JiMengImageToImageNodeV2:
     @classmethod
@@ -88,6 +89,14 @@ class JiMengImageToImageNodeV2:
                 "image_url": ("STRING", {
                     "default": "https://ark-project.tos-cn-beijing.volces.com/doc_image/seededit_i2i.jpeg",
                     "tooltip": "图像URL（当未提供输入图像时使用）"
+                }),
+                "use_result_cache": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "是否启用结果缓存：相同参数与输入图像（且种子固定）时直接返回磁盘缓存的结果"
+                }),
+                "upload_input_image": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "是否先将输入图像上传到CDN并以URL提交（按内容哈希复用已上传的URL），大幅减小请求体；上传失败时自动回退为base64内联"
                 })
             }
         }
@@ -98,13 +107,7 @@ class JiMengImageToImageNodeV2:
     CATEGORY = "✨✨✨design-ai/api-v2"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod.corp.kuaishou.com", 
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = gateway_client.ENVIRONMENTS
         self.execution_logs = []
     
     def _log(self, message, level="INFO"):
@@ -138,34 +141,25 @@ class JiMengImageToImageNodeV2:
 
     def tensor_to_base64(self, tensor):
         """将tensor转换为base64编码的图像"""
-        # 处理batch维度
-        if len(tensor.shape) == 4:
-            tensor = tensor[0]
-        
-        # 转换为numpy并确保在0-255范围内
-        np_image = tensor.cpu().numpy()
-        if np_image.max() <= 1.0:
-            np_image = (np_image * 255).astype(np.uint8)
-        else:
-            np_image = np.clip(np_image, 0, 255).astype(np.uint8)
-        
-        # 转换为PIL图像
-        pil_image = Image.fromarray(np_image)
-        
-        # 转换为base64
-        buffer = io.BytesIO()
-        pil_image.save(buffer, format='JPEG', quality=95)
-        buffer.seek(0)
-        
         # 返回data URI格式，火山引擎API期望这种格式
-        base64_string = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        return f"data:image/jpeg;base64,{base64_string}"
+        return image_encoder.to_base64(tensor, "JPEG", quality=95, data_uri=True)
+
+    def _upload_input_image(self, image):
+        """上传输入图像并返回CDN URL（按内容哈希复用），失败时返回None"""
+        try:
+            url, reused = upload_cache.image_url(image)
+            self._log(f"使用{'已缓存的' if reused else '新上传的'}输入图像URL: {url}")
+            return url
+        except Exception as e:
+            self._log(f"输入图像上传失败，改用base64内联: {str(e)}", "WARN")
+            return None
 
+    @result_cache.cacheable("jimeng-i2i-v2")
     def generate_image(self, environment, api_key, prompt, response_format, size, 
                       seed, guidance_scale, watermark, timeout, use_proxy, 
                       image_download_proxy, image_proxy_url, 
                       custom_base_url="", custom_endpoint="/llm-serve/v1/images/generations", 
-                      image=None, image_url=None):
+                      image=None, image_url=None, upload_input_image=False):
         """
         即梦图生图 V2
         """
@@ -196,10 +190,13 @@ class JiMengImageToImageNodeV2:
             self._log("开始处理输入图像")
             image_input = None
             if image is not None:
-                # 使用提供的图像tensor
-                image_input = self.tensor_to_base64(image)
-                self._log(f"使用输入图像tensor，尺寸: {image.shape}")
-                self._log(f"图像格式: data URI (长度: {len(image_input)} 字符)")
+                if upload_input_image:
+                    image_input = self._upload_input_image(image)
+                if image_input is None:
+                    # 使用提供的图像tensor
+                    image_input = self.tensor_to_base64(image)
+                    self._log(f"使用输入图像tensor，尺寸: {image.shape}")
+                    self._log(f"图像格式: data URI (长度: {len(image_input)} 字符)")
             elif image_url and image_url.strip():
                 # 使用图像URL
                 image_input = image_url.strip()
@@ -271,8 +268,12 @@ class JiMengImageToImageNodeV2:
                 self._log("API请求代理: 使用系统代理")
             
             # 发送请求
+            # 相同的并发请求只提交一次（随机种子时不合并），环境熔断时切换到备用环境
             self._log("发送API请求...")
-            response = requests.post(url, **request_kwargs)
+            response = single_flight.post(
+                url, coalesce=seed != -1, model=payload["model"], failover=True,
+                idempotency_key=retry_policy.new_idempotency_key(), **request_kwargs
+            )
             
             self._log(f"收到响应, 状态码: {response.status_code}")
             
@@ -319,7 +320,6 @@ class JiMengImageToImageNodeV2:
             
             # 处理生成的图像
             self._log("开始处理生成的图像")
-            images_tensor = []
             image_data = response_data.get('data', [])
             
             if not image_data:
@@ -331,79 +331,33 @@ class JiMengImageToImageNodeV2:
             
             self._log(f"收到 {len(image_data)} 个图像数据")
             
+            sources = []
             for idx, item in enumerate(image_data):
+                image_size = item.get('size', '未知')
                 if 'b64_json' in item:
                     # 处理 base64 编码的图像
-                    b64_data = item['b64_json']
-                    image_bytes = base64.b64decode(b64_data)
-                    result_image = Image.open(io.BytesIO(image_bytes))
-                    
-                    # 转换为RGB
-                    if result_image.mode != 'RGB':
-                        result_image = result_image.convert('RGB')
-                    
-                    # 转换为tensor
-                    image_np = np.array(result_image).astype(np.float32) / 255.0
-                    image_tensor = torch.from_numpy(image_np)[None,]
-                    images_tensor.append(image_tensor)
-                    
-                    self._log(f"图像 {idx + 1}: {result_image.size}, 模式: {result_image.mode}")
-                    
+                    sources.append(base64.b64decode(item['b64_json']))
+                    self._log(f"收到base64图像 {idx + 1}, 尺寸: {image_size}")
                 elif 'url' in item:
-                    # 处理URL形式的图像
-                    image_url_result = item['url']
-                    self._log(f"收到图像URL: {image_url_result[:80]}...")
-                    
                     if response_format == "url":
-                        # 如果用户选择了URL格式，下载图像
-                        try:
-                            self._log(f"下载图像 {idx + 1}")
-                            
-                            # 配置图片下载代理设置
-                            download_kwargs = {"timeout": 30}
-                            if image_download_proxy:
-                                # 使用指定的代理服务器
-                                self._log(f"图片下载代理: 使用 {image_proxy_url}")
-                                download_kwargs["proxies"] = {
-                                    "http": image_proxy_url,
-                                    "https": image_proxy_url
-                                }
-                            else:
-                                # 禁用代理（用于内部网络或直连）
-                                self._log("图片下载代理: 禁用")
-                                download_kwargs["proxies"] = {"http": None, "https": None}
-                            
-                            img_response = requests.get(image_url_result, **download_kwargs)
-                            img_response.raise_for_status()
-                            result_image = Image.open(io.BytesIO(img_response.content))
-                            
-                            # 转换为RGB
-                            if result_image.mode != 'RGB':
-                                result_image = result_image.convert('RGB')
-                            
-                            # 转换为tensor
-                            image_np = np.array(result_image).astype(np.float32) / 255.0
-                            image_tensor = torch.from_numpy(image_np)[None,]
-                            images_tensor.append(image_tensor)
-                            
-                            self._log(f"图像 {idx + 1} 下载成功: {result_image.size}, 模式: {result_image.mode}")
-                            
-                        except Exception as e:
-                            self._log(f"下载图像 {idx + 1} 失败: {str(e)}", "ERROR")
-                            continue
+                        sources.append(item['url'])
+                        self._log(f"收到图像URL: {item['url'][:80]}...")
                     else:
                         self._log("警告: 跳过URL形式的图像，当前仅支持base64格式", "WARN")
             
-            if not images_tensor:
+            # 并发下载并解码到预分配的图像批次
+            proxies = image_pipeline.download_proxies(image_download_proxy, image_proxy_url)
+            self._log(f"图片下载代理: {'使用 ' + image_proxy_url if image_download_proxy else '禁用'}")
+            result_images = image_pipeline.load_images(sources, proxies=proxies, timeout=30, log=self._log)
+            
+            if result_images is None:
                 self._log("没有可用的图像数据", "ERROR")
                 log_output = self._print_and_format_logs()
                 blank_image = self._create_blank_image()
                 error_msg = "没有可用的图像数据"
                 return (blank_image, False, error_msg, "", log_output)
             
-            # 合并所有图像
-            result_images = torch.cat(images_tensor, dim=0)
-            self._log(f"成功处理 {len(images_tensor)} 张图像")
+            self._log(f"成功处理 {result_images.shape[0]} 张图像")
             
             # 格式化使用信息
             usage = response_data.get('usage', {})
@@ -414,7 +368,7 @@ class JiMengImageToImageNodeV2:
             usage_info += f"- 尺寸: {size}\n"
             usage_info += f"- 水印: {'是' if watermark else '否'}\n"
             usage_info += f"- 输入图像: {'Tensor' if image is not None else 'URL'}\n"
-            usage_info += f"- 生成图像数量: {len(images_tensor)}\n"
+            usage_info += f"- 生成图像数量: {result_images.shape[0]}\n"
             
             if usage:
                 usage_info += f"- 输入Token: {usage.get('input_tokens', 0)}\n"
@@ -8,8 +8,9 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import batch_runner, gateway_client, image_encoder, image_pipeline, result_cache, retry_policy, single_flight
 
-class JiMengMultiImageToImageNodeV2:
+class JiMengMultiImageToImageNodeV2(batch_runner.BatchGenerateMixin):
     @classmethod
     def INPUT_TYPES(s):
         return {
@@ -193,23 +194,37 @@ class JiMengMultiImageToImageNodeV2:
                     "max": 1.0,
                     "step": 0.05,
                     "tooltip": "图像变化强度，0.0保持原图，1.0完全重新生成"
+                }),
+                "batch_prompts": ("STRING", {
+                    "default": "",
+                    "multiline": True,
+                    "tooltip": "批量模式：每行一个提示词，非空时并发生成并合并为一个图像批次"
+                }),
+                "batch_seeds": ("STRING", {
+                    "default": "",
+                    "tooltip": "批量模式：逗号分隔的种子列表，与batch_prompts逐项配对（单项时广播）"
+                }),
+                "max_concurrency": ("INT", {
+                    "default": 4,
+                    "min": 1,
+                    "max": 16,
+                    "step": 1,
+                    "tooltip": "批量模式最大并发请求数"
+                }),
+                "use_result_cache": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "是否启用结果缓存：相同参数与输入图像（且种子固定）时直接返回磁盘缓存的结果"
                 })
             }
         }
 
-    RETURN_TYPES = ("IMAGE", "BOOLEAN", "STRING", "STRING", "STRING")
-    RETURN_NAMES = ("images", "success", "message", "response_json", "usage_info")
+    RETURN_TYPES = ("IMAGE", "BOOLEAN", "STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("images", "success", "message", "response_json", "usage_info", "item_success")
     FUNCTION = "generate_image"
     CATEGORY = "✨✨✨design-ai/api-v2"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod.corp.kuaishou.com", 
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = gateway_client.ENVIRONMENTS
         self.execution_logs = []
     
     def _log(self, message, level="INFO"):
@@ -238,28 +253,8 @@ class JiMengMultiImageToImageNodeV2:
 
     def tensor_to_base64(self, tensor):
         """将tensor转换为base64编码的图像"""
-        # 处理batch维度
-        if len(tensor.shape) == 4:
-            tensor = tensor[0]
-        
-        # 转换为numpy并确保在0-255范围内
-        np_image = tensor.cpu().numpy()
-        if np_image.max() <= 1.0:
-            np_image = (np_image * 255).astype(np.uint8)
-        else:
-            np_image = np.clip(np_image, 0, 255).astype(np.uint8)
-        
-        # 转换为PIL图像
-        pil_image = Image.fromarray(np_image)
-        
-        # 转换为base64
-        buffer = io.BytesIO()
-        pil_image.save(buffer, format='JPEG', quality=95)
-        buffer.seek(0)
-        
         # 返回data URI格式，火山引擎API期望这种格式
-        base64_string = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        return f"data:image/jpeg;base64,{base64_string}"
+        return image_encoder.to_base64(tensor, "JPEG", quality=95, data_uri=True)
 
     def _create_blank_image(self, width=512, height=512):
         """创建空白图片tensor"""
@@ -305,7 +300,8 @@ class JiMengMultiImageToImageNodeV2:
         
         return images, collect_info
 
-    def generate_image(self, environment, api_key, prompt, size, response_format, 
+    @result_cache.cacheable("jimeng-multi-i2i-v2")
+    def _generate_single(self, environment, api_key, prompt, size, response_format, 
                       sequential_image_generation, stream, watermark, timeout, use_proxy, 
                       custom_base_url="http://llm-gateway.internal", custom_endpoint="/llm-serve/v1/images/generations",
                       image_download_proxy=False, image_proxy_url="http://10.20.254.26:11080",
@@ -478,8 +474,12 @@ class JiMengMultiImageToImageNodeV2:
                 self._log("API请求代理: 使用系统代理")
             
             # 发送请求
+            # 相同的并发请求只提交一次（随机种子时不合并），环境熔断时切换到备用环境
             self._log("发送API请求...")
-            response = requests.post(url, **request_kwargs)
+            response = single_flight.post(
+                url, coalesce=seed != -1, model=payload["model"], failover=True,
+                idempotency_key=retry_policy.new_idempotency_key(), **request_kwargs
+            )
             
             self._log(f"收到响应, 状态码: {response.status_code}")
             
@@ -529,7 +529,6 @@ class JiMengMultiImageToImageNodeV2:
             
             # 处理生成的图像
             self._log("开始处理生成的图像")
-            images_tensor = []
             image_data = response_data.get('data', [])
             
             if not image_data:
@@ -541,76 +540,31 @@ class JiMengMultiImageToImageNodeV2:
             
             self._log(f"收到 {len(image_data)} 个图像数据")
             
+            sources = []
             for idx, item in enumerate(image_data):
+                image_size = item.get('size', '未知')
                 if 'b64_json' in item:
                     # 处理 base64 编码的图像
-                    b64_data = item['b64_json']
-                    image_size = item.get('size', '未知')
-                    
-                    image_bytes = base64.b64decode(b64_data)
-                    result_image = Image.open(io.BytesIO(image_bytes))
-                    
-                    # 转换为RGB（如果不是的话）
-                    if result_image.mode != 'RGB':
-                        result_image = result_image.convert('RGB')
-                    
-                    # 转换为tensor
-                    image_np = np.array(result_image).astype(np.float32) / 255.0
-                    image_tensor = torch.from_numpy(image_np)[None,]
-                    images_tensor.append(image_tensor)
-                    
-                    self._log(f"图像 {idx + 1}: {result_image.size}, 模式: {result_image.mode}, 尺寸: {image_size}")
-                    
+                    sources.append(base64.b64decode(item['b64_json']))
+                    self._log(f"收到base64图像 {idx + 1}, 尺寸: {image_size}")
                 elif 'url' in item:
                     # 处理URL形式的图像
-                    image_url_result = item['url']
-                    image_size = item.get('size', '未知')
-                    self._log(f"收到图像URL: {image_url_result[:80]}..., 尺寸: {image_size}")
-                    
-                    try:
-                        # 配置图片下载代理设置
-                        download_kwargs = {"timeout": 60}
-                        if image_download_proxy:
-                            # 使用指定的代理服务器
-                            self._log(f"图片下载代理: 使用 {image_proxy_url}")
-                            download_kwargs["proxies"] = {
-                                "http": image_proxy_url,
-                                "https": image_proxy_url
-                            }
-                        else:
-                            # 禁用代理（用于内部网络或直连）
-                            self._log("图片下载代理: 禁用")
-                            download_kwargs["proxies"] = {"http": None, "https": None}
-                        
-                        img_response = requests.get(image_url_result, **download_kwargs)
-                        img_response.raise_for_status()
-                        result_image = Image.open(io.BytesIO(img_response.content))
-                        
-                        # 转换为RGB
-                        if result_image.mode != 'RGB':
-                            result_image = result_image.convert('RGB')
-                        
-                        # 转换为tensor
-                        image_np = np.array(result_image).astype(np.float32) / 255.0
-                        image_tensor = torch.from_numpy(image_np)[None,]
-                        images_tensor.append(image_tensor)
-                        
-                        self._log(f"下载图像 {idx + 1}: 实际尺寸{result_image.size}, 模式: {result_image.mode}")
-                        
-                    except Exception as e:
-                        self._log(f"下载图像 {idx + 1} 失败: {str(e)}", "ERROR")
-                        continue
-            
-            if not images_tensor:
+                    sources.append(item['url'])
+                    self._log(f"收到图像URL: {item['url'][:80]}..., 尺寸: {image_size}")
+            
+            # 并发下载并解码到预分配的图像批次
+            proxies = image_pipeline.download_proxies(image_download_proxy, image_proxy_url)
+            self._log(f"图片下载代理: {'使用 ' + image_proxy_url if image_download_proxy else '禁用'}")
+            result_images = image_pipeline.load_images(sources, proxies=proxies, timeout=60, log=self._log)
+            
+            if result_images is None:
                 self._log("没有可用的图像数据", "ERROR")
                 log_output = self._print_and_format_logs()
                 blank_image = self._create_blank_image()
                 error_msg = "没有可用的图像数据"
                 return (blank_image, False, error_msg, "", log_output)
             
-            # 合并所有图像
-            result_images = torch.cat(images_tensor, dim=0)
-            self._log(f"成功处理 {len(images_tensor)} 张图像")
+            self._log(f"成功处理 {result_images.shape[0]} 张图像")
             
             # 格式化使用信息
             usage = response_data.get('usage', {})
@@ -629,7 +583,7 @@ class JiMengMultiImageToImageNodeV2:
             usage_info += f"- 响应格式: {response_format}\n"
             usage_info += f"- 输入图像数量: {len(images)}\n"
             usage_info += f"- 请求图像数量: {n}\n"
-            usage_info += f"- 生成图像数量: {len(images_tensor)}\n"
+            usage_info += f"- 生成图像数量: {result_images.shape[0]}\n"
             
             if seed != -1:
                 usage_info += f"- 随机种子: {seed}\n"
@@ -8,9 +8,9 @@ import io
 import os
 from PIL import Image
 from urllib.parse import urlparse
-import jwt
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client, image_encoder, image_pipeline, jwt_cache, retry_policy, task_poller
 
 class KetuTextToImageNodeV2:
     @classmethod
@@ -107,6 +107,10 @@ class KetuTextToImageNodeV2:
                     "max": 1.0,
                     "step": 0.05,
                     "tooltip": "面部参考强度，仅image_reference为subject时生效"
+                }),
+                "poll_mode": (["fixed", "adaptive"], {
+                    "default": "fixed",
+                    "tooltip": "轮询模式：fixed按固定间隔轮询；adaptive先快速轮询再逐步退避，遵循网关Retry-After/ETA并学习模型历史耗时"
                 })
             }
         }
@@ -149,19 +153,10 @@ class KetuTextToImageNodeV2:
         return torch.from_numpy(blank_array)
 
     def encode_jwt_token(self, access_key, secret_key):
-        """生成JWT token"""
+        """获取JWT token（按密钥缓存复用，临近过期时后台刷新）"""
         try:
-            headers = {
-                "alg": "HS256",
-                "typ": "JWT"
-            }
-            payload = {
-                "iss": access_key,
-                "exp": int(time.time()) + 1800,  # 30分钟有效期
-                "nbf": int(time.time()) - 5      # 开始生效时间
-            }
-            token = jwt.encode(payload, secret_key, headers=headers)
-            self._log("JWT token 生成成功")
+            token = jwt_cache.get_token(access_key, secret_key)
+            self._log("JWT token 获取成功")
             return token
         except Exception as e:
             self._log(f"JWT token 生成失败: {str(e)}", "ERROR")
@@ -170,24 +165,10 @@ class KetuTextToImageNodeV2:
     def tensor_to_base64(self, image_tensor):
         """将图像tensor转换为base64编码"""
         try:
-            # 确保tensor在正确的范围内 [0, 1]
-            if image_tensor.max() <= 1.0:
-                image_np = (image_tensor.squeeze().cpu().numpy() * 255).astype(np.uint8)
-            else:
-                image_np = image_tensor.squeeze().cpu().numpy().astype(np.uint8)
-            
-            # 转换为PIL图像
-            if len(image_np.shape) == 3:
-                image = Image.fromarray(image_np)
-            else:
+            if image_tensor.squeeze().dim() != 3:
                 raise ValueError("图像tensor格式不正确")
-            
-            # 转换为base64
-            buffer = io.BytesIO()
-            image.save(buffer, format='PNG')
-            encoded_string = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            self._log(f"图像转换为base64成功，尺寸: {image.size}")
+            encoded_string = image_encoder.to_base64(image_tensor, "PNG")
+            self._log(f"图像转换为base64成功，尺寸: ({image_tensor.shape[-2]}, {image_tensor.shape[-3]})")
             return encoded_string
         except Exception as e:
             self._log(f"图像转换失败: {str(e)}", "ERROR")
@@ -240,7 +221,7 @@ class KetuTextToImageNodeV2:
         
         headers = {
             "Content-Type": "application/json",
-            "Authorization": f"Bearer {jwt_token}",
+            "Authorization": f"Bearer {jwt_cache.current(jwt_token)}",
             "User-Agent": "ComfyUI-Ketu-V2/1.0"
         }
         
@@ -264,7 +245,7 @@ class KetuTextToImageNodeV2:
         
         try:
             self._log(f"提交任务到: {api_url}")
-            response = requests.post(api_url, **request_kwargs)
+            response = gateway_client.post(api_url, idempotency_key=retry_policy.new_idempotency_key(), **request_kwargs)
             
             self._log(f"收到响应, 状态码: {response.status_code}")
             
@@ -294,7 +275,7 @@ class KetuTextToImageNodeV2:
         
         headers = {
             "Content-Type": "application/json",
-            "Authorization": f"Bearer {jwt_token}",
+            "Authorization": f"Bearer {jwt_cache.current(jwt_token)}",
             "User-Agent": "ComfyUI-Ketu-V2/1.0"
         }
         
@@ -314,7 +295,7 @@ class KetuTextToImageNodeV2:
             request_kwargs["proxies"] = {"http": None, "https": None}
         
         try:
-            response = requests.get(query_url, **request_kwargs)
+            response = gateway_client.get(query_url, **request_kwargs)
             response_data = response.json()
             
             if not response.ok:
@@ -339,83 +320,44 @@ class KetuTextToImageNodeV2:
         self._log(f"开始轮询任务状态，最大等待时间: {timeout}秒")
         
         attempt = 0
-        while time.time() - start_time < timeout:
+        
+        def check_status():
+            """单次查询任务状态，未完成返回None"""
+            nonlocal attempt
             attempt += 1
+            elapsed = time.time() - start_time
             try:
-                elapsed = time.time() - start_time
                 task_data = self.query_task_status(base_url, jwt_token, task_id, use_proxy, api_proxy_url)
-                task_status = task_data.get('task_status', '')
-                
-                self._log(f"轮询尝试 {attempt}, 状态: {task_status}, 耗时: {elapsed:.1f}s")
-                
-                if task_status == 'succeed':
-                    self._log("任务成功完成", "SUCCESS")
-                    return task_data
-                elif task_status == 'failed':
-                    error_msg = task_data.get('task_status_msg', '任务执行失败')
-                    self._log(f"任务执行失败: {error_msg}", "ERROR")
-                    raise ValueError(f"任务执行失败: {error_msg}")
-                elif task_status in ['submitted', 'processing']:
-                    time.sleep(poll_interval)
-                    continue
-                else:
-                    self._log(f"未知任务状态: {task_status}", "WARN")
-                    time.sleep(poll_interval)
-                    continue
-                    
             except Exception as e:
                 self._log(f"轮询查询失败: {str(e)}", "WARN")
-                time.sleep(poll_interval)
-                continue
+                return None
+            
+            task_status = task_data.get('task_status', '')
+            self._log(f"轮询尝试 {attempt}, 状态: {task_status}, 耗时: {elapsed:.1f}s")
+            
+            if task_status == 'succeed':
+                self._log("任务成功完成", "SUCCESS")
+                return task_data
+            elif task_status == 'failed':
+                error_msg = task_data.get('task_status_msg', '任务执行失败')
+                self._log(f"任务执行失败: {error_msg}", "ERROR")
+                raise ValueError(f"任务执行失败: {error_msg}")
+            elif task_status not in ['submitted', 'processing']:
+                self._log(f"未知任务状态: {task_status}", "WARN")
+            return task_poller.Pending(task_poller.server_hint(data=task_data))
         
-        self._log(f"任务超时（{timeout}秒）", "ERROR")
-        raise ValueError(f"任务超时（{timeout}秒），请稍后重试")
-
-    def download_image(self, image_url, image_download_proxy, image_proxy_url):
-        """下载图像并转换为tensor"""
+        # 按固定间隔或自适应间隔轮询直到任务结束
         try:
-            self._log(f"开始下载图像: {image_url[:80]}...")
-            
-            # 配置图片下载代理设置
-            download_kwargs = {"timeout": 60}
-            
-            # image_download_proxy=True 且提供了 image_proxy_url 时使用代理
-            if image_download_proxy and image_proxy_url and image_proxy_url.strip():
-                # 使用指定的代理服务器
-                self._log(f"图片下载代理: 使用 {image_proxy_url}")
-                download_kwargs["proxies"] = {
-                    "http": image_proxy_url.strip(),
-                    "https": image_proxy_url.strip()
-                }
-            else:
-                self._log("图片下载代理: 禁止系统代理")
-                download_kwargs["proxies"] = {"http": None, "https": None}
-            
-            response = requests.get(image_url, **download_kwargs)
-            response.raise_for_status()
-            
-            image = Image.open(io.BytesIO(response.content))
-            
-            # 转换为RGB
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # 转换为tensor
-            image_np = np.array(image).astype(np.float32) / 255.0
-            image_tensor = torch.from_numpy(image_np)[None,]
-            
-            self._log(f"图像下载成功: {image.size}, 模式: {image.mode}")
-            return image_tensor
-            
-        except Exception as e:
-            self._log(f"图像下载失败: {str(e)}", "ERROR")
-            raise ValueError(f"图像下载失败: {str(e)}")
+            return task_poller.poll(check_status, poll_interval, timeout)
+        except TimeoutError:
+            self._log(f"任务超时（{timeout}秒）", "ERROR")
+            raise ValueError(f"任务超时（{timeout}秒），请稍后重试")
 
     def generate_image(self, access_key, secret_key, prompt, model_name, aspect_ratio, 
                       wait_for_result, timeout, poll_interval, base_url, use_proxy, api_proxy_url, 
                       image_download_proxy, image_proxy_url, 
                       negative_prompt="", image=None, image_url="", image_reference="", 
-                      image_fidelity=0.5, human_fidelity=0.45):
+                      image_fidelity=0.5, human_fidelity=0.45, poll_mode="fixed"):
         """
         可图文生图 V2
         """
@@ -511,9 +453,16 @@ class KetuTextToImageNodeV2:
             self._log(f"API基础地址: {base_url}")
             self._log(f"超时设置: {timeout}秒, 轮询间隔: {poll_interval}秒")
             
-            # 提交任务
+            # 提交任务，需要时等待完成
+            start_time = time.time()
             task_data = self.submit_task(base_url, jwt_token, payload, use_proxy, api_proxy_url)
             task_id = task_data.get('task_id')
+            completed_data = None
+            if task_id and wait_for_result:
+                self._log(f"任务已提交，task_id: {task_id}")
+                poll_schedule = task_poller.build_schedule(poll_mode, poll_interval, f"ketu:{model_name}")
+                self._log(f"轮询模式: {poll_mode}")
+                completed_data = self.wait_for_completion(base_url, jwt_token, task_id, timeout, poll_schedule, use_proxy, api_proxy_url)
             
             if not task_id:
                 self._log("任务提交成功但未获取到task_id", "ERROR")
@@ -522,10 +471,9 @@ class KetuTextToImageNodeV2:
                 error_msg = "任务提交成功但未获取到task_id"
                 return (blank_image, False, error_msg, "", log_output)
             
-            self._log(f"任务已提交，task_id: {task_id}")
-            
             # 如果不等待结果，返回空图像和任务信息
             if not wait_for_result:
+                self._log(f"任务已提交，task_id: {task_id}")
                 self._log("不等待结果，直接返回", "INFO")
                 log_output = self._print_and_format_logs()
                 blank_image = self._create_blank_image()
@@ -541,9 +489,6 @@ class KetuTextToImageNodeV2:
                 success_message = "任务已提交，未等待结果"
                 return (blank_image, True, success_message, response_json, log_output)
             
-            # 等待任务完成
-            start_time = time.time()
-            completed_data = self.wait_for_completion(base_url, jwt_token, task_id, timeout, poll_interval, use_proxy, api_proxy_url)
             total_time = time.time() - start_time
             self._log(f"总耗时: {total_time:.1f}秒")
             
@@ -561,36 +506,27 @@ class KetuTextToImageNodeV2:
             
             self._log(f"收到 {len(images_data)} 个图像数据")
             
-            # 下载图像
-            image_tensors = []
-            for i, img_data in enumerate(images_data):
-                if isinstance(img_data, dict) and 'url' in img_data:
-                    image_url_result = img_data['url']
-                    
-                    try:
-                        image_tensor = self.download_image(image_url_result, image_download_proxy, image_proxy_url)
-                        image_tensors.append(image_tensor)
-                    except Exception as e:
-                        self._log(f"下载图像 {i+1} 失败: {str(e)}", "ERROR")
-                        continue
-            
-            if not image_tensors:
+            # 并发下载并解码到预分配的图像批次
+            image_urls = [img_data['url'] for img_data in images_data if isinstance(img_data, dict) and 'url' in img_data]
+            proxies = image_pipeline.download_proxies(image_download_proxy, image_proxy_url)
+            self._log(f"图片下载代理: {'使用 ' + image_proxy_url if proxies['https'] else '禁止系统代理'}")
+            result_images = image_pipeline.load_images(image_urls, proxies=proxies, timeout=60, log=self._log)
+            
+            if result_images is None:
                 self._log("没有可用的图像数据", "ERROR")
                 log_output = self._print_and_format_logs()
                 blank_image = self._create_blank_image()
                 error_msg = "没有可用的图像数据"
                 return (blank_image, False, error_msg, "", log_output)
             
-            # 合并所有图像
-            result_images = torch.cat(image_tensors, dim=0)
-            self._log(f"成功处理 {len(image_tensors)} 张图像")
+            self._log(f"成功处理 {result_images.shape[0]} 张图像")
             
             # 构建返回信息
             usage_info = f"可图文生图完成\n"
             usage_info += f"任务ID: {task_id}\n"
             usage_info += f"模型: {model_name}\n"
             usage_info += f"宽高比: {aspect_ratio}\n"
-            usage_info += f"生成图像数量: {len(image_tensors)}\n"
+            usage_info += f"生成图像数量: {result_images.shape[0]}\n"
             usage_info += f"提示词: {prompt[:100]}{'...' if len(prompt) > 100 else ''}\n"
             usage_info += f"总耗时: {total_time:.1f}秒"
             
@@ -605,7 +541,7 @@ class KetuTextToImageNodeV2:
             response_json = json.dumps(completed_data, ensure_ascii=False, indent=2)
             
             # 构建成功消息
-            success_message = f"图像生成成功，共 {len(image_tensors)} 张"
+            success_message = f"图像生成成功，共 {result_images.shape[0]} 张"
             
             return (result_images, True, success_message, response_json, log_output)
             
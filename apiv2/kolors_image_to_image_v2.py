@@ -8,6 +8,7 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client, image_encoder, image_pipeline, result_cache, retry_policy, single_flight, task_poller, upload_cache
 
 class KolorsImageToImageNodeV2:
     @classmethod
@@ -116,6 +117,18 @@ class KolorsImageToImageNodeV2:
                     "default": "",
                     "multiline": True,
                     "tooltip": "负面提示词，描述不希望出现的内容"
+                }),
+                "poll_mode": (["fixed", "adaptive"], {
+                    "default": "fixed",
+                    "tooltip": "轮询模式：fixed按固定间隔轮询；adaptive先快速轮询再逐步退避，遵循网关Retry-After/ETA并学习模型历史耗时"
+                }),
+                "use_result_cache": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "是否启用结果缓存：相同参数与输入图像（且种子固定）时直接返回磁盘缓存的结果"
+                }),
+                "upload_input_image": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "是否先将输入图像上传到CDN并以URL提交（按内容哈希复用已上传的URL），大幅减小请求体；上传失败时自动回退为base64内联"
                 })
             }
         }
@@ -126,13 +139,7 @@ class KolorsImageToImageNodeV2:
     CATEGORY = "✨✨✨design-ai/api-v2"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod.corp.kuaishou.com", 
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = gateway_client.ENVIRONMENTS
         self.execution_logs = []
     
     def _log(self, message, level="INFO"):
@@ -166,28 +173,18 @@ class KolorsImageToImageNodeV2:
 
     def tensor_to_base64(self, tensor):
         """将tensor转换为base64编码的图像"""
-        # 处理batch维度
-        if len(tensor.shape) == 4:
-            tensor = tensor[0]
-        
-        # 转换为numpy并确保在0-255范围内
-        np_image = tensor.cpu().numpy()
-        if np_image.max() <= 1.0:
-            np_image = (np_image * 255).astype(np.uint8)
-        else:
-            np_image = np.clip(np_image, 0, 255).astype(np.uint8)
-        
-        # 转换为PIL图像
-        pil_image = Image.fromarray(np_image)
-        
-        # 转换为base64
-        buffer = io.BytesIO()
-        pil_image.save(buffer, format='JPEG', quality=95)
-        buffer.seek(0)
-        
         # 返回纯base64字符串（与扩图API保持一致）
-        base64_string = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        return base64_string
+        return image_encoder.to_base64(tensor, "JPEG", quality=95)
+
+    def _upload_input_image(self, image):
+        """上传输入图像并返回CDN URL（按内容哈希复用），失败时返回None"""
+        try:
+            url, reused = upload_cache.image_url(image)
+            self._log(f"使用{'已缓存的' if reused else '新上传的'}输入图像URL: {url}")
+            return url
+        except Exception as e:
+            self._log(f"输入图像上传失败，改用base64内联: {str(e)}", "WARN")
+            return None
 
     def submit_task(self, environment, api_key, payload, use_proxy, custom_base_url="", custom_submit_endpoint="/ai-serve/v1/ktu/images/generations"):
         """提交生成任务"""
@@ -225,7 +222,7 @@ class KolorsImageToImageNodeV2:
         else:
             self._log("API请求代理: 使用系统代理")
         
-        response = requests.post(url, **request_kwargs)
+        response = gateway_client.post(url, idempotency_key=retry_policy.new_idempotency_key(), **request_kwargs)
         
         self._log(f"响应状态码: {response.status_code}")
         
@@ -269,9 +266,8 @@ class KolorsImageToImageNodeV2:
         
         self._log(f"轮询URL: {url}")
         
-        start_time = time.time()
-        
-        while time.time() - start_time < timeout:
+        def check_status():
+            """单次查询任务状态，未完成返回None"""
             self._log(f"轮询任务状态: {task_id}")
             
             try:
@@ -283,7 +279,7 @@ class KolorsImageToImageNodeV2:
                 if use_proxy:
                     poll_kwargs["proxies"] = {"http": None, "https": None}
                 
-                response = requests.get(url, **poll_kwargs)
+                response = gateway_client.get(url, **poll_kwargs)
                 response_data = response.json()
                 
                 if not response.ok:
@@ -308,28 +304,28 @@ class KolorsImageToImageNodeV2:
                     error_msg = data.get('fail_reason', '任务执行失败')
                     self._log(f"任务执行失败: {error_msg}", "ERROR")
                     raise ValueError(f"任务执行失败: {error_msg}")
-                elif task_status in ['submitted', 'processing']:
-                    time.sleep(poll_interval)
-                    continue
-                else:
+                elif task_status not in ['submitted', 'processing']:
                     self._log(f"未知任务状态: {task_status}", "WARN")
-                    time.sleep(poll_interval)
-                    continue
+                return task_poller.Pending(task_poller.server_hint(response, data))
                     
             except requests.exceptions.RequestException as e:
                 self._log(f"轮询请求失败: {str(e)}", "ERROR")
-                time.sleep(poll_interval)
-                continue
+                return None
         
-        self._log(f"任务超时（{timeout}秒）", "ERROR")
-        raise ValueError(f"任务超时（{timeout}秒），请稍后重试或增加超时时间")
+        # 按固定间隔或自适应间隔轮询直到任务结束
+        try:
+            return task_poller.poll(check_status, poll_interval, timeout)
+        except TimeoutError:
+            self._log(f"任务超时（{timeout}秒）", "ERROR")
+            raise ValueError(f"任务超时（{timeout}秒），请稍后重试或增加超时时间")
 
+    @result_cache.cacheable("kolors-i2i-v2")
     def generate_image(self, environment, api_key, prompt, model_name, timeout, poll_interval, use_proxy, 
                       image_download_proxy, image_proxy_url, custom_base_url="", 
                       custom_submit_endpoint="/ai-serve/v1/ktu/images/generations", 
                       custom_query_endpoint="/ai-serve/v1/ktu/images/generations/{task_id}",
                       image=None, image_url=None, response_format="url", size="adaptive", 
-                      seed=-1, guidance_scale=7.5, steps=20, strength=0.8, negative_prompt=""):
+                      seed=-1, guidance_scale=7.5, steps=20, strength=0.8, negative_prompt="", poll_mode="fixed", upload_input_image=False):
         """
         可图图生图 V2
         """
@@ -360,10 +356,13 @@ class KolorsImageToImageNodeV2:
             self._log("开始处理输入图像")
             image_input = None
             if image is not None:
-                # 使用提供的图像tensor
-                image_input = self.tensor_to_base64(image)
-                self._log(f"使用输入图像tensor，尺寸: {image.shape}")
-                self._log(f"Base64长度: {len(image_input)}")
+                if upload_input_image:
+                    image_input = self._upload_input_image(image)
+                if image_input is None:
+                    # 使用提供的图像tensor
+                    image_input = self.tensor_to_base64(image)
+                    self._log(f"使用输入图像tensor，尺寸: {image.shape}")
+                    self._log(f"Base64长度: {len(image_input)}")
             elif image_url and image_url.strip():
                 # 使用图像URL
                 image_input = image_url.strip()
@@ -419,9 +418,24 @@ class KolorsImageToImageNodeV2:
             self._log(f"尺寸: {size}")
             self._log(f"超时设置: {timeout}秒, 轮询间隔: {poll_interval}秒")
             
-            # 提交任务
-            task_data = self.submit_task(environment, api_key, payload, use_proxy, custom_base_url, custom_submit_endpoint)
-            task_id = task_data.get('task_id')
+            # 提交并轮询任务；相同的并发请求共享同一个任务（随机种子时不合并）
+            def submit_and_poll():
+                task_data = self.submit_task(environment, api_key, payload, use_proxy, custom_base_url, custom_submit_endpoint)
+                task_id = task_data.get('task_id')
+                if not task_id:
+                    return None, None
+                self._log(f"任务已提交，task_id: {task_id}")
+                poll_schedule = task_poller.build_schedule(poll_mode, poll_interval, f"kolors-i2i:{model_name}")
+                self._log(f"轮询模式: {poll_mode}")
+                return task_id, self.poll_task_result(environment, api_key, task_id, timeout, poll_schedule, use_proxy, custom_base_url, custom_query_endpoint)
+            
+            # 记录开始时间
+            start_time = time.time()
+            
+            flight_key = None
+            if seed != -1:
+                flight_key = single_flight.make_key("kolors-i2i", environment, custom_base_url, custom_submit_endpoint, api_key.strip(), payload)
+            (task_id, result_data), shared = single_flight.do(flight_key, submit_and_poll)
             
             if not task_id:
                 self._log("任务提交成功但未获取到task_id", "ERROR")
@@ -430,13 +444,8 @@ class KolorsImageToImageNodeV2:
                 error_msg = "任务提交成功但未获取到task_id"
                 return (blank_image, False, error_msg, "", log_output)
             
-            self._log(f"任务已提交，task_id: {task_id}")
-            
-            # 记录开始时间
-            start_time = time.time()
-            
-            # 轮询任务结果
-            result_data = self.poll_task_result(environment, api_key, task_id, timeout, poll_interval, use_proxy, custom_base_url, custom_query_endpoint)
+            if shared:
+                self._log(f"复用进行中的相同任务，task_id: {task_id}")
             
             # 计算总耗时
             total_time = time.time() - start_time
@@ -474,54 +483,19 @@ class KolorsImageToImageNodeV2:
                 error_msg = "任务完成但没有生成图像数据"
                 return (blank_image, False, error_msg, "", log_output)
             
-            images_tensor = []
-            for idx, image_url_result in enumerate(image_urls):
-                self._log(f"下载图像 {idx + 1}: {image_url_result[:80]}...")
-                
-                try:
-                    # 配置图片下载代理设置
-                    download_kwargs = {"timeout": 60}
-                    if image_download_proxy:
-                        # 使用指定的代理服务器
-                        self._log(f"图片下载代理: 使用 {image_proxy_url}")
-                        download_kwargs["proxies"] = {
-                            "http": image_proxy_url,
-                            "https": image_proxy_url
-                        }
-                    else:
-                        # 禁用代理（用于内部网络或直连）
-                        self._log("图片下载代理: 禁用")
-                        download_kwargs["proxies"] = {"http": None, "https": None}
-                    
-                    img_response = requests.get(image_url_result, **download_kwargs)
-                    img_response.raise_for_status()
-                    result_image = Image.open(io.BytesIO(img_response.content))
-                    
-                    # 转换为RGB
-                    if result_image.mode != 'RGB':
-                        result_image = result_image.convert('RGB')
-                    
-                    # 转换为tensor
-                    image_np = np.array(result_image).astype(np.float32) / 255.0
-                    image_tensor = torch.from_numpy(image_np)[None,]
-                    images_tensor.append(image_tensor)
-                    
-                    self._log(f"图像 {idx + 1}: {result_image.size}, 模式: {result_image.mode}")
-                    
-                except Exception as e:
-                    self._log(f"下载图像 {idx + 1} 失败: {str(e)}", "ERROR")
-                    continue
+            # 并发下载并解码到预分配的图像批次
+            proxies = image_pipeline.download_proxies(image_download_proxy, image_proxy_url)
+            self._log(f"图片下载代理: {'使用 ' + image_proxy_url if image_download_proxy else '禁用'}")
+            result_images = image_pipeline.load_images(image_urls, proxies=proxies, timeout=60, log=self._log)
             
-            if not images_tensor:
+            if result_images is None:
                 self._log("没有可用的图像数据", "ERROR")
                 log_output = self._print_and_format_logs()
                 blank_image = self._create_blank_image()
                 error_msg = "没有可用的图像数据"
                 return (blank_image, False, error_msg, "", log_output)
             
-            # 合并所有图像
-            result_images = torch.cat(images_tensor, dim=0)
-            self._log(f"成功处理 {len(images_tensor)} 张图像")
+            self._log(f"成功处理 {result_images.shape[0]} 张图像")
             
             # 格式化使用信息
             usage_info = f"可图图生图结果:\n"
@@ -541,7 +515,7 @@ class KolorsImageToImageNodeV2:
                 usage_info += f"- 推理步数: {steps}\n"
             if strength != 0.8:
                 usage_info += f"- 变化强度: {strength}\n"
-            usage_info += f"- 生成图像数量: {len(images_tensor)}\n"
+            usage_info += f"- 生成图像数量: {result_images.shape[0]}\n"
             usage_info += f"- 总耗时: {total_time:.1f}秒"
             
             # 记录API使用信息
@@ -8,6 +8,7 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client, image_encoder, retry_policy
 
 class QwenImageEditNode:
     @classmethod
@@ -75,13 +76,7 @@ class QwenImageEditNode:
     CATEGORY = "✨✨✨design-ai/api-v2"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging-sgp.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod.corp.kuaishou.com", 
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = gateway_client.QWEN_ENVIRONMENTS
         self.execution_logs = []
     
     def _log(self, message, level="INFO"):
@@ -218,8 +213,12 @@ class QwenImageEditNode:
                 self._log("API请求代理: 使用系统代理")
             
             # 发送同步请求
+            # 环境熔断时切换到备用环境
             self._log("发送API请求...")
-            response = requests.post(api_url, **request_kwargs)
+            response = gateway_client.post(
+                api_url, failover=True,
+                idempotency_key=retry_policy.new_idempotency_key(), **request_kwargs
+            )
             
             self._log(f"收到响应, 状态码: {response.status_code}")
             
@@ -291,24 +290,9 @@ class QwenImageEditNode:
     def _image_to_base64(self, image_tensor):
         """将图像tensor转换为base64"""
         try:
-            # 获取第一张图像（如果是批量）
-            if len(image_tensor.shape) == 4:
-                image = image_tensor[0]
-            else:
-                image = image_tensor
-            
-            # 转换为numpy并转换到0-255范围
-            image_np = (image.cpu().numpy() * 255).astype(np.uint8)
-            
-            # 创建PIL图像
-            pil_image = Image.fromarray(image_np)
-            
-            # 转换为base64
-            buffer = io.BytesIO()
-            pil_image.save(buffer, format="PNG")
-            image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            self._log(f"图像尺寸: {pil_image.size}, 模式: {pil_image.mode}")
+            # PNG 使用低压缩级别，大图编码更快
+            image_base64 = image_encoder.to_base64(image_tensor, "PNG")
+            self._log(f"图像尺寸: ({image_tensor.shape[-2]}, {image_tensor.shape[-3]})")
             return image_base64
             
         except Exception as e:
@@ -361,7 +345,7 @@ class QwenImageEditNode:
                                 download_kwargs["proxies"] = {"http": None, "https": None}
                             
                             self._log(f"图片URL前缀: {image_url[:80]}...")
-                            img_response = requests.get(image_url, **download_kwargs)
+                            img_response = gateway_client.get(image_url, **download_kwargs)
                             self._log(f"图片下载响应状态码: {img_response.status_code}")
                             
                             if img_response.status_code == 200:
@@ -8,6 +8,7 @@ import io
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 import folder_paths
+from ..utils import gateway_client, retry_policy
 
 class QwenImageText2ImgNodeV2:
     @classmethod
@@ -93,13 +94,7 @@ class QwenImageText2ImgNodeV2:
     CATEGORY = "✨✨✨design-ai/api-v2"
 
     def __init__(self):
-        self.environments = {
-            "staging": "https://llm-gateway-staging-sgp.corp.kuaishou.com",
-            "prod": "https://llm-gateway-prod.corp.kuaishou.com", 
-            "idc": "http://llm-gateway.internal",
-            "overseas": "http://llm-gateway-sgp.internal",
-            "domestic": "http://llm-gateway.internal"
-        }
+        self.environments = gateway_client.QWEN_ENVIRONMENTS
         self.execution_logs = []
     
     def _log(self, message, level="INFO"):
@@ -222,7 +217,7 @@ class QwenImageText2ImgNodeV2:
             
             # 1. 提交任务
             self._log("发送任务提交请求...")
-            response = requests.post(submit_url, **submit_kwargs)
+            response = gateway_client.post(submit_url, idempotency_key=retry_policy.new_idempotency_key(), **submit_kwargs)
             
             self._log(f"任务提交响应状态码: {response.status_code}")
             
@@ -328,7 +323,7 @@ class QwenImageText2ImgNodeV2:
                 if use_proxy:
                     poll_kwargs["proxies"] = {"http": None, "https": None}
                 
-                response = requests.get(query_url, **poll_kwargs)
+                response = gateway_client.get(query_url, **poll_kwargs)
                 
                 if response.status_code != 200:
                     self._log(f"查询失败 {response.status_code}: {response.text}", "WARN")
@@ -407,7 +402,7 @@ class QwenImageText2ImgNodeV2:
                         self._log("图片下载代理: 禁用")
                         download_kwargs["proxies"] = {"http": None, "https": None}
                     
-                    img_response = requests.get(image_url, **download_kwargs)
+                    img_response = gateway_client.get(image_url, **download_kwargs)
                     
                     if img_response.status_code == 200:
                         image = Image.open(io.BytesIO(img_response.content))
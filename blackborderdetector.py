@@ -1,4 +1,6 @@
+import json
 import torch
+import torch.nn.functional as F
 
 class BlackBorderDetector:
     def __init__(self):
@@ -18,51 +20,85 @@ class BlackBorderDetector:
             },
         }
 
-    RETURN_TYPES = ("IMAGE", "INT", "INT", "INT", "INT", "INT", "INT", "INT", "INT", "INT", "INT")
-    RETURN_NAMES = ("cropped_image", "width", "height", "top_border", "bottom_border", "left_border", "right_border", "top_border_add", "bottom_border_add", "left_border_add", "right_border_add")
+    RETURN_TYPES = ("IMAGE", "INT", "INT", "INT", "INT", "INT", "INT", "INT", "INT", "INT", "INT", "STRING")
+    RETURN_NAMES = ("cropped_image", "width", "height", "top_border", "bottom_border", "left_border", "right_border", "top_border_add", "bottom_border_add", "left_border_add", "right_border_add", "borders_json")
 
     FUNCTION = "detect_and_crop_border"
 
     CATEGORY = "✨✨✨design-ai"
 
     def detect_and_crop_border(self, image, threshold, expand, expand_after_crop, ignore_threshold, remove_mode, max_iterations):
-        img = image[0]
+        # 批次中每张图像独立检测边框；INT 输出为第一张图像的结果，borders_json 为每张图像的结果
+        results = [
+            self._detect_and_crop_single(image[i], threshold, expand, expand_after_crop, ignore_threshold, remove_mode, max_iterations)
+            for i in range(image.shape[0])
+        ]
+        crops = [crop for crop, _ in results]
+        borders = [info for _, info in results]
+
+        if len(crops) == 1:
+            cropped_image = crops[0].unsqueeze(0)
+        else:
+            # 各图裁剪尺寸不同时，右下补零到最大尺寸组成批次
+            max_height = max(crop.shape[0] for crop in crops)
+            max_width = max(crop.shape[1] for crop in crops)
+            cropped_image = torch.stack([
+                F.pad(crop, (0, 0, 0, max_width - crop.shape[1], 0, max_height - crop.shape[0]))
+                for crop in crops
+            ])
+
+        first = borders[0]
+        return (cropped_image, first["width"], first["height"], first["top_border"], first["bottom_border"],
+                first["left_border"], first["right_border"], first["top_border_add"], first["bottom_border_add"],
+                first["left_border_add"], first["right_border_add"], json.dumps(borders))
+
+    def _detect_and_crop_single(self, img, threshold, expand, expand_after_crop, ignore_threshold, remove_mode, max_iterations):
         original_height, original_width, _ = img.shape
-        
+
         top_border, bottom_border, left_border, right_border = 0, original_height, 0, original_width
-        
+
+        # black 模式的灰度与裁剪无关，只算一次，之后每轮对窗口做两次归约得到行/列均值
+        gray = self._compute_gray_image(img, remove_mode) if remove_mode == "black" else None
+
         for _ in range(max_iterations):
-            new_top, new_bottom, new_left, new_right = self._detect_borders(img, threshold, expand, ignore_threshold, remove_mode)
-            
-            if new_top == 0 and new_bottom == img.shape[0] and new_left == 0 and new_right == img.shape[1]:
+            height, width = bottom_border - top_border, right_border - left_border
+            row_means, col_means = self._line_means(img, gray, top_border, bottom_border, left_border, right_border, remove_mode)
+            new_top, new_bottom, new_left, new_right = self._borders_from_means(
+                row_means, col_means, height, width, threshold, expand, ignore_threshold
+            )
+
+            if new_top == 0 and new_bottom == height and new_left == 0 and new_right == width:
                 break  # No new borders detected
-            
+
             top_border += new_top
-            bottom_border -= (img.shape[0] - new_bottom)
+            bottom_border -= (height - new_bottom)
             left_border += new_left
-            right_border -= (img.shape[1] - new_right)
-            
-            img = img[new_top:new_bottom, new_left:new_right]
-        
-        final_img = image[0][top_border:bottom_border, left_border:right_border]
-        final_img = final_img.unsqueeze(0)
-        
+            right_border -= (width - new_right)
+
+        final_img = img[top_border:bottom_border, left_border:right_border]
+
         # Apply final expand_after_crop
         top_border, bottom_border, left_border, right_border, top_add, bottom_add, left_add, right_add = self._apply_expand_after_crop(
             top_border, bottom_border, left_border, right_border, original_height, original_width, expand_after_crop
         )
-        
-        new_height = bottom_border - top_border
-        new_width = right_border - left_border
-        
-        return (final_img, new_width, new_height, top_border, original_height - bottom_border, left_border, original_width - right_border, top_add, bottom_add, left_add, right_add)
 
-    def _detect_borders(self, img, threshold, expand, ignore_threshold, remove_mode):
-        height, width, _ = img.shape
-        gray = self._compute_gray_image(img, remove_mode)
-        
-        top_border, bottom_border = self._find_vertical_borders(gray, height, threshold)
-        left_border, right_border = self._find_horizontal_borders(gray, width, threshold)
+        info = {
+            "width": right_border - left_border,
+            "height": bottom_border - top_border,
+            "top_border": top_border,
+            "bottom_border": original_height - bottom_border,
+            "left_border": left_border,
+            "right_border": original_width - right_border,
+            "top_border_add": top_add,
+            "bottom_border_add": bottom_add,
+            "left_border_add": left_add,
+            "right_border_add": right_add,
+        }
+        return final_img, info
+
+    def _borders_from_means(self, row_means, col_means, height, width, threshold, expand, ignore_threshold):
+        top_border, bottom_border = self._first_last_above(row_means, height, threshold)
+        left_border, right_border = self._first_last_above(col_means, width, threshold)
         
         top_border, bottom_border, left_border, right_border = self._apply_ignore_threshold(
             top_border, bottom_border, left_border, right_border, height, width, ignore_threshold
@@ -80,37 +116,21 @@ class BlackBorderDetector:
         else:
             return torch.sum(torch.abs(img - img[0, 0, :]), dim=2)
 
-    def _find_vertical_borders(self, gray, height, threshold):
-        top_border = 0
-        bottom_border = height
-
-        for i in range(height):
-            if torch.mean(gray[i]) > threshold:
-                top_border = i
-                break
-
-        for i in range(height - 1, -1, -1):
-            if torch.mean(gray[i]) > threshold:
-                bottom_border = i + 1
-                break
-
-        return top_border, bottom_border
-
-    def _find_horizontal_borders(self, gray, width, threshold):
-        left_border = 0
-        right_border = width
-
-        for i in range(width):
-            if torch.mean(gray[:, i]) > threshold:
-                left_border = i
-                break
-
-        for i in range(width - 1, -1, -1):
-            if torch.mean(gray[:, i]) > threshold:
-                right_border = i + 1
-                break
-
-        return left_border, right_border
+    def _line_means(self, img, gray, top, bottom, left, right, remove_mode):
+        """当前裁剪窗口内每行、每列的灰度均值"""
+        if gray is None:
+            # all_colors 模式以窗口左上角像素为参考色，每轮需重新计算
+            gray = self._compute_gray_image(img[top:bottom, left:right], remove_mode)
+        else:
+            gray = gray[top:bottom, left:right]
+        return gray.mean(dim=1), gray.mean(dim=0)
+
+    def _first_last_above(self, means, length, threshold):
+        """第一个和最后一个均值超过阈值的位置，返回 (起点, 终点+1)，都不超过时返回 (0, length)"""
+        indices = torch.nonzero(means > threshold).flatten()
+        if indices.numel() == 0:
+            return 0, length
+        return indices[0].item(), indices[-1].item() + 1
 
     def _apply_ignore_threshold(self, top_border, bottom_border, left_border, right_border, height, width, ignore_threshold):
         if ignore_threshold > 0:
@@ -1,9 +1,134 @@
+import functools
+import hashlib
+import json
 import math
 import random
+import numpy as np
 import torch
 import zlib
 import base64
 
+# v2 水印容器头：魔数(4) + 版本(1) + 标志(1) + 载荷长度(4) + 载荷CRC32(4)，按顺序写在图像开头
+CONTAINER_MAGIC = b"DAWM"
+CONTAINER_VERSION = 2
+CONTAINER_HEADER_BYTES = 14
+FLAG_COMPRESSED = 0x01
+
+
+def _to_int(values):
+    """与逐元素 int(pixel_val * 255) 完全一致的量化（float64计算、向零截断）"""
+    return torch.trunc(values.double() * 255).long()
+
+
+def _write_bits(flat, start, bits, bit_depth, positions=None):
+    """
+    从第 start 个元素起写入比特流，flat 为 [B, N] 的展平图像（原地修改），bits 为 0/1 的 uint8 数组
+
+    指定 positions 时按其中的元素下标依次写入（忽略 start）。
+
+    每个元素依次写入第 0..bit_depth-1 位，最后一个元素未用到的位保持原值；
+    写入过的元素按 int(v*255)/255.0 重新量化，与原逐元素实现逐位一致。
+    """
+    if len(bits) == 0:
+        return
+    count = math.ceil(len(bits) / bit_depth)
+    padded = np.zeros(count * bit_depth, dtype=np.int64)
+    padded[:len(bits)] = bits
+    matrix = torch.from_numpy(padded.reshape(count, bit_depth)).to(flat.device)
+    valid = torch.arange(count * bit_depth, device=flat.device).reshape(count, bit_depth) < len(bits)
+
+    index = _element_index(flat, start, count, positions)
+    values = _to_int(flat[:, index])
+    for depth in range(bit_depth):
+        embedded = (values & (0xFF ^ (1 << depth))) | (matrix[:, depth] << depth)
+        values = torch.where(valid[:, depth], embedded, values)
+    flat[:, index] = (values.double() / 255.0).to(flat.dtype)
+
+
+def _read_bits(flat, start, bit_count, bit_depth, positions=None):
+    """从第 start 个元素（或 positions 指定的元素）起读取 bit_count 个比特，返回 [B, bit_count] 的 uint8 数组（图像不足时截短）"""
+    count = math.ceil(bit_count / bit_depth)
+    values = _to_int(flat[:, _element_index(flat, start, count, positions)])
+    shifts = torch.arange(bit_depth, device=flat.device)
+    bits = ((values.unsqueeze(-1) >> shifts) & 1).reshape(flat.shape[0], -1)[:, :bit_count]
+    return bits.to(torch.uint8).cpu().numpy()
+
+
+def _element_index(flat, start, count, positions):
+    if positions is not None:
+        return torch.from_numpy(np.array(positions[:count], dtype=np.int64)).to(flat.device)
+    return torch.arange(start, min(start + count, flat.shape[1]), device=flat.device)
+
+
+@functools.lru_cache(maxsize=16)
+def _spread_positions(key, total, start, count):
+    """
+    由密钥确定的伪随机元素位置：在 [start, total) 中不重复地取 count 个
+
+    对 0..count-1 做密钥派生的 Feistel 置换，超出区间时循环行走（cycle-walking）直到落入区间。
+    只用 SHA-256 和 uint64 整数运算，不依赖 numpy 随机数生成器的实现，升级 numpy 后位置不变。
+    结果按参数缓存，返回只读数组。
+    """
+    size = total - start
+    if count > size:
+        raise ValueError(f"Cannot take {count} positions from {size} elements")
+    digest = hashlib.sha256(f"design-ai-watermark:{key}".encode("utf-8")).digest()
+    round_keys = [np.uint64(int.from_bytes(digest[i:i + 8], "big")) for i in range(0, len(digest), 8)]
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+
+    values = np.arange(count, dtype=np.uint64)
+    pending = np.ones(count, dtype=bool)
+    while pending.any():
+        values[pending] = _feistel(values[pending], round_keys, half_bits)
+        pending = values >= size
+    positions = start + values.astype(np.int64)
+    positions.setflags(write=False)
+    return positions
+
+
+def _feistel(values, round_keys, half_bits):
+    """在 [0, 4^half_bits) 上的密钥置换，轮函数为 splitmix64 的混合步骤"""
+    mask = np.uint64((1 << half_bits) - 1)
+    shift = np.uint64(half_bits)
+    left, right = values >> shift, values & mask
+    for round_key in round_keys:
+        mixed = right ^ round_key
+        mixed = (mixed ^ (mixed >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        mixed = (mixed ^ (mixed >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        mixed = mixed ^ (mixed >> np.uint64(31))
+        left, right = right, left ^ (mixed & mask)
+    return (left << shift) | right
+
+
+def _bytes_to_bits(data):
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+
+
+def _pack_container(text, use_compression=True):
+    """构建 v2 容器，返回 (头部字节, 载荷字节)"""
+    payload = text.encode("utf-8")
+    flags = 0
+    if use_compression:
+        compressed = zlib.compress(payload, level=9)
+        if len(compressed) < len(payload):
+            payload, flags = compressed, FLAG_COMPRESSED
+    header = (CONTAINER_MAGIC + bytes([CONTAINER_VERSION, flags])
+              + len(payload).to_bytes(4, "big") + zlib.crc32(payload).to_bytes(4, "big"))
+    return header, payload
+
+
+def _parse_header(header):
+    """解析容器头，不是 v2 容器时返回None，否则返回 (标志, 载荷长度, CRC32)"""
+    if header[:4] != CONTAINER_MAGIC or header[4] != CONTAINER_VERSION:
+        return None
+    return header[5], int.from_bytes(header[6:10], "big"), int.from_bytes(header[10:14], "big")
+
+
+def _flatten(image):
+    """[B,H,W,C] -> [B, H*W*C]，按 (h, w, c) 行优先顺序，与原逐元素遍历顺序一致"""
+    return image.reshape(image.shape[0], -1)
+
+
 class watermark_Mark:
 
     def __init__(self):
@@ -35,6 +160,16 @@ class watermark_Mark:
                 "use_compression": ("BOOLEAN", {"default": True}),
                 "bit_depth": (["1", "2", "3"], {"default": "2"}),
             },
+            "optional": {
+                "watermark_format": (["v2", "legacy"], {
+                    "default": "v2",
+                    "tooltip": "v2：带魔数/长度/CRC32的容器，按密钥伪随机分散写入，不限文本长度；legacy：旧版格式"
+                }),
+                "key": ("STRING", {
+                    "default": "",
+                    "tooltip": "v2 格式的分散写入密钥，提取时需使用相同密钥"
+                }),
+            },
         }
 
     RETURN_TYPES = ("IMAGE",)
@@ -64,28 +199,18 @@ class watermark_Mark:
         else:
             text_bytes = b'\x00' + text_bytes
         
-        # 转换为比特序列
-        bits = []
-        for byte in text_bytes:
-            for i in range(8):
-                bits.append((byte >> (7-i)) & 1)
-        
-        return bits
+        # 转换为比特序列（每字节高位在前）
+        return np.unpackbits(np.frombuffer(text_bytes, dtype=np.uint8))
 
     @staticmethod
     def _bits_to_text(bits, use_compression=True):
         """将比特序列转换为文本，支持解压缩"""
-        if not bits or len(bits) < 8:
+        if bits is None or len(bits) < 8:
             return ""
         
-        # 将比特转换为字节
-        text_bytes = bytearray()
-        for i in range(0, len(bits) - len(bits) % 8, 8):
-            byte = 0
-            for j in range(8):
-                if i + j < len(bits):
-                    byte |= bits[i + j] << (7 - j)
-            text_bytes.append(byte)
+        # 将比特转换为字节（不足一个字节的尾部丢弃）
+        bits = np.asarray(bits, dtype=np.uint8)
+        text_bytes = np.packbits(bits[:len(bits) - len(bits) % 8]).tobytes()
         
         try:
             # 检查是否压缩
@@ -109,81 +234,56 @@ class watermark_Mark:
         available_pixels = total_pixels - reserved_pixels
         return available_pixels * bit_depth
 
+    @staticmethod
+    def _metadata_pixels(bit_depth):
+        """存放32位长度所占的元素数"""
+        return math.ceil(32 / int(bit_depth))
+
     @staticmethod
     def _embed_metadata(image, data_length, bit_depth):
-        """在图像开始位置嵌入元数据"""
+        """在图像开始位置嵌入元数据（批次中每张图像）"""
         # 将数据长度转换为32位二进制
-        length_bits = []
-        for i in range(32):
-            length_bits.append((data_length >> (31-i)) & 1)
-        
-        # 嵌入长度信息到前32个像素位置
-        bit_idx = 0
-        for h in range(image.shape[1]):
-            for w in range(image.shape[2]):
-                for c in range(image.shape[3]):
-                    if bit_idx >= 32:
-                        return
-                    
-                    pixel_val = image[0][h][w][c].item()
-                    pixel_int = int(pixel_val * 255)
-                    
-                    # 根据bit_depth修改最低位
-                    for depth in range(int(bit_depth)):
-                        if bit_idx + depth < 32:
-                            bit_to_embed = length_bits[bit_idx + depth]
-                            # 修改对应的位
-                            if depth == 0:
-                                pixel_int = (pixel_int & 0xFE) | bit_to_embed
-                            elif depth == 1:
-                                pixel_int = (pixel_int & 0xFD) | (bit_to_embed << 1)
-                            elif depth == 2:
-                                pixel_int = (pixel_int & 0xFB) | (bit_to_embed << 2)
-                    
-                    image[0][h][w][c] = pixel_int / 255.0
-                    bit_idx += int(bit_depth)
+        length_bits = np.unpackbits(np.frombuffer(int(data_length).to_bytes(4, "big"), dtype=np.uint8))
+        _write_bits(_flatten(image), 0, length_bits, int(bit_depth))
 
     @staticmethod
     def _extract_metadata(image, bit_depth):
-        """从图像开始位置提取元数据"""
-        length_bits = []
-        bit_idx = 0
-        
-        for h in range(image.shape[1]):
-            for w in range(image.shape[2]):
-                for c in range(image.shape[3]):
-                    if bit_idx >= 32:
-                        break
-                    
-                    pixel_val = image[0][h][w][c].item()
-                    pixel_int = int(pixel_val * 255)
-                    
-                    # 根据bit_depth提取最低位
-                    for depth in range(int(bit_depth)):
-                        if bit_idx < 32:
-                            if depth == 0:
-                                bit = pixel_int & 1
-                            elif depth == 1:
-                                bit = (pixel_int >> 1) & 1
-                            elif depth == 2:
-                                bit = (pixel_int >> 2) & 1
-                            length_bits.append(bit)
-                            bit_idx += 1
-                
-                if bit_idx >= 32:
-                    break
-            if bit_idx >= 32:
-                break
-        
-        # 将比特转换为长度
-        data_length = 0
-        for i, bit in enumerate(length_bits[:32]):
-            data_length |= bit << (31 - i)
-        
-        return data_length
+        """从图像开始位置提取元数据，返回批次中每张图像的数据长度"""
+        length_bits = _read_bits(_flatten(image), 0, 32, int(bit_depth))
+        if length_bits.shape[1] < 32:
+            return [0] * image.shape[0]
+        return [int.from_bytes(np.packbits(bits).tobytes(), "big") for bits in length_bits]
+
+    @staticmethod
+    def _header_pixels(bit_depth):
+        """v2 容器头所占的元素数"""
+        return math.ceil(CONTAINER_HEADER_BYTES * 8 / int(bit_depth))
 
     @staticmethod
-    def mark(image, encode, use_compression=True, bit_depth="2"):
+    def mark(image, encode, use_compression=True, bit_depth="2", watermark_format="v2", key=""):
+        if watermark_format == "legacy":
+            return watermark_Mark._mark_legacy(image, encode, use_compression, bit_depth)
+
+        depth = int(bit_depth)
+        header, payload = _pack_container(encode, use_compression)
+        payload_bits = _bytes_to_bits(payload)
+        total = image.shape[1] * image.shape[2] * image.shape[3]
+        header_pixels = watermark_Mark._header_pixels(depth)
+        payload_pixels = math.ceil(len(payload_bits) / depth)
+        if header_pixels + payload_pixels > total:
+            capacity = (total - header_pixels) * depth
+            raise Exception(f"Text too long for this image! Available capacity: {capacity} bits, required: {len(payload_bits)} bits.")
+
+        # 克隆图像以避免修改原始数据，批次中每张图像写入相同的水印
+        watermarked_image = image.clone().contiguous()
+        flat = _flatten(watermarked_image)
+        _write_bits(flat, 0, _bytes_to_bits(header), depth)
+        positions = _spread_positions(key, total, header_pixels, payload_pixels)
+        _write_bits(flat, 0, payload_bits, depth, positions)
+        return (watermarked_image,)
+
+    @staticmethod
+    def _mark_legacy(image, encode, use_compression=True, bit_depth="2"):
         if len(encode) > 1024:
             raise Exception("Text too long! Maximum 1024 characters supported.")
         
@@ -196,44 +296,15 @@ class watermark_Mark:
         if len(bits) > capacity:
             raise Exception(f"Text too long for this image! Available capacity: {capacity} bits, required: {len(bits)} bits.")
         
-        # 克隆图像以避免修改原始数据
-        watermarked_image = image.clone()
+        # 克隆图像以避免修改原始数据，批次中每张图像写入相同的水印
+        watermarked_image = image.clone().contiguous()
         
         # 嵌入元数据
         watermark_Mark._embed_metadata(watermarked_image, len(bits), bit_depth)
         
         # 嵌入数据比特
-        bit_idx = 0
-        metadata_pixels = 32 // int(bit_depth) + (1 if 32 % int(bit_depth) > 0 else 0)
-        pixel_count = 0
-        
-        for h in range(watermarked_image.shape[1]):
-            for w in range(watermarked_image.shape[2]):
-                for c in range(watermarked_image.shape[3]):
-                    if pixel_count < metadata_pixels:
-                        pixel_count += 1
-                        continue
-                    
-                    if bit_idx >= len(bits):
-                        return (watermarked_image,)
-                    
-                    pixel_val = watermarked_image[0][h][w][c].item()
-                    pixel_int = int(pixel_val * 255)
-                    
-                    # 根据bit_depth嵌入比特
-                    for depth in range(int(bit_depth)):
-                        if bit_idx < len(bits):
-                            bit_to_embed = bits[bit_idx]
-                            # 修改对应的位
-                            if depth == 0:
-                                pixel_int = (pixel_int & 0xFE) | bit_to_embed
-                            elif depth == 1:
-                                pixel_int = (pixel_int & 0xFD) | (bit_to_embed << 1)
-                            elif depth == 2:
-                                pixel_int = (pixel_int & 0xFB) | (bit_to_embed << 2)
-                            bit_idx += 1
-                    
-                    watermarked_image[0][h][w][c] = pixel_int / 255.0
+        metadata_pixels = watermark_Mark._metadata_pixels(bit_depth)
+        _write_bits(_flatten(watermarked_image), metadata_pixels, bits, int(bit_depth))
         
         return (watermarked_image,)
 
@@ -263,6 +334,12 @@ class watermark_Extract:
                 "image": ("IMAGE",),
                 "bit_depth": (["1", "2", "3"], {"default": "2"}),
             },
+            "optional": {
+                "key": ("STRING", {
+                    "default": "",
+                    "tooltip": "v2 格式水印的分散写入密钥"
+                }),
+            },
         }
 
     RETURN_TYPES = ("STRING",)
@@ -270,57 +347,73 @@ class watermark_Extract:
     CATEGORY = "✨✨✨design-ai/img"
 
     @staticmethod
-    def extract(image, bit_depth="2"):
+    def extract(image, bit_depth="2", key=""):
+        """提取水印文本，批次大于1时返回按图像顺序的JSON列表"""
         try:
-            # 提取元数据
-            data_length = watermark_Mark._extract_metadata(image, bit_depth)
-            
-            if data_length <= 0 or data_length > 1024 * 8 * 4:  # 合理性检查
-                return ("",)
-            
-            # 提取数据比特
-            bits = []
-            bit_idx = 0
-            metadata_pixels = 32 // int(bit_depth) + (1 if 32 % int(bit_depth) > 0 else 0)
-            pixel_count = 0
-            
-            for h in range(image.shape[1]):
-                for w in range(image.shape[2]):
-                    for c in range(image.shape[3]):
-                        if pixel_count < metadata_pixels:
-                            pixel_count += 1
-                            continue
-                        
-                        if bit_idx >= data_length:
-                            break
-                        
-                        pixel_val = image[0][h][w][c].item()
-                        pixel_int = int(pixel_val * 255)
-                        
-                        # 根据bit_depth提取比特
-                        for depth in range(int(bit_depth)):
-                            if bit_idx < data_length:
-                                if depth == 0:
-                                    bit = pixel_int & 1
-                                elif depth == 1:
-                                    bit = (pixel_int >> 1) & 1
-                                elif depth == 2:
-                                    bit = (pixel_int >> 2) & 1
-                                bits.append(bit)
-                                bit_idx += 1
-                    
-                    if bit_idx >= data_length:
-                        break
-                if bit_idx >= data_length:
-                    break
-            
-            # 将比特转换为文本
-            extracted_text = watermark_Mark._bits_to_text(bits, use_compression=True)
-            return (extracted_text,)
+            texts = watermark_Extract.extract_batch(image, bit_depth, key)
+            if len(texts) == 1:
+                return (texts[0],)
+            return (json.dumps(texts, ensure_ascii=False),)
             
         except Exception as e:
             return ("",)
 
+    @staticmethod
+    def extract_batch(image, bit_depth="2", key=""):
+        """
+        逐张提取水印文本，返回列表，无水印或损坏的图像为空字符串
+
+        先一次性读取整批图像的容器头，魔数不符的图像按旧版格式做长度检查，
+        未加水印的图像只读取头部就被排除；v2 载荷需通过CRC32校验。
+        """
+        depth = int(bit_depth)
+        flat = _flatten(image)
+        total = flat.shape[1]
+        header_pixels = watermark_Mark._header_pixels(depth)
+        headers = _read_bits(flat, 0, CONTAINER_HEADER_BYTES * 8, depth)
+        legacy_lengths = None
+
+        texts = []
+        for index in range(flat.shape[0]):
+            parsed = None
+            if headers.shape[1] == CONTAINER_HEADER_BYTES * 8:
+                parsed = _parse_header(np.packbits(headers[index]).tobytes())
+            if parsed is None:
+                if legacy_lengths is None:
+                    legacy_lengths = watermark_Mark._extract_metadata(image, bit_depth)
+                texts.append(watermark_Extract._extract_legacy(flat[index:index + 1], legacy_lengths[index], bit_depth))
+                continue
+
+            flags, length, crc = parsed
+            payload_pixels = math.ceil(length * 8 / depth)
+            if length == 0 or header_pixels + payload_pixels > total:
+                texts.append("")
+                continue
+            # 位置按 (密钥, 元素数, 数量) 缓存，同批图像的载荷长度相同时不重复计算
+            positions = _spread_positions(key, total, header_pixels, payload_pixels)
+            bits = _read_bits(flat[index:index + 1], 0, length * 8, depth, positions)[0]
+            payload = np.packbits(bits).tobytes()
+            if zlib.crc32(payload) != crc:
+                texts.append("")
+                continue
+            try:
+                if flags & FLAG_COMPRESSED:
+                    payload = zlib.decompress(payload)
+                texts.append(payload.decode("utf-8"))
+            except (zlib.error, UnicodeDecodeError):
+                texts.append("")
+        return texts
+
+    @staticmethod
+    def _extract_legacy(flat, data_length, bit_depth):
+        """旧版格式：32位长度 + 顺序写入的比特"""
+        if data_length <= 0 or data_length > 1024 * 8 * 4:  # 合理性检查
+            return ""
+        # 提取数据比特并转换为文本
+        metadata_pixels = watermark_Mark._metadata_pixels(bit_depth)
+        bits = _read_bits(flat, metadata_pixels, data_length, int(bit_depth))[0]
+        return watermark_Mark._bits_to_text(bits, use_compression=True)
+
 
 # A dictionary that contains all nodes you want to export with their names
 # NOTE: names should be globally unique
@@ -1,11 +1,13 @@
 import torch
 import torch.nn.functional as F
-from PIL import Image
-import torchvision.transforms.functional as TVF
 from transformers import Owlv2VisionModel
 from torch import nn
 import folder_paths
+import comfy.model_management
+import comfy.model_patcher
 import os
+import threading
+from collections import OrderedDict
 
 # Register design_models directory
 if "design_models" not in folder_paths.folder_names_and_paths:
@@ -57,6 +59,206 @@ class DetectorModelOwl(nn.Module):
 
         return (x,)
 
+class DetectorInferenceOwl(nn.Module):
+    """不带 autocast 的 float32 推理封装，用于 int8 动态量化和 ONNX 导出"""
+
+    def __init__(self, detector: DetectorModelOwl):
+        super().__init__()
+        self.detector = detector
+
+    def forward(self, pixel_values: torch.Tensor):
+        d = self.detector
+        x = d.owl(pixel_values=pixel_values).last_hidden_state
+        x = d.act1(d.linear1(d.ln1(x)))
+        x, _ = x.max(dim=1)
+        return d.linear2(d.ln2(x))
+
+# 推理后端：pytorch 为原始模型；int8 为 Linear 层动态量化（CPU）；onnx 为导出的 ONNX Runtime 图
+BACKENDS = ["pytorch", "int8", "onnx"]
+
+# 常驻内存的模型数量上限，超出时淘汰最久未使用的
+MAX_RESIDENT_MODELS = int(os.environ.get("DESIGN_AI_WATERMARK_MODEL_CACHE", "2"))
+# 单次前向的图像数
+INFERENCE_BATCH_SIZE = int(os.environ.get("DESIGN_AI_WATERMARK_BATCH_SIZE", "4"))
+
+INPUT_SIZE = 960
+PAD_VALUE = 128
+NORM_MEAN = [0.48145466, 0.4578275, 0.40821073]
+NORM_STD = [0.26862954, 0.26130258, 0.27577711]
+
+_models = OrderedDict()
+# 只保护 _models 和 _loading 的读写，模型构建在各自的加载锁中进行
+_models_lock = threading.Lock()
+_loading = {}
+
+
+def _device():
+    return comfy.model_management.get_torch_device()
+
+
+def resolve_paths(owl_model_dir, owl_weights_name):
+    owl_model_path = os.path.join(folder_paths.get_folder_paths("design_models")[0], owl_model_dir)
+    owl_weights_path = folder_paths.get_full_path("design_models", owl_weights_name)
+    return owl_model_path, owl_weights_path
+
+
+def onnx_path(owl_weights_path):
+    """导出的 ONNX 文件与权重放在同一目录，同名 .onnx"""
+    return os.path.splitext(owl_weights_path)[0] + ".onnx"
+
+
+def load_detector(owl_model_path, owl_weights_path):
+    """在CPU上构建并加载检测模型"""
+    owl_model = DetectorModelOwl(owl_model_path, dropout=0.0)
+    owl_model.load_state_dict(torch.load(owl_weights_path, map_location="cpu"))
+    owl_model.eval()
+    return owl_model
+
+
+class _Backend:
+    """
+    统一的推理入口：输入预处理后的 [B,3,960,960] 张量，返回 logits
+
+    patcher 为交给 ComfyUI 显存管理的 ModelPatcher，推理前由 prepare() 载入显存，
+    显存不足时 ComfyUI 可以把它卸载回CPU。
+    """
+
+    def __init__(self, run, device, patcher=None):
+        self.run = run
+        self.device = device
+        self.patcher = patcher
+
+    def prepare(self):
+        if self.patcher is not None:
+            comfy.model_management.load_models_gpu([self.patcher])
+
+    def __call__(self, pixel_values):
+        return self.run(pixel_values)
+
+
+def _build_backend(owl_model_path, owl_weights_path, backend):
+    if backend == "onnx":
+        path = onnx_path(owl_weights_path)
+        if not os.path.exists(path):
+            raise ValueError(f"未找到ONNX模型 {path}，请先用 WatermarkBackendExport 节点导出")
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ValueError("onnx 后端需要安装 onnxruntime")
+        providers = [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider")
+                     if p in onnxruntime.get_available_providers()]
+        session = onnxruntime.InferenceSession(path, providers=providers)
+
+        def run(pixel_values):
+            logits, = session.run(["logits"], {"pixel_values": pixel_values.cpu().numpy()})
+            return torch.from_numpy(logits)
+        return _Backend(run, torch.device("cpu"))
+
+    owl_model = load_detector(owl_model_path, owl_weights_path)
+    if backend == "int8":
+        # 量化后的 Linear 只能在CPU上运行
+        quantized = torch.ao.quantization.quantize_dynamic(
+            DetectorInferenceOwl(owl_model), {nn.Linear}, dtype=torch.qint8
+        )
+        return _Backend(quantized, torch.device("cpu"))
+
+    # 模型留在卸载设备上，由 ComfyUI 在推理前载入显存、显存紧张时卸载
+    device = _device()
+    patcher = comfy.model_patcher.ModelPatcher(
+        owl_model, load_device=device, offload_device=comfy.model_management.unet_offload_device()
+    )
+    return _Backend(lambda pixel_values: patcher.model(pixel_values, None)[0], device, patcher)
+
+
+def get_model(owl_model_dir, owl_weights_name, backend="pytorch"):
+    """
+    按 (模型目录, 权重, 后端) 加载一次并常驻，pytorch 后端交给 ComfyUI 的显存管理
+
+    加载在该键自己的锁中进行，不阻塞对其他已缓存模型的查找。
+    """
+    owl_model_path, owl_weights_path = resolve_paths(owl_model_dir, owl_weights_name)
+    key = (owl_model_path, owl_weights_path, backend)
+
+    with _models_lock:
+        if key in _models:
+            _models.move_to_end(key)
+            return _models[key]
+        load_lock = _loading.setdefault(key, threading.Lock())
+
+    with load_lock:
+        with _models_lock:
+            if key in _models:
+                _models.move_to_end(key)
+                return _models[key]
+
+        print(f"[WatermarkDetector] 加载模型 {owl_model_dir} / {owl_weights_name}，后端: {backend}")
+        try:
+            model = _build_backend(owl_model_path, owl_weights_path, backend)
+        except Exception:
+            with _models_lock:
+                _loading.pop(key, None)
+            raise
+
+        with _models_lock:
+            _models[key] = model
+            _loading.pop(key, None)
+            while len(_models) > MAX_RESIDENT_MODELS:
+                _models.popitem(last=False)
+        return model
+
+
+def clear_models():
+    """清空常驻模型，返回清除的数量；已交给 ComfyUI 管理的模型先从显存卸载"""
+    with _models_lock:
+        models = list(_models.values())
+        _models.clear()
+    patchers = [model.patcher for model in models if model.patcher is not None]
+    if patchers:
+        for loaded in list(comfy.model_management.current_loaded_models):
+            if any(loaded.model is patcher for patcher in patchers):
+                loaded.model_unload()
+                comfy.model_management.current_loaded_models.remove(loaded)
+        comfy.model_management.soft_empty_cache()
+    return len(models)
+
+
+def preprocess(image):
+    """
+    批量预处理 [B,H,W,C] 图像：量化到 uint8、右下补灰成正方形、bicubic 缩放到 960x960、归一化
+
+    与原先逐张 PIL 处理的步骤一致，全部以批量张量运算完成。
+    """
+    pixels = (image[..., :3] * 255).to(torch.uint8).float()
+    batch, height, width, _ = pixels.shape
+    big_side = max(height, width)
+    pixels = pixels.movedim(-1, 1)
+    if height != width:
+        pixels = F.pad(pixels, (0, big_side - width, 0, big_side - height), value=PAD_VALUE)
+
+    resized = F.interpolate(pixels, size=(INPUT_SIZE, INPUT_SIZE), mode="bicubic",
+                            align_corners=False, antialias=True)
+    resized = resized.round_().clamp_(0, 255) / 255.0
+    mean = torch.tensor(NORM_MEAN, device=resized.device).view(1, 3, 1, 1)
+    std = torch.tensor(NORM_STD, device=resized.device).view(1, 3, 1, 1)
+    return (resized - mean) / std
+
+
+def predict(image, owl_model_dir, owl_weights_name, backend="pytorch"):
+    """对整批图像推理，返回每张图像的 (预测类别, 带水印概率)"""
+    model = get_model(owl_model_dir, owl_weights_name, backend)
+
+    model.prepare()
+    results = []
+    with torch.no_grad():
+        for start in range(0, image.shape[0], INFERENCE_BATCH_SIZE):
+            input_images = preprocess(image[start:start + INFERENCE_BATCH_SIZE].to(model.device))
+            logits = model(input_images)
+            probs = F.softmax(logits.float(), dim=1).cpu()
+            predictions = torch.argmax(probs, dim=1)
+            results.extend(zip(predictions.tolist(), probs[:, 1].tolist()))
+    return results
+
+
 class WatermarkDetector:
     @classmethod
     def INPUT_TYPES(s):
@@ -67,48 +269,27 @@ class WatermarkDetector:
                 "owl_weights_name": (folder_paths.get_filename_list("design_models"), ),
                 "confidence_threshold": ("FLOAT", {"default": 0.5, "min": 0.0, "max": 1.0, "step": 0.01}),
             },
+            "optional": {
+                "backend": (BACKENDS, {
+                    "default": "pytorch",
+                    "tooltip": "推理后端：int8 和 onnx 适合仅有CPU的机器，onnx 需先用 WatermarkBackendExport 导出"
+                }),
+            },
         }
 
     RETURN_TYPES = ("IMAGE", "STRING")
     FUNCTION = "detect_watermark"
     CATEGORY = "✨✨✨design-ai/img"
 
-    def detect_watermark(self, image, owl_model_dir, owl_weights_name, confidence_threshold):
-        # Get full paths
-        owl_model_path = os.path.join(folder_paths.get_folder_paths("design_models")[0], owl_model_dir)
-        owl_weights_path = folder_paths.get_full_path("design_models", owl_weights_name)
-
-        # Load OWLv2 model
-        owl_model = DetectorModelOwl(owl_model_path, dropout=0.0)
-        owl_model.load_state_dict(torch.load(owl_weights_path, map_location="cuda"))
-        owl_model = owl_model.to('cuda')
-        owl_model.eval()
-
-        # Process image for OWLv2
-        pil_image = Image.fromarray((image[0].cpu().numpy() * 255).astype('uint8'))
-        
-        # Pad to square
-        big_side = max(pil_image.size)
-        new_image = Image.new("RGB", (big_side, big_side), (128, 128, 128))
-        new_image.paste(pil_image, (0, 0))
-
-        # Resize to 960x960
-        preped = new_image.resize((960, 960), Image.BICUBIC)
-
-        # Convert to tensor and normalize
-        preped = TVF.pil_to_tensor(preped)
-        preped = preped / 255.0
-        input_image = TVF.normalize(preped, [0.48145466, 0.4578275, 0.40821073], [0.26862954, 0.26130258, 0.27577711])
-
-        # Run OWLv2 prediction
-        with torch.no_grad():
-            logits, = owl_model(input_image.to('cuda').unsqueeze(0), None)
-            probs = F.softmax(logits, dim=1)
-            owl_prediction = torch.argmax(probs.cpu(), dim=1)
-            owl_label = "Watermarked" if owl_prediction.item() == 1 else "Not Watermarked"
+    def detect_watermark(self, image, owl_model_dir, owl_weights_name, confidence_threshold, backend="pytorch"):
+        # Run OWLv2 prediction on the whole batch with the resident model
+        results = predict(image, owl_model_dir, owl_weights_name, backend)
+        labels = ["Watermarked" if prediction == 1 else "Not Watermarked" for prediction, _ in results]
 
         # Return original image and prediction
-        return (image, f"OWLv2 Prediction: {owl_label}")
+        if len(labels) == 1:
+            return (image, f"OWLv2 Prediction: {labels[0]}")
+        return (image, "\n".join(f"#{i + 1} OWLv2 Prediction: {label}" for i, label in enumerate(labels)))
 
 class WatermarkCheck:
     @classmethod
@@ -120,54 +301,134 @@ class WatermarkCheck:
                 "owl_weights_name": (folder_paths.get_filename_list("design_models"), ),
                 "confidence_threshold": ("FLOAT", {"default": 0.5, "min": 0.0, "max": 1.0, "step": 0.01}),
             },
+            "optional": {
+                "backend": (BACKENDS, {
+                    "default": "pytorch",
+                    "tooltip": "推理后端：int8 和 onnx 适合仅有CPU的机器，onnx 需先用 WatermarkBackendExport 导出"
+                }),
+            },
         }
 
     RETURN_TYPES = ("BOOLEAN",)
     FUNCTION = "check_watermark"
     CATEGORY = "✨✨✨design-ai/img"
 
-    def check_watermark(self, image, owl_model_dir, owl_weights_name, confidence_threshold):
-        # Get full paths
-        owl_model_path = os.path.join(folder_paths.get_folder_paths("design_models")[0], owl_model_dir)
-        owl_weights_path = folder_paths.get_full_path("design_models", owl_weights_name)
+    def check_watermark(self, image, owl_model_dir, owl_weights_name, confidence_threshold, backend="pytorch"):
+        # Run OWLv2 prediction on the whole batch with the resident model
+        results = predict(image, owl_model_dir, owl_weights_name, backend)
 
-        # Load OWLv2 model
-        owl_model = DetectorModelOwl(owl_model_path, dropout=0.0)
-        owl_model.load_state_dict(torch.load(owl_weights_path, map_location="cuda"))
-        owl_model = owl_model.to('cuda')
-        owl_model.eval()
+        # Return boolean result: True when any image in the batch is watermarked
+        return (any(prediction == 1 for prediction, _ in results),)
 
-        # Process image for OWLv2
-        pil_image = Image.fromarray((image[0].cpu().numpy() * 255).astype('uint8'))
-        
-        # Pad to square
-        big_side = max(pil_image.size)
-        new_image = Image.new("RGB", (big_side, big_side), (128, 128, 128))
-        new_image.paste(pil_image, (0, 0))
-
-        # Resize to 960x960
-        preped = new_image.resize((960, 960), Image.BICUBIC)
-
-        # Convert to tensor and normalize
-        preped = TVF.pil_to_tensor(preped)
-        preped = preped / 255.0
-        input_image = TVF.normalize(preped, [0.48145466, 0.4578275, 0.40821073], [0.26862954, 0.26130258, 0.27577711])
-
-        # Run OWLv2 prediction
-        with torch.no_grad():
-            logits, = owl_model(input_image.to('cuda').unsqueeze(0), None)
-            probs = F.softmax(logits, dim=1)
-            owl_prediction = torch.argmax(probs.cpu(), dim=1)
-        
-        # Return boolean result
-        return (owl_prediction.item() == 1,)
+class WatermarkModelUnload:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "image": ("IMAGE", {"tooltip": "原样输出，用于把卸载放在检测之后执行"}),
+            },
+        }
+
+    RETURN_TYPES = ("IMAGE", "STRING")
+    RETURN_NAMES = ("image", "report")
+    FUNCTION = "unload_models"
+    CATEGORY = "✨✨✨design-ai/img"
+
+    def unload_models(self, image):
+        # 清空常驻的水印检测模型，释放显存和内存
+        count = clear_models()
+        return (image, f"已卸载 {count} 个水印检测模型")
+
+def export_onnx(owl_model_dir, owl_weights_name, opset=17):
+    """把 design_models 中的检测模型导出为 ONNX（batch 维动态），返回导出路径"""
+    owl_model_path, owl_weights_path = resolve_paths(owl_model_dir, owl_weights_name)
+    path = onnx_path(owl_weights_path)
+    wrapper = DetectorInferenceOwl(load_detector(owl_model_path, owl_weights_path))
+    dummy = torch.zeros(1, 3, INPUT_SIZE, INPUT_SIZE)
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper, (dummy,), path,
+            input_names=["pixel_values"], output_names=["logits"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+            opset_version=opset
+        )
+    # 导出后清除该权重的常驻 onnx 会话，下次使用新文件
+    with _models_lock:
+        _models.pop((owl_model_path, owl_weights_path, "onnx"), None)
+    return path
+
+
+def parity_check(images, owl_model_dir, owl_weights_name, backend):
+    """在样本图像上比较指定后端与 pytorch 后端，返回 (预测一致率, 带水印概率最大差值)"""
+    reference = predict(images, owl_model_dir, owl_weights_name, "pytorch")
+    candidate = predict(images, owl_model_dir, owl_weights_name, backend)
+    agreement = sum(r[0] == c[0] for r, c in zip(reference, candidate)) / len(reference)
+    max_diff = max(abs(r[1] - c[1]) for r, c in zip(reference, candidate))
+    return agreement, max_diff
+
+
+class WatermarkBackendExport:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "owl_model_dir": ("STRING", {"default": "owlv2-base-patch16-ensemble"}),
+                "owl_weights_name": (folder_paths.get_filename_list("design_models"), ),
+                "backend": (["onnx", "int8"], {
+                    "default": "onnx",
+                    "tooltip": "onnx：导出为与权重同名的 .onnx 文件；int8：加载时动态量化，无需导出文件"
+                }),
+            },
+            "optional": {
+                "sample_images": ("IMAGE", {"tooltip": "用于与 pytorch 后端对比精度的样本图像，未提供时精度对比视为未通过"}),
+                "opset": ("INT", {"default": 17, "min": 11, "max": 20, "step": 1}),
+                "prob_tolerance": ("FLOAT", {
+                    "default": 0.05, "min": 0.0, "max": 1.0, "step": 0.005,
+                    "tooltip": "带水印概率与 pytorch 后端的最大允许差值"
+                }),
+            },
+        }
+
+    RETURN_TYPES = ("STRING", "BOOLEAN")
+    RETURN_NAMES = ("report", "parity_passed")
+    FUNCTION = "export_backend"
+    CATEGORY = "✨✨✨design-ai/img"
+
+    def export_backend(self, owl_model_dir, owl_weights_name, backend, sample_images=None, opset=17, prob_tolerance=0.05):
+        lines = []
+        if backend == "onnx":
+            path = export_onnx(owl_model_dir, owl_weights_name, opset)
+            lines.append(f"ONNX 导出完成: {path}")
+
+        if sample_images is None:
+            # 没有样本时无法验证该后端，不能报告为通过
+            lines.append("未提供样本图像，未进行精度对比")
+            return ("\n".join(lines), False)
+
+        agreement, max_diff = parity_check(sample_images, owl_model_dir, owl_weights_name, backend)
+        passed = agreement == 1.0 and max_diff <= prob_tolerance
+        lines.append(f"样本数: {sample_images.shape[0]}, 预测一致率: {agreement:.2%}, "
+                     f"带水印概率最大差值: {max_diff:.4f}（容差 {prob_tolerance:.4f}）")
+        if passed:
+            lines.append("精度对比通过")
+        elif agreement < 1.0:
+            lines.append("精度对比未通过：存在预测不一致的样本")
+        else:
+            lines.append("精度对比未通过：带水印概率差值超出容差")
+        report = "\n".join(lines)
+        print(f"[WatermarkBackendExport] {report}")
+        return (report, passed)
 
 NODE_CLASS_MAPPINGS = {
     "WatermarkDetector": WatermarkDetector,
-    "WatermarkCheck": WatermarkCheck
+    "WatermarkCheck": WatermarkCheck,
+    "WatermarkBackendExport": WatermarkBackendExport,
+    "WatermarkModelUnload": WatermarkModelUnload
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "WatermarkDetector": "Watermark Detection",
-    "WatermarkCheck": "Watermark Check"
+    "WatermarkCheck": "Watermark Check",
+    "WatermarkBackendExport": "Watermark Backend Export",
+    "WatermarkModelUnload": "Watermark Model Unload"
 }
@@ -0,0 +1,135 @@
+# batch_runner.py
+"""
+网关生成节点的并行扇出
+
+把一组 prompt/seed 变体以有界并发提交给同一个生成节点，
+按输入顺序把结果合并成一个IMAGE批次，并附带逐项成功标记。
+"""
+
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+import torch.nn.functional as F
+
+
+def parse_variants(batch_prompts="", batch_seeds=""):
+    """
+    解析批量参数，返回变体列表 [{"prompt": ..., "seed": ...}, ...]
+
+    batch_prompts 每行一个提示词，batch_seeds 以逗号或空白分隔。
+    两者数量相同时逐项配对；其中一个只有一项时广播；否则取笛卡尔积。
+    都为空时返回空列表（单次模式）。
+    """
+    prompts = [line.strip() for line in (batch_prompts or "").splitlines() if line.strip()]
+    seeds = []
+    for token in re.split(r"[,\s]+", (batch_seeds or "").strip()):
+        if not token:
+            continue
+        try:
+            seeds.append(int(token))
+        except ValueError:
+            raise ValueError(f"无效的种子: {token}")
+
+    if not prompts and not seeds:
+        return []
+    if not seeds:
+        return [{"prompt": prompt} for prompt in prompts]
+    if not prompts:
+        return [{"seed": seed} for seed in seeds]
+    if len(prompts) == len(seeds):
+        return [{"prompt": p, "seed": s} for p, s in zip(prompts, seeds)]
+    if len(prompts) == 1 or len(seeds) == 1:
+        count = max(len(prompts), len(seeds))
+        return [{"prompt": prompts[i % len(prompts)], "seed": seeds[i % len(seeds)]} for i in range(count)]
+    return [{"prompt": p, "seed": s} for p in prompts for s in seeds]
+
+
+def run_variants(node_cls, method_name, kwargs, variants, max_concurrency=4):
+    """
+    并发执行各变体，每个变体使用独立的节点实例（节点日志是实例状态）
+
+    返回与 variants 顺序一致的节点输出元组列表
+    """
+    def run_one(variant):
+        node = node_cls()
+        try:
+            return getattr(node, method_name)(**{**kwargs, **variant})
+        except Exception as e:
+            return (node._create_blank_image(), False, f"批量子任务失败: {str(e)}", "", "")
+
+    workers = max(1, min(int(max_concurrency), len(variants)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="design-ai-batch") as pool:
+        return list(pool.map(run_one, variants))
+
+
+def stack_images(image_batches, reference=None):
+    """合并多个IMAGE批次，尺寸与参考批次不一致时双线性缩放到参考尺寸"""
+    reference = reference if reference is not None else image_batches[0]
+    height, width = reference.shape[1], reference.shape[2]
+    resized = []
+    for images in image_batches:
+        if images.shape[1] != height or images.shape[2] != width:
+            images = F.interpolate(
+                images.movedim(-1, 1), size=(height, width), mode="bilinear", align_corners=False
+            ).movedim(1, -1)
+        resized.append(images)
+    return torch.cat(resized, dim=0)
+
+
+def combine_results(results, variants):
+    """
+    合并各变体的 (images, success, message, response_json, usage_info)
+
+    返回 (images, success, message, response_json, usage_info, item_success)，
+    success 仅在全部变体成功时为True，item_success 为逐项成功标记的JSON列表
+    """
+    flags = [bool(result[1]) for result in results]
+    reference = next((result[0] for result in results if result[1]), None)
+    images = stack_images([result[0] for result in results], reference)
+
+    responses = []
+    for variant, result in zip(variants, results):
+        try:
+            response = json.loads(result[3]) if result[3] else None
+        except json.JSONDecodeError:
+            response = result[3]
+        responses.append({"variant": variant, "success": bool(result[1]), "message": result[2], "response": response})
+
+    succeeded = sum(flags)
+    message = f"批量生成完成: 成功 {succeeded}/{len(results)}"
+    failures = [f"#{i + 1}: {result[2]}" for i, result in enumerate(results) if not result[1]]
+    if failures:
+        message += "\n" + "\n".join(failures)
+
+    usage_info = "\n\n".join(f"===== 变体 #{i + 1} =====\n{result[4]}" for i, result in enumerate(results))
+    response_json = json.dumps(responses, ensure_ascii=False, indent=2)
+    return (images, succeeded == len(results), message, response_json, usage_info, json.dumps(flags))
+
+
+class BatchGenerateMixin:
+    """
+    为生成节点提供批量模式入口 generate_image
+
+    节点只需实现单次生成的 _generate_single 与 _create_blank_image，
+    输出在单次生成的返回值后追加逐项成功标记的JSON列表
+    """
+
+    def generate_image(self, batch_prompts="", batch_seeds="", max_concurrency=4, **kwargs):
+        """
+        批量模式入口：batch_prompts/batch_seeds 为空时执行单次生成，
+        否则按变体并发扇出，结果合并为一个图像批次并附带逐项成功标记
+        """
+        try:
+            variants = parse_variants(batch_prompts, batch_seeds)
+        except ValueError as e:
+            return (self._create_blank_image(), False, f"批量参数错误: {str(e)}", "", "", "[]")
+
+        if not variants:
+            result = self._generate_single(**kwargs)
+            return result + (json.dumps([bool(result[1])]),)
+
+        print(f"[{type(self).__name__}] 批量模式: {len(variants)} 个变体, 最大并发 {max_concurrency}")
+        results = run_variants(type(self), "_generate_single", kwargs, variants, max_concurrency)
+        return combine_results(results, variants)
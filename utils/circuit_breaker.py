@@ -0,0 +1,170 @@
+# circuit_breaker.py
+"""
+网关环境熔断器
+
+按 base_url 统计最近请求的失败率（连接错误、超时、5xx，以及可选的慢请求），
+失败率过高时熔断：后续请求立即失败（或由调用方切换到备用环境），不再等满超时；
+冷却期过后放行少量半开探测请求，探测成功则恢复，失败则继续熔断。
+
+参数通过环境变量配置：
+    DESIGN_AI_BREAKER_WINDOW         统计窗口内的请求数（默认20）
+    DESIGN_AI_BREAKER_MIN_CALLS      触发熔断所需的最少请求数（默认5）
+    DESIGN_AI_BREAKER_FAILURE_RATIO  熔断失败率阈值（默认0.5）
+    DESIGN_AI_BREAKER_COOLDOWN       熔断冷却秒数（默认30）
+    DESIGN_AI_BREAKER_SLOW_SECONDS   超过该耗时的请求计为失败（默认0，不启用）
+    DESIGN_AI_GATEWAY_FAILOVER       备用环境，JSON：{"主base_url": ["备用base_url", ...]}
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_settings = {
+    "window": int(os.environ.get("DESIGN_AI_BREAKER_WINDOW", "20")),
+    "min_calls": int(os.environ.get("DESIGN_AI_BREAKER_MIN_CALLS", "5")),
+    "failure_ratio": float(os.environ.get("DESIGN_AI_BREAKER_FAILURE_RATIO", "0.5")),
+    "cooldown": float(os.environ.get("DESIGN_AI_BREAKER_COOLDOWN", "30")),
+    "slow_call_seconds": float(os.environ.get("DESIGN_AI_BREAKER_SLOW_SECONDS", "0")) or None,
+}
+_failover = {}
+_breakers = {}
+_lock = threading.Lock()
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """环境已熔断，请求未发送"""
+
+
+class CircuitBreaker:
+    def __init__(self, name, window=20, min_calls=5, failure_ratio=0.5, cooldown=30.0,
+                 slow_call_seconds=None, half_open_max=1):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.cooldown = cooldown
+        self.slow_call_seconds = slow_call_seconds
+        self.half_open_max = half_open_max
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._latencies = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """是否放行一次请求；半开状态下只放行有限个探测请求"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    return False
+                self.state = HALF_OPEN
+                self._probes = 0
+                print(f"[CircuitBreaker] {self.name} 冷却结束，进入半开状态")
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_max:
+                    return False
+                self._probes += 1
+            return True
+
+    def release(self):
+        """放弃一次已放行但没有结果的请求（非网络异常），归还半开探测名额"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def retry_in(self):
+        """距离允许半开探测还需的秒数"""
+        return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+    def record(self, success, latency):
+        """记录一次请求结果"""
+        if success and self.slow_call_seconds and latency > self.slow_call_seconds:
+            success = False
+        with self._lock:
+            self._latencies.append(latency)
+            if self.state == HALF_OPEN:
+                if success:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    print(f"[CircuitBreaker] {self.name} 探测成功，恢复正常")
+                else:
+                    self._open()
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (self.state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_ratio):
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        print(f"[CircuitBreaker] {self.name} 熔断，{self.cooldown:.0f}秒内请求将快速失败")
+
+    def snapshot(self):
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                "state": self.state,
+                "calls": calls,
+                "failure_rate": self._outcomes.count(False) / calls if calls else 0.0,
+                "avg_latency": sum(self._latencies) / len(self._latencies) if self._latencies else 0.0,
+            }
+
+
+def configure(**settings):
+    """调整熔断参数，已创建的熔断器会被重建"""
+    with _lock:
+        _settings.update(settings)
+        _breakers.clear()
+
+
+def configure_failover(base_url, fallbacks):
+    """设置 base_url 熔断或连接失败时依次尝试的备用 base_url"""
+    _failover[base_url.rstrip('/')] = [fallback.rstrip('/') for fallback in fallbacks]
+
+
+def fallbacks(base_url):
+    return _failover.get(base_url.rstrip('/'), [])
+
+
+def get_breaker(base_url):
+    key = base_url.rstrip('/')
+    breaker = _breakers.get(key)
+    if breaker is not None:
+        return breaker
+    with _lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(key, **_settings)
+            _breakers[key] = breaker
+    return breaker
+
+
+def states():
+    """所有熔断器的状态快照"""
+    with _lock:
+        breakers = dict(_breakers)
+    return {name: breaker.snapshot() for name, breaker in breakers.items()}
+
+
+def _load_failover():
+    raw = os.environ.get("DESIGN_AI_GATEWAY_FAILOVER", "").strip()
+    if not raw:
+        return
+    try:
+        for base_url, targets in json.loads(raw).items():
+            configure_failover(base_url, targets)
+    except (json.JSONDecodeError, AttributeError) as e:
+        print(f"[CircuitBreaker] DESIGN_AI_GATEWAY_FAILOVER 解析失败，已忽略: {str(e)}")
+
+
+_load_failover()
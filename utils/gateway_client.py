@@ -0,0 +1,182 @@
+# gateway_client.py
+"""
+万擎网关共享HTTP客户端
+
+按 (base_url, 代理) 维护进程级的 requests.Session 连接池，
+提交任务、轮询状态、下载结果都复用 keep-alive 连接，避免每次请求重新握手。
+"""
+
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import circuit_breaker, rate_limiter, retry_policy
+
+# 国内网关环境
+ENVIRONMENTS = {
+    "staging": "https://llm-gateway-staging.corp.kuaishou.com",
+    "prod": "https://llm-gateway-prod.corp.kuaishou.com",
+    "idc": "http://llm-gateway.internal",
+    "overseas": "http://llm-gateway-sgp.internal",
+    "domestic": "http://llm-gateway.internal"
+}
+
+# 新加坡网关环境（Gemini / GPT 等海外模型）
+SGP_ENVIRONMENTS = {
+    "staging": "https://llm-gateway-staging-sgp.corp.kuaishou.com",
+    "prod": "https://llm-gateway-prod-sgp.corp.kuaishou.com",
+    "idc": "http://llm-gateway.internal",
+    "overseas": "http://llm-gateway-sgp.internal",
+    "domestic": "http://llm-gateway.internal"
+}
+
+# Qwen 网关环境（staging 走新加坡，prod 走国内）
+QWEN_ENVIRONMENTS = {
+    "staging": "https://llm-gateway-staging-sgp.corp.kuaishou.com",
+    "prod": "https://llm-gateway-prod.corp.kuaishou.com",
+    "idc": "http://llm-gateway.internal",
+    "overseas": "http://llm-gateway-sgp.internal",
+    "domestic": "http://llm-gateway.internal"
+}
+
+_pool_config = {
+    "pool_connections": int(os.environ.get("DESIGN_AI_GATEWAY_POOL_CONNECTIONS", "16")),
+    "pool_maxsize": int(os.environ.get("DESIGN_AI_GATEWAY_POOL_MAXSIZE", "64")),
+}
+_sessions = {}
+_lock = threading.Lock()
+
+
+def configure_pools(pool_connections=None, pool_maxsize=None):
+    """调整连接池大小，已有会话会被关闭，下次请求时按新配置重建"""
+    with _lock:
+        if pool_connections is not None:
+            _pool_config["pool_connections"] = int(pool_connections)
+        if pool_maxsize is not None:
+            _pool_config["pool_maxsize"] = int(pool_maxsize)
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+def resolve_base_url(environment, custom_base_url="", environments=None):
+    """解析网关基础URL，自定义base_url优先于环境选择"""
+    if custom_base_url and custom_base_url.strip():
+        return custom_base_url.strip().rstrip('/')
+    return (environments or ENVIRONMENTS)[environment]
+
+
+def _proxy_key(proxies):
+    """将requests的proxies参数归一化为连接池键"""
+    if proxies is None:
+        return "system"
+    return proxies.get("https") or proxies.get("http") or "direct"
+
+
+def get_session(base_url, proxies=None):
+    """获取 (base_url, 代理) 对应的共享会话"""
+    key = (base_url.rstrip('/'), _proxy_key(proxies))
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=_pool_config["pool_connections"],
+                pool_maxsize=_pool_config["pool_maxsize"]
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[key] = session
+    return session
+
+
+def _send(method, url, base_url, model, kwargs):
+    session = get_session(base_url, kwargs.get("proxies"))
+    if model is None:
+        return session.request(method, url, **kwargs)
+    with rate_limiter.limit(base_url, model) as governor:
+        response = session.request(method, url, **kwargs)
+    rate_limiter.observe(governor, response)
+    return response
+
+
+def _dispatch(method, url, model, failover, kwargs):
+    """经过熔断器发送一次请求，必要时切换备用环境"""
+    parts = urlsplit(url)
+    base_url = f"{parts.scheme}://{parts.netloc}"
+    candidates = [base_url] + (circuit_breaker.fallbacks(base_url) if failover else [])
+
+    last_error = None
+    for candidate in candidates:
+        breaker = circuit_breaker.get_breaker(candidate)
+        if not breaker.allow():
+            last_error = circuit_breaker.CircuitOpenError(
+                f"网关环境 {candidate} 已熔断，{breaker.retry_in():.0f}秒后重试"
+            )
+            continue
+
+        target = url if candidate == base_url else candidate + url[len(base_url):]
+        if candidate != base_url:
+            print(f"[GatewayClient] 切换到备用环境: {candidate}")
+        started = time.monotonic()
+        try:
+            response = _send(method, target, candidate, model, kwargs)
+        except requests.exceptions.RequestException as e:
+            breaker.record(False, time.monotonic() - started)
+            if not isinstance(e, requests.exceptions.ConnectionError):
+                raise
+            last_error = e
+            continue
+        except BaseException:
+            # 非网络异常不计入失败率，但必须归还半开探测名额，否则熔断器会一直拒绝请求
+            breaker.release()
+            raise
+        breaker.record(response.status_code < 500, time.monotonic() - started)
+        return response
+
+    raise last_error
+
+
+def request(method, url, model=None, failover=False, retry=None, idempotency_key=None, **kwargs):
+    """
+    通过共享连接池发送请求，参数与 requests.request 一致
+
+    指定 model 时请求受 (base_url, model) 的限流与并发控制约束（见 rate_limiter）。
+    每个 base_url 有独立的熔断器（见 circuit_breaker），熔断时立即抛出 CircuitOpenError；
+    failover=True 时改为依次尝试配置的备用环境（仅在熔断或连接失败时切换，
+    只应用于不依赖后续同环境轮询的同步请求）。
+    失败时按 retry_policy 重试：GET 默认重试，POST 仅在传入 idempotency_key 时重试
+    （同时作为 Idempotency-Key 请求头发送）；retry=False 禁用重试。
+    """
+    if idempotency_key:
+        kwargs["headers"] = {**(kwargs.get("headers") or {}), "Idempotency-Key": idempotency_key}
+    policy = retry_policy.resolve(method, retry, idempotency_key)
+    if policy is None:
+        return _dispatch(method, url, model, failover, kwargs)
+    return policy.call(lambda: _dispatch(method, url, model, failover, kwargs))
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def close_all():
+    """关闭所有共享会话"""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
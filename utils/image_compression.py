@@ -0,0 +1,178 @@
+# image_compression.py
+"""
+按目标大小压缩上传图像
+
+先对从原图均匀采样的全分辨率小块拼成的样本试编码，按像素比例预测全尺寸编码后的大小
+（比整体缩略图更能保留原图的细节密度），
+再在预测结果上二分查找JPEG质量/缩放比例，全尺寸编码通常只需一到两次，
+最多 MAX_FULL_ENCODES 次，避免逐级降低质量时反复整图编码。
+"""
+
+import io
+import math
+
+from PIL import Image
+
+# 试编码样本由 PROBE_GRID x PROBE_GRID 个 PROBE_TILE 像素的小块拼成
+PROBE_TILE = 256
+PROBE_GRID = 3
+# 全尺寸编码次数上限
+MAX_FULL_ENCODES = 4
+# 预测留出的余量，抵消样本与整图细节密度的差异
+SAFETY = 0.92
+# PNG先用Pillow默认的zlib级别编码，超出限制时才改用最慢的最高级别
+PNG_FAST_LEVEL = 6
+PNG_MAX_LEVEL = 9
+
+
+def _encode(image, fmt, quality):
+    """编码图像，PNG时 quality 为zlib压缩级别"""
+    buffer = io.BytesIO()
+    if fmt == "PNG":
+        image.save(buffer, format="PNG", compress_level=quality)
+    else:
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _resize(image, scale):
+    size = (max(1, int(image.size[0] * scale)), max(1, int(image.size[1] * scale)))
+    return image.resize(size, Image.Resampling.LANCZOS)
+
+
+def _probe(image):
+    """从原图均匀位置截取全分辨率小块拼成试编码样本，小图直接使用原图"""
+    width, height = image.size
+    side = PROBE_TILE * PROBE_GRID
+    if width <= side and height <= side:
+        return image
+    tile_w, tile_h = min(PROBE_TILE, width), min(PROBE_TILE, height)
+    probe = Image.new(image.mode, (tile_w * PROBE_GRID, tile_h * PROBE_GRID))
+    for row in range(PROBE_GRID):
+        for col in range(PROBE_GRID):
+            left = (width - tile_w) * col // (PROBE_GRID - 1)
+            top = (height - tile_h) * row // (PROBE_GRID - 1)
+            probe.paste(image.crop((left, top, left + tile_w, top + tile_h)), (col * tile_w, row * tile_h))
+    return probe
+
+
+class _Predictor:
+    """用样本试编码预测全尺寸JPEG大小"""
+
+    def __init__(self, image):
+        probe = _probe(image)
+        self.probe = probe
+        self.ratio = (image.size[0] * image.size[1]) / (probe.size[0] * probe.size[1])
+        self.correction = 1.0
+        self._cache = {}
+
+    def size(self, quality, scale=1.0):
+        if quality not in self._cache:
+            self._cache[quality] = len(_encode(self.probe, "JPEG", quality))
+        return self._cache[quality] * self.ratio * scale * scale * self.correction
+
+    def best_quality(self, max_bytes, low, high, scale=1.0):
+        """预测能满足大小限制的最高质量，没有时返回None"""
+        if self.size(low, scale) > max_bytes:
+            return None
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.size(mid, scale) <= max_bytes:
+                low = mid
+            else:
+                high = mid - 1
+        return low
+
+
+def _quantize(image):
+    """RGB/RGBA图像量化为256色调色板（抖动），分辨率不变；其他模式返回None"""
+    if image.mode not in ('RGB', 'RGBA'):
+        return None
+    return image.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+
+
+def _compress_png(image, max_bytes, target_size, min_scale):
+    """
+    PNG只能通过压缩级别、降低色深和缩小尺寸控制大小（指定目标尺寸时不缩放）
+
+    先用默认级别编码，已在限制内时直接返回；超出时依次改用最高级别、量化为256色，
+    尽量保持原始分辨率，仍超出才缩小尺寸
+    """
+    if target_size is not None and image.size != target_size:
+        image = image.resize(target_size, Image.Resampling.LANCZOS)
+    data = _encode(image, "PNG", PNG_FAST_LEVEL)
+    if len(data) <= max_bytes:
+        return data, image.size
+    data = _encode(image, "PNG", PNG_MAX_LEVEL)
+    if len(data) <= max_bytes:
+        return data, image.size
+    quantized = _quantize(image)
+    if quantized is not None:
+        data = _encode(quantized, "PNG", PNG_MAX_LEVEL)
+    if len(data) <= max_bytes or target_size is not None:
+        return data, image.size
+
+    original, scale, size = image, 1.0, image.size
+    for _ in range(MAX_FULL_ENCODES - 1):
+        if len(data) <= max_bytes or scale <= min_scale:
+            break
+        scale = max(min_scale, scale * math.sqrt(max_bytes / len(data)) * SAFETY)
+        resized = _resize(original, scale)
+        size = resized.size
+        data = _encode(_quantize(resized) or resized, "PNG", PNG_MAX_LEVEL)
+    return data, size
+
+
+def _compress_jpeg(image, max_bytes, quality, min_quality, target_size, min_scale):
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    if target_size is not None and image.size != target_size:
+        image = image.resize(target_size, Image.Resampling.LANCZOS)
+
+    predictor = _Predictor(image)
+    budget = max_bytes * SAFETY
+    scale = 1.0
+    current = predictor.best_quality(budget, min_quality, quality)
+    if current is None:
+        if target_size is not None:
+            current = min_quality
+        else:
+            # 最低质量也放不下时按预测结果缩小尺寸，质量仍取二分查找结果
+            scale = max(min_scale, math.sqrt(budget / predictor.size(quality)))
+            current = predictor.best_quality(budget, min_quality, quality, scale) or min_quality
+
+    candidate = _resize(image, scale) if scale < 1.0 else image
+    data = _encode(candidate, "JPEG", current)
+    for _ in range(MAX_FULL_ENCODES - 1):
+        if len(data) <= max_bytes:
+            break
+        # 用实际大小校正预测，再查找一次
+        predictor.correction *= len(data) / predictor.size(current, scale)
+        next_quality = None
+        if current > min_quality:
+            next_quality = predictor.best_quality(budget, min_quality, current - 1, scale)
+        if next_quality is None:
+            if target_size is not None or scale <= min_scale:
+                if current == min_quality:
+                    break
+                next_quality = min_quality
+            else:
+                scale = max(min_scale, scale * math.sqrt(budget / predictor.size(current, scale)))
+                next_quality = predictor.best_quality(budget, min_quality, quality, scale) or min_quality
+                candidate = _resize(image, scale)
+        current = next_quality
+        data = _encode(candidate, "JPEG", current)
+    return data, candidate.size
+
+
+def compress_to_size(image, max_bytes, format="JPEG", quality=85, min_quality=20, target_size=None, min_scale=0.3):
+    """
+    把PIL图像编码到 max_bytes 以内，返回 (图像字节, 最终尺寸)
+
+    JPEG 在 [min_quality, quality] 内查找最高可用质量，仍放不下时缩小尺寸（不小于 min_scale）；
+    PNG 不会退回JPEG，依次提高压缩级别、量化为256色，最后才缩小尺寸。指定 target_size 时输出固定为该尺寸、不再缩放。
+    无法满足限制时返回最后一次编码结果。
+    """
+    if format == "PNG":
+        return _compress_png(image, max_bytes, target_size, min_scale)
+    return _compress_jpeg(image, max_bytes, quality, min_quality, target_size, min_scale)
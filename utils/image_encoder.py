@@ -0,0 +1,70 @@
+# image_encoder.py
+"""
+输入图像编码
+
+把 IMAGE 张量编码为上传用的图像字节 / base64，供各图像输入节点共用。
+分块直接量化到预分配的 uint8 缓冲区，不生成整张的 float 中间数组；
+uint8 数组零拷贝交给 PIL 编码（JPEG/WebP 按质量，PNG 使用低压缩级别）。
+"""
+
+import base64
+import io
+
+import torch
+from PIL import Image
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+# 每次量化的行数，限制临时float块的大小
+_CHUNK_ROWS = 256
+
+
+def to_uint8(tensor):
+    """
+    将单张图像张量量化为 [H,W,C] uint8 数组（批量时取第一张）
+
+    取值在 [0,1] 内时乘以255，否则视为已是 0-255 范围并截断，与各节点原有行为一致。
+    """
+    if tensor.dim() == 4:
+        tensor = tensor[0]
+    tensor = tensor.detach()
+    if tensor.dtype == torch.uint8:
+        return tensor.cpu().numpy()
+
+    scale = 255.0 if tensor.max() <= 1.0 else 1.0
+    out = torch.empty(tensor.shape, dtype=torch.uint8)
+    for start in range(0, tensor.shape[0], _CHUNK_ROWS):
+        chunk = tensor[start:start + _CHUNK_ROWS].float() * scale
+        out[start:start + _CHUNK_ROWS].copy_(chunk.clamp_(0, 255))
+    return out.numpy()
+
+
+def to_pil(tensor, fmt="JPEG"):
+    array = to_uint8(tensor)
+    if array.ndim == 3 and array.shape[-1] == 1:
+        array = array[..., 0]
+    elif array.ndim == 3 and array.shape[-1] == 4 and fmt == "JPEG":
+        # JPEG 不支持透明通道
+        array = array[..., :3]
+    return Image.fromarray(array)
+
+
+def encode(tensor, fmt="JPEG", quality=95, compress_level=1):
+    """编码为图像字节"""
+    fmt = fmt.upper()
+    image = to_pil(tensor, fmt)
+    buffer = io.BytesIO()
+    if fmt == "PNG":
+        image.save(buffer, format="PNG", compress_level=compress_level)
+    else:
+        image.save(buffer, format=fmt, quality=quality)
+    return buffer.getvalue()
+
+
+def to_base64(tensor, fmt="JPEG", quality=95, compress_level=1, data_uri=False):
+    """编码为base64字符串，data_uri=True 时带 data:image/...;base64, 前缀"""
+    fmt = fmt.upper()
+    encoded = base64.b64encode(encode(tensor, fmt, quality, compress_level)).decode("ascii")
+    if data_uri:
+        return f"data:{MIME_TYPES[fmt]};base64,{encoded}"
+    return encoded
@@ -0,0 +1,118 @@
+# image_pipeline.py
+"""
+结果图像下载与解码流水线
+
+在线程池中并发下载并解码所有结果图像（PIL解码时会释放GIL），
+再直接写入一个预分配的 [B,H,W,C] float32 张量，避免逐张构建张量再 torch.cat。
+"""
+
+import io
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import torch
+from PIL import Image
+
+from . import gateway_client
+
+
+def download_proxies(use_proxy, proxy_url):
+    """与各节点一致的图片下载代理配置：启用时走指定代理，否则禁用系统代理"""
+    if use_proxy and proxy_url and proxy_url.strip():
+        return {"http": proxy_url.strip(), "https": proxy_url.strip()}
+    return {"http": None, "https": None}
+
+
+def _decode(data, background=None):
+    """解码为 uint8 RGB 数组，指定 background 时带透明通道的图像先合成到该底色上"""
+    image = Image.open(io.BytesIO(data))
+    if background is not None and image.mode in ('RGBA', 'LA'):
+        flattened = Image.new('RGB', image.size, background)
+        flattened.paste(image, mask=image.split()[-1])
+        image = flattened
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    return np.array(image)
+
+
+def _fetch_and_decode(source, proxies, timeout, background=None):
+    if isinstance(source, (bytes, bytearray)):
+        return _decode(source, background)
+    response = gateway_client.get(source, proxies=proxies, timeout=timeout)
+    response.raise_for_status()
+    return _decode(response.content, background)
+
+
+def fetch_arrays(sources, proxies=None, timeout=60, max_workers=8, log=None, background=None):
+    """
+    并发下载并解码图像，按输入顺序返回 uint8 RGB 数组列表，失败的位置为None
+
+    background: 透明图像合成用的底色，如 (255, 255, 255)；为None时直接丢弃透明通道
+    """
+    log = log or (lambda message, level="INFO": None)
+    arrays = [None] * len(sources)
+    if not sources:
+        return arrays
+
+    workers = max(1, min(max_workers, len(sources)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="design-ai-fetch") as pool:
+        futures = {
+            pool.submit(_fetch_and_decode, source, proxies, timeout, background): idx
+            for idx, source in enumerate(sources)
+        }
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                arrays[idx] = future.result()
+                height, width = arrays[idx].shape[:2]
+                log(f"图像 {idx + 1}: ({width}, {height}), 模式: RGB")
+            except Exception as e:
+                log(f"下载图像 {idx + 1} 失败: {str(e)}", "ERROR")
+    return arrays
+
+
+def stack_arrays(arrays, log=None, pad_value=None):
+    """
+    把 uint8 RGB 数组写入一个预分配的 [B,H,W,3] float32 张量
+
+    尺寸与第一张不一致的图像会被缩放到第一张的尺寸；
+    指定 pad_value（0-255）时改为不缩放，在右下方以该值补齐到最大尺寸，保持各图比例。
+    """
+    log = log or (lambda message, level="INFO": None)
+    if pad_value is not None:
+        height = max(array.shape[0] for array in arrays)
+        width = max(array.shape[1] for array in arrays)
+        batch = torch.full((len(arrays), height, width, 3), float(pad_value), dtype=torch.float32)
+        for idx, array in enumerate(arrays):
+            batch[idx, :array.shape[0], :array.shape[1]].copy_(torch.from_numpy(array))
+        batch.div_(255.0)
+        return batch
+
+    height, width = arrays[0].shape[:2]
+    batch = torch.empty((len(arrays), height, width, 3), dtype=torch.float32)
+    for idx, array in enumerate(arrays):
+        if array.shape[:2] != (height, width):
+            log(f"图像尺寸不一致，缩放到 ({width}, {height})", "WARN")
+            array = np.array(Image.fromarray(array).resize((width, height), Image.Resampling.LANCZOS))
+        # uint8 直接写入float32批次，不生成中间float数组
+        batch[idx].copy_(torch.from_numpy(array))
+    batch.div_(255.0)
+    return batch
+
+
+def load_images(sources, proxies=None, timeout=60, max_workers=8, log=None):
+    """
+    并发下载并解码图像，按输入顺序返回 [B,H,W,3] float32 张量
+
+    sources: 图像URL或已解码出的图像字节（如b64_json）的列表
+    失败的图像会被记录并跳过；全部失败时返回None。
+    尺寸与第一张不一致的图像会被缩放到第一张的尺寸。
+    """
+    if not sources:
+        return None
+
+    arrays = fetch_arrays(sources, proxies, timeout, max_workers, log)
+    decoded = [array for array in arrays if array is not None]
+    if not decoded:
+        return None
+    return stack_arrays(decoded, log)
@@ -0,0 +1,100 @@
+# jwt_cache.py
+"""
+可图（Kling）JWT token 缓存
+
+按 (access_key, secret_key哈希) 缓存已签名的token，在有效期内直接复用；
+距离过期不足 REFRESH_AHEAD 秒时在后台线程重新签名，调用方继续使用旧token不必等待。
+长时间轮询时用 current() 把最初拿到的token换成同一密钥下的最新token，
+token轮换不再影响提交和轮询的主路径。v1、v2 可图节点共用。
+"""
+
+import hashlib
+import threading
+import time
+
+import jwt
+
+# token有效期（秒）
+TTL = 1800
+# 距离过期多少秒开始后台刷新
+REFRESH_AHEAD = 300
+# 生效时间提前量，容忍服务端时钟偏差
+NBF_SKEW = 5
+
+_entries = {}
+_issued = {}
+_lock = threading.Lock()
+
+
+class _Entry:
+    def __init__(self, access_key, secret_key, token, expires_at):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.token = token
+        self.expires_at = expires_at
+        self.refreshing = False
+
+
+def _sign(access_key, secret_key):
+    now = int(time.time())
+    payload = {
+        "iss": access_key,
+        "exp": now + TTL,
+        "nbf": now - NBF_SKEW
+    }
+    token = jwt.encode(payload, secret_key, headers={"alg": "HS256", "typ": "JWT"})
+    return token, now + TTL
+
+
+def _store(key, access_key, secret_key):
+    token, expires_at = _sign(access_key, secret_key)
+    entry = _Entry(access_key, secret_key, token, expires_at)
+    with _lock:
+        _entries[key] = entry
+        # 记录签发过的token，持有旧token的轮询可以换到最新token；过期超过一个周期的不再保留
+        now = time.time()
+        for issued in [t for t, (_, exp) in _issued.items() if exp + TTL < now]:
+            del _issued[issued]
+        _issued[token] = (key, expires_at)
+    return entry
+
+
+def _refresh(key, access_key, secret_key):
+    try:
+        _store(key, access_key, secret_key)
+    except Exception as e:
+        print(f"[JWT] 后台刷新token失败: {str(e)}")
+        with _lock:
+            entry = _entries.get(key)
+            if entry is not None:
+                entry.refreshing = False
+
+
+def _token_for(key, access_key, secret_key):
+    now = time.time()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and now < entry.expires_at - NBF_SKEW:
+            if now >= entry.expires_at - REFRESH_AHEAD and not entry.refreshing:
+                entry.refreshing = True
+                threading.Thread(
+                    target=_refresh, args=(key, access_key, secret_key), daemon=True
+                ).start()
+            return entry.token
+    return _store(key, access_key, secret_key).token
+
+
+def get_token(access_key, secret_key):
+    """返回可用的JWT token，有效期内复用，临近过期时后台刷新，已过期时同步重新签名"""
+    key = (access_key, hashlib.sha256(secret_key.encode("utf-8")).hexdigest())
+    return _token_for(key, access_key, secret_key)
+
+
+def current(token):
+    """返回与该token同一密钥的最新可用token，不是本缓存签发的token原样返回"""
+    with _lock:
+        issued = _issued.get(token)
+        entry = _entries.get(issued[0]) if issued else None
+    if entry is None:
+        return token
+    return _token_for(issued[0], entry.access_key, entry.secret_key)
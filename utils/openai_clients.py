@@ -0,0 +1,54 @@
+# openai_clients.py
+"""
+OpenAI 兼容接口的进程级客户端注册表
+
+按 (api_base, api_key哈希, timeout) 复用 OpenAI 客户端，同一 api_base 的客户端共用一个
+httpx 连接池，跨节点实例、跨多次执行复用 keep-alive 连接。
+直接用 requests 调用的 OpenAI 兼容节点走 gateway_client 的会话池。
+"""
+
+import hashlib
+import os
+import threading
+
+import httpx
+from openai import OpenAI
+
+_limits = httpx.Limits(
+    max_connections=int(os.environ.get("DESIGN_AI_OPENAI_MAX_CONNECTIONS", "64")),
+    max_keepalive_connections=int(os.environ.get("DESIGN_AI_OPENAI_MAX_KEEPALIVE", "16")),
+)
+_clients = {}
+_http_clients = {}
+_lock = threading.Lock()
+
+
+def _http_client(api_base):
+    if api_base not in _http_clients:
+        _http_clients[api_base] = httpx.Client(limits=_limits, follow_redirects=True)
+    return _http_clients[api_base]
+
+
+def get_client(api_key, api_base, timeout=None):
+    """获取共享的 OpenAI 客户端，timeout 为None时使用SDK默认超时"""
+    api_base = (api_base or "").rstrip('/') or None
+    key = (api_base, hashlib.sha256((api_key or "").encode("utf-8")).hexdigest(), timeout)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            kwargs = {"api_key": api_key, "base_url": api_base, "http_client": _http_client(api_base)}
+            if timeout is not None:
+                kwargs["timeout"] = timeout
+            client = OpenAI(**kwargs)
+            _clients[key] = client
+    return client
+
+
+def close_all():
+    """关闭所有连接池（进程退出或切换配置时调用）"""
+    with _lock:
+        http_clients = list(_http_clients.values())
+        _clients.clear()
+        _http_clients.clear()
+    for http_client in http_clients:
+        http_client.close()
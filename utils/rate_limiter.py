@@ -0,0 +1,196 @@
+# rate_limiter.py
+"""
+网关客户端限流与并发控制
+
+按 (网关base_url, 模型) 维护进程级的令牌桶和最大并发信号量，所有节点共享；
+收到 429 时按 Retry-After 暂停该桶，避免各节点各自盲目重试形成重试风暴。
+
+限额通过环境变量 DESIGN_AI_RATE_LIMITS（JSON）或 configure() 配置，例如：
+    {"https://llm-gateway-prod.corp.kuaishou.com": {"gpt-image-1": {"rate": 1, "burst": 2, "max_concurrency": 4}},
+     "*": {"*": {"max_concurrency": 16}}}
+rate 为每秒请求数，burst 为桶容量，max_concurrency 为同时进行的请求数；未配置的项不限制。
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .task_poller import server_hint
+
+# 429 未携带 Retry-After 时的默认暂停秒数
+DEFAULT_PENALTY = 1.0
+
+_limits = {}
+_governors = {}
+_lock = threading.Lock()
+
+
+class Governor:
+    """单个 (base_url, 模型) 的令牌桶 + 并发信号量，附带排队指标"""
+
+    def __init__(self, rate=None, burst=None, max_concurrency=None):
+        self.rate = float(rate) if rate else None
+        self.burst = float(burst or max(1.0, self.rate or 1.0))
+        self.max_concurrency = int(max_concurrency) if max_concurrency else None
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.requests = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self, now):
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _delay(self, now):
+        """获取许可前还需等待的秒数，0 表示可立即执行"""
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.max_concurrency and self.in_flight >= self.max_concurrency:
+            return None
+        if self.rate and self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        return 0
+
+    def acquire(self):
+        """阻塞直到获得令牌和并发名额，返回排队等待的秒数"""
+        started = time.monotonic()
+        with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    delay = self._delay(now)
+                    if delay == 0:
+                        break
+                    # None 表示等待并发名额释放
+                    self._cond.wait(delay)
+            finally:
+                self.waiting -= 1
+            if self.rate:
+                self._tokens -= 1
+            self.in_flight += 1
+            self.requests += 1
+            waited = time.monotonic() - started
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def penalize(self, seconds=None):
+        """收到429后暂停发放许可，并清空令牌"""
+        with self._cond:
+            self.throttled += 1
+            seconds = DEFAULT_PENALTY if seconds is None else seconds
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+            self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self.in_flight,
+                "queue_depth": self.waiting,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "avg_wait": self.total_wait / self.requests if self.requests else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+
+def _load_limits():
+    raw = os.environ.get("DESIGN_AI_RATE_LIMITS", "").strip()
+    if not raw:
+        return
+    try:
+        config = json.loads(raw)
+    except json.JSONDecodeError as e:
+        print(f"[RateLimiter] DESIGN_AI_RATE_LIMITS 解析失败，已忽略: {str(e)}")
+        return
+    for base_url, models in config.items():
+        for model, limit in models.items():
+            configure(base_url, model, **limit)
+
+
+def configure(base_url="*", model="*", rate=None, burst=None, max_concurrency=None):
+    """
+    设置 (base_url, 模型) 的限额，"*" 表示通配
+
+    已创建的对应控制器会被替换，正在进行的请求不受影响。
+    """
+    key = (base_url.rstrip('/') if base_url != "*" else "*", model or "*")
+    with _lock:
+        _limits[key] = {"rate": rate, "burst": burst, "max_concurrency": max_concurrency}
+        for governor_key in [k for k in _governors if _matches(key, k)]:
+            del _governors[governor_key]
+
+
+def _matches(pattern, key):
+    return all(p == "*" or p == k for p, k in zip(pattern, key))
+
+
+def _resolve_limit(base_url, model):
+    for key in ((base_url, model), (base_url, "*"), ("*", model), ("*", "*")):
+        if key in _limits:
+            return _limits[key]
+    return {}
+
+
+def get_governor(base_url, model):
+    key = (base_url.rstrip('/'), model or "*")
+    governor = _governors.get(key)
+    if governor is not None:
+        return governor
+    with _lock:
+        governor = _governors.get(key)
+        if governor is None:
+            governor = Governor(**_resolve_limit(*key))
+            _governors[key] = governor
+    return governor
+
+
+@contextmanager
+def limit(base_url, model):
+    """在 (base_url, 模型) 的限额内执行一次请求"""
+    governor = get_governor(base_url, model)
+    waited = governor.acquire()
+    if waited >= 1:
+        print(f"[RateLimiter] {base_url} {model} 排队等待 {waited:.1f}秒")
+    try:
+        yield governor
+    finally:
+        governor.release()
+
+
+def observe(governor, response):
+    """检查响应，429时按 Retry-After 暂停该控制器"""
+    if response is not None and response.status_code == 429:
+        retry_after = server_hint(response)
+        governor.penalize(retry_after)
+        print(f"[RateLimiter] 网关限流(429)，暂停 {retry_after if retry_after is not None else DEFAULT_PENALTY}秒")
+
+
+def metrics():
+    """所有控制器的指标快照，键为 "base_url|模型" """
+    with _lock:
+        governors = dict(_governors)
+    return {f"{base_url}|{model}": governor.snapshot() for (base_url, model), governor in governors.items()}
+
+
+_load_limits()
@@ -0,0 +1,177 @@
+# result_cache.py
+"""
+网关生成结果的内容寻址缓存（可选开启）
+
+缓存键 = 节点命名空间 + 规范化后的输入参数的哈希，IMAGE 张量按字节内容哈希；
+API Key、超时、代理等不影响生成结果的参数不参与计算。
+条目以 .npz 存储在磁盘上（图像为 uint8，节点输出本身来自8位图像解码，可无损还原），
+按最近使用时间做 LRU 淘汰，并带总大小上限和 TTL。
+"""
+
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import torch
+
+CACHE_DIR = os.environ.get(
+    "DESIGN_AI_RESULT_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "design-ai-comfy", "results")
+)
+MAX_BYTES = int(float(os.environ.get("DESIGN_AI_RESULT_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+TTL_SECONDS = float(os.environ.get("DESIGN_AI_RESULT_CACHE_TTL_HOURS", "168")) * 3600
+
+# 不影响生成结果的参数
+VOLATILE_KEYS = {
+    "api_key", "access_key", "secret_key", "timeout", "poll_interval", "poll_mode",
+    "use_proxy", "api_proxy_url", "image_download_proxy", "image_proxy_url",
+    "max_concurrency", "use_result_cache", "upload_input_image",
+}
+
+_lock = threading.Lock()
+
+
+def hash_tensor(tensor):
+    """按形状、类型和字节内容哈希张量"""
+    array = tensor.detach().cpu().contiguous().numpy()
+    digest = hashlib.sha256()
+    digest.update(f"{array.dtype}{array.shape}".encode("utf-8"))
+    digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def _canonicalize(value):
+    if isinstance(value, torch.Tensor):
+        return {"__tensor__": hash_tensor(value)}
+    if isinstance(value, dict):
+        return {str(k): _canonicalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonicalize(v) for v in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def make_key(namespace, params):
+    """计算缓存键"""
+    canonical = {k: _canonicalize(v) for k, v in params.items() if k not in VOLATILE_KEYS}
+    blob = json.dumps({"ns": namespace, "params": canonical}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.npz")
+
+
+def get(key):
+    """读取缓存结果，未命中或已过期返回None"""
+    path = _entry_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as entry:
+            meta = json.loads(str(entry["meta"]))
+            expired = time.time() - meta["created_at"] > TTL_SECONDS
+            outputs = []
+            if not expired:
+                for idx, value in enumerate(meta["outputs"]):
+                    if value == "__tensor__":
+                        outputs.append(torch.from_numpy(entry[f"tensor_{idx}"]).float().div_(255.0))
+                    else:
+                        outputs.append(value)
+    except Exception as e:
+        print(f"[ResultCache] 读取缓存失败，已忽略: {str(e)}")
+        return None
+
+    if expired:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return None
+    # 更新修改时间作为LRU依据
+    os.utime(path, None)
+    return tuple(outputs)
+
+
+def put(key, outputs):
+    """写入缓存结果（原子替换），写入后按大小上限淘汰"""
+    path = _entry_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    arrays = {}
+    meta_outputs = []
+    for idx, value in enumerate(outputs):
+        if isinstance(value, torch.Tensor):
+            arrays[f"tensor_{idx}"] = (value.detach().cpu().clamp(0, 1) * 255.0).round().to(torch.uint8).numpy()
+            meta_outputs.append("__tensor__")
+        else:
+            meta_outputs.append(value)
+    arrays["meta"] = np.array(json.dumps({"created_at": time.time(), "outputs": meta_outputs}, ensure_ascii=False))
+
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+    evict()
+
+
+def evict(max_bytes=None):
+    """删除过期条目，并按最近使用时间淘汰到大小上限以内"""
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    now = time.time()
+    with _lock:
+        entries = []
+        for root, _, files in os.walk(CACHE_DIR):
+            for name in files:
+                if not name.endswith(".npz"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= max_bytes and now - mtime <= TTL_SECONDS:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+
+def cacheable(namespace):
+    """
+    节点方法装饰器：传入 use_result_cache=True 时启用结果缓存
+
+    仅缓存成功结果（输出第二项为True）；未传入 seed、seed 为 -1（随机）或未等待结果时不缓存，
+    没有种子输入的节点不应使用该装饰器。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, use_result_cache=False, **kwargs):
+            if not use_result_cache or kwargs.get("seed", -1) == -1 or kwargs.get("wait_for_result") is False:
+                return func(self, **kwargs)
+
+            key = make_key(namespace, kwargs)
+            cached = get(key)
+            if cached is not None:
+                print(f"[ResultCache] 命中缓存: {namespace} {key[:12]}")
+                return cached[:2] + (f"{cached[2]}（命中结果缓存）",) + cached[3:]
+
+            result = func(self, **kwargs)
+            if len(result) > 1 and result[1] is True:
+                try:
+                    put(key, result)
+                except Exception as e:
+                    print(f"[ResultCache] 写入缓存失败，已忽略: {str(e)}")
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,108 @@
+# retry_policy.py
+"""
+统一重试策略
+
+带抖动的指数退避 + 总时间预算，按幂等性决定是否重试：
+GET（轮询、下载）默认可重试；POST（提交任务）只有携带幂等键时才重试，
+避免网关已受理的任务因重试被重复提交计费。
+
+默认参数通过环境变量配置：
+    DESIGN_AI_RETRY_ATTEMPTS   最大尝试次数（默认3）
+    DESIGN_AI_RETRY_BASE_DELAY 首次退避秒数（默认0.5）
+    DESIGN_AI_RETRY_MAX_DELAY  单次退避上限秒数（默认8）
+    DESIGN_AI_RETRY_BUDGET     包含所有尝试与等待的总时间预算秒数（默认60）
+"""
+
+import os
+import random
+import time
+import uuid
+
+import requests
+
+from .circuit_breaker import CircuitOpenError
+from .task_poller import server_hint
+
+# 可重试的HTTP状态码
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# 无需幂等键即可安全重试的方法
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def new_idempotency_key():
+    """为一次逻辑提交生成幂等键，同一提交的所有重试共用"""
+    return uuid.uuid4().hex
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0, budget=60.0,
+                 retry_statuses=RETRY_STATUSES):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.retry_statuses = retry_statuses
+
+    def backoff(self, attempt, retry_after=None):
+        """第 attempt 次失败后的等待秒数（full jitter），服务端建议的等待时间优先"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def call(self, fn, log=None):
+        """
+        执行 fn 并按策略重试
+
+        fn 返回 requests.Response；可重试状态码和请求异常会被重试，
+        熔断（CircuitOpenError）不重试。超出次数或预算时返回最后的响应或抛出最后的异常。
+        """
+        log = log or print
+        deadline = time.monotonic() + self.budget if self.budget else None
+        for attempt in range(1, self.max_attempts + 1):
+            response, error = None, None
+            try:
+                response = fn()
+            except CircuitOpenError:
+                raise
+            except requests.exceptions.RequestException as e:
+                error = e
+            if error is None and response.status_code not in self.retry_statuses:
+                return response
+            if attempt == self.max_attempts:
+                break
+
+            delay = self.backoff(attempt, server_hint(response) if response is not None else None)
+            if deadline is not None and time.monotonic() + delay > deadline:
+                log(f"[Retry] 超出重试时间预算（{self.budget}秒），停止重试")
+                break
+            reason = str(error) if error is not None else f"状态码 {response.status_code}"
+            log(f"[Retry] 第 {attempt}/{self.max_attempts} 次请求失败（{reason}），{delay:.1f}秒后重试")
+            time.sleep(delay)
+
+        if error is not None:
+            raise error
+        return response
+
+
+default_policy = RetryPolicy(
+    max_attempts=int(os.environ.get("DESIGN_AI_RETRY_ATTEMPTS", "3")),
+    base_delay=float(os.environ.get("DESIGN_AI_RETRY_BASE_DELAY", "0.5")),
+    max_delay=float(os.environ.get("DESIGN_AI_RETRY_MAX_DELAY", "8")),
+    budget=float(os.environ.get("DESIGN_AI_RETRY_BUDGET", "60")),
+)
+
+
+def resolve(method, retry=None, idempotency_key=None):
+    """
+    决定一次请求使用的重试策略，不应重试时返回None
+
+    retry: None 使用默认策略，False 禁用重试，或传入 RetryPolicy
+    """
+    if retry is False:
+        return None
+    if method.upper() not in IDEMPOTENT_METHODS and not idempotency_key:
+        return None
+    return retry or default_policy
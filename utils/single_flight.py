@@ -0,0 +1,106 @@
+# single_flight.py
+"""
+进行中请求合并（single-flight）
+
+同一进程内，字节级相同的并发网关请求只真正提交一次：
+第一个调用者执行提交（以及后续轮询），其余调用者等待并共享同一个结果或异常。
+请求完成后立即移出，不做结果缓存（持久化缓存见 result_cache）。
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future
+
+from . import gateway_client
+
+# 设置为 0 可全局关闭请求合并
+ENABLED = os.environ.get("DESIGN_AI_SINGLE_FLIGHT", "1") != "0"
+
+# 参与请求键计算的鉴权请求头（不同密钥的请求不合并）
+CREDENTIAL_HEADERS = ("x-api-key", "authorization")
+
+
+def make_key(*parts):
+    """由任意可JSON序列化的部分计算请求键"""
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self):
+        """当前进行中的合并请求数"""
+        return len(self._calls)
+
+    def do(self, key, fn):
+        """
+        执行 fn，相同 key 的并发调用共享同一次执行
+
+        返回 (结果, 是否为共享结果)；key 为 None 时不合并，直接执行。
+        fn 抛出的异常会传递给所有等待者。
+        """
+        if key is None or not ENABLED:
+            return fn(), False
+
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+default_group = SingleFlight()
+
+
+def do(key, fn):
+    return default_group.do(key, fn)
+
+
+def request_key(url, kwargs):
+    """按URL、请求体和鉴权头计算请求键"""
+    headers = {k.lower(): v for k, v in (kwargs.get("headers") or {}).items()}
+    credentials = [headers.get(name, "") for name in CREDENTIAL_HEADERS]
+    return make_key(url, kwargs.get("json"), kwargs.get("data"), credentials)
+
+
+def post(url, coalesce=False, **kwargs):
+    """
+    合并相同的并发POST请求，参数与 gateway_client.post 一致
+
+    请求键不包含 idempotency_key，合并后所有调用者拿到同一份生成结果，
+    因此只应在请求确定性（如固定种子）时传入 coalesce=True。
+
+    返回的 Response 可能被多个调用者共享，响应体在返回前已完整读取。
+    """
+    def send():
+        response = gateway_client.post(url, **kwargs)
+        # 预读响应体，供多个调用者共享
+        response.content
+        return response
+
+    response, shared = do(request_key(url, kwargs) if coalesce else None, send)
+    if shared:
+        print(f"[SingleFlight] 复用进行中的相同请求: {url}")
+    return response
@@ -0,0 +1,147 @@
+# sse_stream.py
+"""
+SSE 流式响应的增量解析
+
+iter_events 按事件边界逐个产出 data 字段（到达即处理，不整体缓冲）；
+BlockDetector 增量检测输出中是否已出现完整的内容块（代码块 / JSON / HTML），
+调用方可据此提前结束流；StreamStats 统计首字耗时和生成速度。
+"""
+
+import re
+import time
+
+_FENCE = re.compile(r'```[\w-]*[^\n]*\n.*?```', re.DOTALL)
+_HTML_END = re.compile(r'</html\s*>', re.IGNORECASE)
+
+
+def iter_events(response):
+    """逐个产出SSE事件的data内容（多行data按换行拼接），忽略注释和其他字段"""
+    data_lines = []
+    for line in response.iter_lines(chunk_size=None, decode_unicode=False):
+        line = line.decode('utf-8') if isinstance(line, bytes) else line
+        if not line:
+            if data_lines:
+                yield "\n".join(data_lines)
+                data_lines = []
+            continue
+        if line.startswith(':'):
+            continue
+        if line.startswith('data:'):
+            value = line[5:]
+            data_lines.append(value[1:] if value.startswith(' ') else value)
+    if data_lines:
+        yield "\n".join(data_lines)
+
+
+class BlockDetector:
+    """
+    增量检测完整内容块
+
+    feed() 追加新内容，检测到完整块时返回截止到块结尾的文本，否则返回None：
+    - 已闭合的 ``` 代码块
+    - 以 { 或 [ 开头、括号已配平的JSON
+    - 以 < 开头、已出现 </html> 的HTML
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.end = None
+        self._scanned = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk):
+        if self.end is not None:
+            return self.text[:self.end]
+        self.text += chunk
+        self.end = self._detect(chunk)
+        return self.text[:self.end] if self.end is not None else None
+
+    def _detect(self, chunk):
+        stripped = self.text.lstrip()
+        if not stripped:
+            return None
+        offset = len(self.text) - len(stripped)
+        first = stripped[0]
+
+        if '`' in chunk or first == '`':
+            match = _FENCE.search(self.text)
+            if match:
+                return match.end()
+        if first in '{[':
+            return self._scan_json(offset)
+        if first == '<':
+            match = _HTML_END.search(self.text, max(0, len(self.text) - len(chunk) - 8))
+            if match:
+                return match.end()
+        return None
+
+    def _scan_json(self, start):
+        """从上次扫描位置继续，跟踪括号深度（跳过字符串内的括号）"""
+        index = max(self._scanned, start)
+        while index < len(self.text):
+            char = self.text[index]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._scanned = index + 1
+                    return index + 1
+            index += 1
+        self._scanned = index
+        return None
+
+
+class StreamStats:
+    """首字耗时（TTFT）与生成速度统计"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first_token_at = None
+        self.finished_at = None
+        self.chunks = 0
+        self.completion_tokens = None
+
+    def on_content(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        self.chunks += 1
+
+    def on_usage(self, usage):
+        if isinstance(usage, dict) and usage.get("completion_tokens"):
+            self.completion_tokens = usage["completion_tokens"]
+
+    def finish(self):
+        self.finished_at = time.monotonic()
+
+    @property
+    def ttft(self):
+        return self.first_token_at - self.started if self.first_token_at else None
+
+    @property
+    def tokens(self):
+        """服务端未返回usage时以内容分片数近似token数"""
+        return self.completion_tokens if self.completion_tokens is not None else self.chunks
+
+    @property
+    def tokens_per_second(self):
+        if self.first_token_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.monotonic()) - self.first_token_at
+        return self.tokens / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        ttft = f"{self.ttft:.2f}秒" if self.ttft is not None else "无"
+        approx = "" if self.completion_tokens is not None else "约"
+        return f"首字耗时: {ttft}, 生成: {approx}{self.tokens} tokens, 速度: {self.tokens_per_second:.1f} tokens/s"
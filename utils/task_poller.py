@@ -0,0 +1,138 @@
+# task_poller.py
+"""
+提交/轮询 型网关节点共用的任务轮询
+
+poll() 在调用线程中查询任务状态直到完成，与各节点原先的轮询循环相同；
+轮询间隔可以是固定秒数，也可以是 AdaptiveSchedule：开始时快速轮询，随后按曲线退避，
+优先遵循网关返回的 Retry-After / ETA，并按模型学习历史耗时。
+"""
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# 网关响应中可能携带的预计剩余时间字段（秒）
+ETA_FIELDS = ("eta", "estimated_time", "estimated_remaining_time", "remaining_time")
+
+# 各模型历史耗时的指数滑动平均（秒）
+_model_durations = {}
+_durations_lock = threading.Lock()
+
+
+class Pending:
+    """任务未完成，可附带服务端建议的下次轮询等待时间"""
+    __slots__ = ("retry_after",)
+
+    def __init__(self, retry_after=None):
+        self.retry_after = retry_after
+
+
+def server_hint(response=None, data=None):
+    """从 Retry-After 响应头或ETA字段中解析服务端建议的等待秒数"""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+    if isinstance(data, dict):
+        for field in ETA_FIELDS:
+            value = data.get(field)
+            if isinstance(value, (int, float)) and value >= 0:
+                return float(value)
+    return None
+
+
+def typical_duration(model_key):
+    """模型的历史典型耗时，未知时返回None"""
+    return _model_durations.get(model_key)
+
+
+class AdaptiveSchedule:
+    """
+    自适应轮询间隔
+
+    先以 min_interval 快速轮询，之后每次乘以 factor 退避到 max_interval；
+    已知该模型的典型耗时时，先直接等到典型耗时的 warmup_ratio 处再开始快速轮询。
+    """
+
+    def __init__(self, model_key=None, min_interval=0.5, max_interval=10.0, factor=1.6,
+                 warmup_ratio=0.8, smoothing=0.3):
+        self.model_key = model_key
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.factor = factor
+        self.warmup_ratio = warmup_ratio
+        self.smoothing = smoothing
+        self._polls_after_warmup = 0
+
+    def _clamp(self, delay):
+        return min(max(delay, self.min_interval), self.max_interval)
+
+    def next_delay(self, elapsed, retry_after=None):
+        """计算下一次轮询前的等待秒数"""
+        if retry_after is not None:
+            return self._clamp(retry_after)
+
+        expected = typical_duration(self.model_key) if self.model_key else None
+        if expected:
+            warmup = expected * self.warmup_ratio
+            if elapsed < warmup:
+                # 直接等到典型耗时附近，可能略超 max_interval
+                return max(warmup - elapsed, self.min_interval)
+
+        delay = self.min_interval * (self.factor ** self._polls_after_warmup)
+        self._polls_after_warmup += 1
+        return self._clamp(delay)
+
+    def record(self, duration):
+        """记录一次成功任务的耗时，更新该模型的滑动平均"""
+        if not self.model_key:
+            return
+        with _durations_lock:
+            previous = _model_durations.get(self.model_key)
+            if previous is None:
+                _model_durations[self.model_key] = duration
+            else:
+                _model_durations[self.model_key] = previous + self.smoothing * (duration - previous)
+
+
+def build_schedule(poll_mode, poll_interval, model_key=None):
+    """根据节点的 poll_mode 构建轮询间隔：fixed 返回秒数，adaptive 返回 AdaptiveSchedule"""
+    if poll_mode == "adaptive":
+        return AdaptiveSchedule(model_key=model_key, max_interval=max(float(poll_interval) * 2, 10.0))
+    return poll_interval
+
+
+def poll(check, interval, timeout):
+    """
+    在当前线程中轮询直到任务完成，超时抛出 TimeoutError
+
+    check: 无参可调用对象，执行一次状态查询；任务未完成返回None或Pending，
+           完成时返回结果，失败时直接抛出异常
+    interval: 固定轮询间隔（秒）或 AdaptiveSchedule
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    adaptive = isinstance(interval, AdaptiveSchedule)
+    while True:
+        result = check()
+        retry_after = None
+        if isinstance(result, Pending):
+            retry_after = result.retry_after
+        elif result is not None:
+            if adaptive:
+                interval.record(time.monotonic() - started)
+            return result
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"任务轮询超时（{timeout}秒）")
+        if adaptive:
+            delay = interval.next_delay(time.monotonic() - started, retry_after)
+        else:
+            delay = interval
+        time.sleep(min(delay, remaining))
@@ -0,0 +1,72 @@
+# translate_cache.py
+"""
+翻译结果的持久化LRU缓存
+
+按 (接口地址, 原文, 源语言, 目标语言, 翻译服务) 缓存译文，不同后端的结果互不复用，超出容量时淘汰最久未使用的条目，
+写入JSON文件跨进程保留。重复的提示词和模板片段不再经过网络请求。
+
+    DESIGN_AI_TRANSLATE_CACHE_PATH  缓存文件路径
+    DESIGN_AI_TRANSLATE_CACHE_SIZE  最大条目数（默认5000）
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+CACHE_PATH = os.environ.get(
+    "DESIGN_AI_TRANSLATE_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "design-ai-comfy", "translations.json")
+)
+MAX_ENTRIES = int(os.environ.get("DESIGN_AI_TRANSLATE_CACHE_SIZE", "5000"))
+
+_entries = None
+_lock = threading.Lock()
+
+
+def make_key(endpoint, text, from_lang, to_lang, translate_type):
+    return json.dumps([endpoint.rstrip('/'), text, from_lang, to_lang, translate_type], ensure_ascii=False)
+
+
+def _load():
+    global _entries
+    if _entries is None:
+        try:
+            with open(CACHE_PATH, "r", encoding="utf-8") as f:
+                _entries = OrderedDict(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError, ValueError):
+            _entries = OrderedDict()
+    return _entries
+
+
+def get_many(keys):
+    """返回 {key: 译文}，只包含命中的key，命中的条目移到最近使用"""
+    with _lock:
+        entries = _load()
+        hits = {}
+        for key in keys:
+            if key in entries:
+                entries.move_to_end(key)
+                hits[key] = entries[key]
+        return hits
+
+
+def put_many(items):
+    """写入 {key: 译文} 并持久化，超出容量时淘汰最久未使用的条目"""
+    if not items:
+        return
+    with _lock:
+        entries = _load()
+        for key, value in items.items():
+            entries[key] = value
+            entries.move_to_end(key)
+        while len(entries) > MAX_ENTRIES:
+            entries.popitem(last=False)
+        try:
+            os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+            tmp_path = f"{CACHE_PATH}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(list(entries.items()), f, ensure_ascii=False)
+            os.replace(tmp_path, CACHE_PATH)
+        except OSError as e:
+            print(f"[TranslateCache] 写入缓存失败: {str(e)}")
@@ -0,0 +1,96 @@
+# upload_cache.py
+"""
+输入图像上传去重
+
+按内容哈希把输入图像通过 UploadImageNode 的CDN上传接口上传一次，
+返回的URL在磁盘上按哈希缓存（带TTL），其他节点和后续运行直接复用，
+请求体里只需传URL，不必再内联数MB的base64。
+"""
+
+import io
+import json
+import os
+import threading
+import time
+
+from . import image_encoder, single_flight
+from .result_cache import hash_tensor
+
+CACHE_PATH = os.environ.get(
+    "DESIGN_AI_UPLOAD_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "design-ai-comfy", "uploads.json")
+)
+TTL_SECONDS = float(os.environ.get("DESIGN_AI_UPLOAD_CACHE_TTL_HOURS", "24")) * 3600
+
+# 内部CDN，对应 UploadImageNode 的 "内部cdn(默认)"
+UPLOAD_TYPE = os.environ.get("DESIGN_AI_UPLOAD_TYPE", "2")
+
+_entries = None
+_lock = threading.Lock()
+
+
+def _upload_defaults():
+    from ..api.upload_image import UploadImageNode
+    required = UploadImageNode.INPUT_TYPES()["required"]
+    api_url = os.environ.get("DESIGN_AI_UPLOAD_API_URL") or required["api_url"][1]["default"]
+    token = os.environ.get("DESIGN_AI_UPLOAD_TOKEN") or required["poify_token"][1]["default"]
+    return UploadImageNode(), api_url, token
+
+
+def _load():
+    global _entries
+    if _entries is None:
+        try:
+            with open(CACHE_PATH, "r", encoding="utf-8") as f:
+                _entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            _entries = {}
+    now = time.time()
+    for key in [k for k, v in _entries.items() if now - v["uploaded_at"] > TTL_SECONDS]:
+        del _entries[key]
+    return _entries
+
+
+def _save():
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    tmp_path = f"{CACHE_PATH}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(_entries, f, ensure_ascii=False)
+    os.replace(tmp_path, CACHE_PATH)
+
+
+def lookup(key):
+    """返回未过期的已上传URL，没有时返回None"""
+    with _lock:
+        entry = _load().get(key)
+    return entry["url"] if entry else None
+
+
+def image_url(tensor, timeout=30, use_proxy=True):
+    """
+    获取输入图像（批量时取第一张）的CDN URL，返回 (url, 是否复用缓存)
+
+    相同内容的图像只上传一次，并发的相同上传也会合并；上传失败抛出 ValueError。
+    """
+    image = tensor[0] if tensor.dim() == 4 else tensor
+    node, api_url, token = _upload_defaults()
+    key = single_flight.make_key("upload", hash_tensor(image), api_url, UPLOAD_TYPE)
+
+    url = lookup(key)
+    if url:
+        return url, True
+
+    def upload():
+        data = image_encoder.encode(image, "JPEG", quality=95)
+        url, success, message, _ = node._upload_to_api(
+            (io.BytesIO(data), "image.jpg", "image/jpeg"), UPLOAD_TYPE, timeout, api_url, token, use_proxy
+        )
+        if not success or not url:
+            raise ValueError(message)
+        with _lock:
+            _load()[key] = {"url": url, "uploaded_at": time.time()}
+            _save()
+        return url
+
+    url, shared = single_flight.do(key, upload)
+    return url, shared